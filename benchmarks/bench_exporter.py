@@ -0,0 +1,112 @@
+"""
+Load test of the headless exporter with local keep-alive clients.
+
+    python benchmarks/bench_exporter.py [--clients 8] [--seconds 5] [--path /metrics] [--check]
+
+The exporter serves a real collector running at its normal rates, so the bodies change every sample while the
+clients scrape as fast as they can. "server CPU" is the process CPU time (clients included) per request.
+--check also runs the /metrics bodies through the strict OpenMetrics parser of prometheus_client (to be installed
+separately): the last one served and one of a snapshot with a few disks and network interfaces.
+"""
+
+import argparse
+import http.client
+import os
+import sys
+import time
+from threading import Thread
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hwstats.collector import (StatsCollector,
+                               UI_REFRESH_INTERVAL)
+from hwstats.exporter import (MetricsExporter,
+                              render_openmetrics)
+from hwstats.lifecycle import Lifecycle
+from hwstats.snapshot import Snapshot
+
+
+def scrape(host, port, path, deadline, latencies):
+    connection = http.client.HTTPConnection(host, port)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def check_openmetrics(body: bytes):
+    """
+    Raise ValueError if the body is not a valid OpenMetrics exposition, return its number of samples.
+    """
+    from prometheus_client.openmetrics.parser import text_string_to_metric_families
+
+    return sum(len(family.samples) for family in text_string_to_metric_families(body.decode('utf-8')))
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--path', default='/metrics', choices=('/metrics', '/snapshot.json', '/history.json'))
+    parser.add_argument('--check', action='store_true', help='check the /metrics bodies with prometheus_client')
+    args = parser.parse_args()
+    if args.check:
+        try:
+            import prometheus_client  # noqa: F401
+        except ImportError:
+            parser.error('--check needs prometheus_client: pip install prometheus_client')
+
+    lifecycle = Lifecycle()
+    collector = StatsCollector(lifecycle)
+    exporter = MetricsExporter(collector.store, collector.histories, '127.0.0.1', 0)
+    collector.scheduler.add_task('exporter', exporter.refresh, UI_REFRESH_INTERVAL)
+    collector.start()
+    exporter.start()
+    host, port = exporter.address[:2]
+
+    # let the first samples arrive
+    time.sleep(1)
+
+    latencies = [[] for _ in range(args.clients)]
+    deadline = time.perf_counter() + args.seconds
+    clients = [Thread(target=scrape, args=(host, port, args.path, deadline, client_latencies))
+               for client_latencies in latencies]
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    exporter.shutdown()
+    collector.shutdown()
+
+    all_latencies = sorted(latency for client_latencies in latencies for latency in client_latencies)
+    requests = len(all_latencies)
+    body_size = len(exporter.get(args.path)[1])
+    print(f'{args.path}: {body_size} bytes, {args.clients} clients, {wall:.1f} s')
+    print(f'requests      : {requests} ({requests / wall:.0f}/s)')
+    print(f'latency p50   : {percentile(all_latencies, 0.5) * 1000:.3f} ms')
+    print(f'latency p99   : {percentile(all_latencies, 0.99) * 1000:.3f} ms')
+    print(f'server CPU    : {cpu / requests * 1e6:.1f} us/request')
+
+    if args.check:
+        # the host may have no disk or network interface the collector can see
+        crowded = Snapshot(cpu_per_core_percent=(1.5, 2.5),
+                           disks={'nvme0n1': (1.5, 0.25, 12.0), 'sd"a\\': (0.0, 3.0, None)},
+                           nics={'eth0': (0.5, 2.0), 'wlan0': (0.0, 0.0)})
+        for name, body in (('served', exporter.get('/metrics')[1]), ('disks and nics', render_openmetrics(crowded))):
+            print(f'openmetrics   : {name} body valid, {check_openmetrics(body)} samples')
+
+
+if __name__ == '__main__':
+    main()
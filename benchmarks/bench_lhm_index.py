@@ -0,0 +1,121 @@
+"""
+Before/after cost of extracting the app's metrics from a LibreHardwareMonitor data.json tree.
+
+    python benchmarks/bench_lhm_index.py [--data recorded_data.json] [--size huge] [--polls 200]
+
+"before" is the recursive search the app used on every poll,
+"index build" is a full LHMSensorIndex build (paid only when the topology changes),
+"cached read" is the steady state LHMSensorReader.read() cost.
+"""
+
+import argparse
+import os
+import sys
+from timeit import default_timer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hwstats.lhm_index import (LHMSensorIndex,
+                               LHMSensorReader,
+                               LHM_SENSORS,
+                               SensorSelector)
+from lhm_tree import (load_or_make_tree,
+                      count_nodes,
+                      TREE_SIZES)
+
+
+def legacy_extract(data):
+    """
+    The per poll extraction of the app before the sensor index, kept as the baseline.
+    """
+    def find_sensor(data_node, sensor_type, name_filter=None):
+        results = []
+        if 'Type' in data_node:
+            if data_node['Type'] == sensor_type:
+                if name_filter is None or name_filter in data_node.get('Text', ''):
+                    results.append(data_node)
+        for child in data_node.get('Children', []):
+            results.extend(find_sensor(child, sensor_type, name_filter))
+        return results
+
+    def find_hardware_node(data_node, text_to_find):
+        if data_node.get('Text') == text_to_find and 'HardwareId' in data_node:
+            if data_node.get('ImageURL', '').startswith('images_icon/'):
+                return data_node
+        for child in data_node.get('Children', []):
+            found = find_hardware_node(child, text_to_find)
+            if found:
+                return found
+        return None
+
+    def first_value(sensors, field='Value'):
+        if sensors:
+            try:
+                return float(sensors[0].get(field, '0').split()[0].replace(',', '.'))
+            except (ValueError, AttributeError, IndexError):
+                pass
+        return 0
+
+    values = {}
+    for disk in ('disk1', 'disk2'):
+        node = find_hardware_node(data, disk)
+        values[f'{disk}_activity'] = first_value(find_sensor(node, 'Load', 'Total Activity')) if node else 0
+        values[f'{disk}_read_speed'] = first_value(find_sensor(node, 'Throughput', 'Read Rate'),
+                                                   'RawValue') if node else 0
+        values[f'{disk}_write_speed'] = first_value(find_sensor(node, 'Throughput', 'Write Rate'),
+                                                    'RawValue') if node else 0
+    node = find_hardware_node(data, 'adapter1')
+    values['network_upload_speed'] = first_value(find_sensor(node, 'Throughput', 'Upload Speed'),
+                                                 'RawValue') if node else 0
+    values['network_download_speed'] = first_value(find_sensor(node, 'Throughput', 'Download Speed'),
+                                                   'RawValue') if node else 0
+
+    cpu = find_sensor(data, 'Temperature', 'CPU Package') or find_sensor(data, 'Temperature', 'SoC')
+    values['CPU_temp'] = first_value(cpu)
+    values['dGPU_temp'] = first_value([s for s in find_sensor(data, 'Temperature', 'GPU Core')
+                                       if s.get('SensorId', '').startswith('/gpu-nvidia')])
+    values['dGPU_usage'] = first_value([s for s in find_sensor(data, 'Load', 'GPU Core')
+                                        if s.get('SensorId', '').startswith('/gpu-nvidia')])
+    values['iGPU_usage'] = first_value([s for s in find_sensor(data, 'Load', 'D3D 3D')
+                                        if '/gpu-intel-integrated/' in s.get('SensorId', '')])
+    return values
+
+
+def time_per_call(function, repeats):
+    start = default_timer()
+    for _ in range(repeats):
+        function()
+    return (default_timer() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', help='recorded data.json, a synthetic tree is used when missing')
+    parser.add_argument('--size', default='huge', choices=sorted(TREE_SIZES))
+    parser.add_argument('--polls', type=int, default=200)
+    args = parser.parse_args()
+
+    data = load_or_make_tree(args.data, args.size)
+    reader = LHMSensorReader(LHM_SENSORS)
+
+    before = legacy_extract(data)
+    after = reader.read(data)
+    mismatches = {metric for metric in after if before[metric] != after[metric]}
+    if mismatches:
+        print(f'WARNING: the index disagrees with the legacy search for {sorted(mismatches)}')
+
+    legacy = time_per_call(lambda: legacy_extract(data), args.polls)
+    build = time_per_call(lambda: LHMSensorIndex(data).find(SensorSelector('Temperature', 'CPU Package')),
+                          max(1, args.polls // 10))
+    cached = time_per_call(lambda: reader.read(data), args.polls)
+
+    print(f'tree: {args.data or args.size} ({count_nodes(data)} nodes)')
+    print(f'before (legacy search) : {legacy * 1000:9.3f} ms/poll')
+    print(f'index build            : {build * 1000:9.3f} ms (only on topology change)')
+    print(f'cached read            : {cached * 1000:9.3f} ms/poll')
+    print(f'speedup                : {legacy / cached:9.1f}x')
+    print(f'index builds           : {reader.index_builds}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Cold start benchmark of the GUI: time to the first paint (placeholder cells on screen) and to the first real data.
+
+    python benchmarks/bench_startup.py [--runs 5] [--output results.json] [-- COMMAND ...]
+
+The app is started runs times as a subprocess (by default: python main.py --fixed-rate, with the
+offscreen Qt platform unless QT_QPA_PLATFORM is set); it appends its startup milestones to the file named by
+PYFHS_STARTUP_TRACE. For each milestone, two times are reported:
+    process  from the subprocess launch, so including the interpreter startup (or the bundle unpacking)
+    in app   from the first line of main.py
+A PyInstaller build is measured the same way: bench_startup.py -- dist/main/pyFloatingHardwareStats.exe
+Only the first run after a reboot or a login is really cold, the next ones hit the OS file cache.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MILESTONES = ('first paint', 'first data')
+
+
+def run_once(command, timeout):
+    """
+    {milestone: (seconds since the launch, seconds since main.py started)} of one start of the app.
+    """
+    trace_file, trace_path = tempfile.mkstemp(suffix='.tsv')
+    os.close(trace_file)
+    env = dict(os.environ, PYFHS_STARTUP_TRACE=trace_path)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    launched = time.time()
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    milestones = {}
+    try:
+        deadline = time.monotonic() + timeout
+        while len(milestones) < len(MILESTONES) and time.monotonic() < deadline:
+            time.sleep(0.005)
+            with open(trace_path, 'r') as file_in_handle:
+                for line in file_in_handle:
+                    milestone, in_app, at = line.rstrip('\n').split('\t')
+                    milestones[milestone] = (float(at) - launched, float(in_app))
+    finally:
+        process.terminate()
+        process.wait(10)
+        os.remove(trace_path)
+    return milestones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=30, help='seconds to wait for the first data of a run')
+    parser.add_argument('--output', help='JSON file to write the results to')
+    parser.add_argument('command', nargs='*', help='the app to start, python main.py by default')
+    args = parser.parse_args()
+
+    command = args.command or [sys.executable, 'main.py', '--fixed-rate']
+    runs = [run_once(command, args.timeout) for _ in range(args.runs)]
+
+    results = {}
+    for milestone in MILESTONES:
+        measured = [run[milestone] for run in runs if milestone in run]
+        if not measured:
+            print(f'{milestone:12} not reached within {args.timeout}s')
+            continue
+        process_ms = [process * 1000 for process, _ in measured]
+        in_app_ms = [in_app * 1000 for _, in_app in measured]
+        results[milestone] = {'runs': len(measured),
+                              'process_median_ms': round(statistics.median(process_ms), 1),
+                              'process_max_ms': round(max(process_ms), 1),
+                              'in_app_median_ms': round(statistics.median(in_app_ms), 1)}
+        print(f'{milestone:12} process median {results[milestone]["process_median_ms"]:7.1f}ms '
+              f'max {results[milestone]["process_max_ms"]:7.1f}ms | '
+              f'in app median {results[milestone]["in_app_median_ms"]:7.1f}ms')
+
+    if args.output:
+        with open(args.output, 'w') as file_out_handle:
+            json.dump({'command': command, 'results': results}, file_out_handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+Runs the LibreHardwareMonitor backend against a local stub LHM server in various failure modes.
+
+    python benchmarks/lhm_stub_harness.py [--scenario all] [--seconds 20] [--interval 0.5] [--check]
+
+Scenarios:
+    healthy   the stub answers at once, with gzip and ETag support
+    slow      every response takes --delay seconds
+    hang      the stub never answers in time (longer than the backend timeout)
+    flapping  the stub alternates between up and 503 errors every --period seconds
+    dead      nothing listens on the port
+
+For each scenario it reports how long the sensor polls blocked, how many requests and TCP connections reached
+the server, the final circuit breaker state and how stale the CPU temperature got.
+--check verifies the healthy, hang and dead scenarios: a single connection and only 304s after the first response
+when healthy, the breaker open within its failure threshold and the source not polled on every poll otherwise.
+"""
+
+import argparse
+import contextlib
+import gzip
+import hashlib
+import io
+import json
+import os
+import socket
+import sys
+import time
+from http.server import (BaseHTTPRequestHandler,
+                         ThreadingHTTPServer)
+from threading import Thread
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hwstats.backends.lhm import LibreHardwareMonitorBackend
+from hwstats.collector import sensors_updater
+from hwstats.snapshot import SnapshotStore
+from lhm_tree import (make_lhm_tree,
+                      TREE_SIZES)
+
+SCENARIOS = ('healthy', 'slow', 'hang', 'flapping', 'dead')
+
+
+class StubLHMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, body: bytes, delay: float = 0, flapping_period: float = 0):
+        super().__init__(('127.0.0.1', 0), _StubLHMHandler)
+        self.body = body
+        self.gzip_body = gzip.compress(body)
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.delay = delay
+        self.flapping_period = flapping_period
+        self.started = time.monotonic()
+
+        self.connections = 0
+        self.requests = 0
+        self.not_modified = 0
+
+    def handle_error(self, request, client_address):
+        # the backend gives up on the hanging responses, the broken pipes that follow are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def is_down(self):
+        if not self.flapping_period:
+            return False
+        return int((time.monotonic() - self.started) / self.flapping_period) % 2 == 1
+
+
+class _StubLHMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        if server.delay:
+            time.sleep(server.delay)
+
+        if server.is_down():
+            self.send_error(503)
+            return
+
+        if self.headers.get('If-None-Match') == server.etag:
+            server.not_modified += 1
+            self.send_response(304)
+            self.send_header('ETag', server.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        compressed = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = server.gzip_body if compressed else server.body
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', server.etag)
+        if compressed:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def run_scenario(scenario, body, args):
+    """
+    Poll the backend for args.seconds against the stub of the scenario, return what happened as a dict.
+    """
+    server = None
+    if scenario == 'dead':
+        port = free_port()
+    else:
+        delay = {'slow': args.delay, 'hang': args.timeout * 2}.get(scenario, 0)
+        server = StubLHMServer(body, delay, args.period if scenario == 'flapping' else 0)
+        port = server.server_address[1]
+        Thread(target=server.serve_forever, daemon=True).start()
+
+    backend = LibreHardwareMonitorBackend(port, timeout=args.timeout)
+    # the polls are paced like the scheduler does, one interval between the deadlines
+    backend.breaker.base_delay = args.interval
+    store = SnapshotStore()
+    blocked = []
+    opened_after = None  # number of polls before the breaker first opened
+    max_age = 0.0
+    errors = io.StringIO()
+    deadline = time.monotonic() + args.seconds
+    next_poll = time.monotonic()
+    with contextlib.redirect_stdout(errors):
+        while time.monotonic() < deadline:
+            start = time.monotonic()
+            sensors_updater(store, backend)
+            blocked.append(time.monotonic() - start)
+            max_age = max(max_age, store.current.age('CPU_temp'))
+            if opened_after is None and backend.breaker.state != backend.breaker.CLOSED:
+                opened_after = len(blocked)
+
+            next_poll += args.interval
+            time.sleep(max(0.0, next_poll - time.monotonic()))
+    backend.close()
+
+    result = {'polls': len(blocked),
+              'blocked': sum(blocked),
+              'max_blocked': max(blocked),
+              'errors': errors.getvalue().count('\n'),
+              'breaker': backend.breaker.state,
+              'failure_threshold': backend.breaker.failure_threshold,
+              'opened_after': opened_after,
+              'max_age': min(max_age, args.seconds)}
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+        result.update(requests=server.requests, connections=server.connections, not_modified=server.not_modified)
+    return result
+
+
+def report(scenario, result):
+    print(f'{scenario:9}: {result["polls"]} polls, blocked {result["blocked"]:6.2f} s total / '
+          f'{result["max_blocked"]:5.2f} s max, {result["errors"]} errors printed, breaker {result["breaker"]}, '
+          f'max CPU_temp age {result["max_age"]:5.1f} s')
+    if 'requests' in result:
+        print(f'{"":9}  server: {result["requests"]} requests, {result["connections"]} connections, '
+              f'{result["not_modified"]} not modified')
+
+
+def check_scenario(scenario, result):
+    """
+    The expectations the result of the scenario does not meet, as messages.
+    """
+    failures = []
+    if scenario == 'healthy':
+        if result['errors'] or result['breaker'] != 'closed':
+            failures.append(f'{result["errors"]} errors, breaker {result["breaker"]}')
+        # one keep-alive connection, the unchanged tree is only sent once
+        if result['connections'] != 1:
+            failures.append(f'{result["connections"]} connections instead of 1')
+        if result['not_modified'] != result['requests'] - 1:
+            failures.append(f'{result["not_modified"]} of {result["requests"]} requests not modified, '
+                            f'expected all but the first')
+    elif scenario in ('hang', 'dead'):
+        # the breaker opens on the consecutive failures and the source is no longer polled on every poll
+        opened_after = result['opened_after']
+        if opened_after is None or opened_after > result['failure_threshold']:
+            failures.append(f'breaker opened after {opened_after} polls, expected {result["failure_threshold"]}')
+        elif result.get('requests', 0) >= result['polls']:
+            failures.append(f'{result["requests"]} requests for {result["polls"]} polls with the breaker open')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', default='all', choices=('all',) + SCENARIOS)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--interval', type=float, default=0.5, help='sensor polling interval')
+    parser.add_argument('--timeout', type=float, default=2, help='backend request timeout')
+    parser.add_argument('--delay', type=float, default=1, help='response delay of the slow scenario')
+    parser.add_argument('--period', type=float, default=5, help='up/down period of the flapping scenario')
+    parser.add_argument('--size', default='medium', choices=sorted(TREE_SIZES))
+    parser.add_argument('--check', action='store_true', help='exit with an error if a scenario misbehaves')
+    args = parser.parse_args()
+
+    body = json.dumps(make_lhm_tree(**TREE_SIZES[args.size])).encode('utf-8')
+    failed = False
+    for scenario in SCENARIOS if args.scenario == 'all' else (args.scenario,):
+        result = run_scenario(scenario, body, args)
+        report(scenario, result)
+        if args.check:
+            for failure in check_scenario(scenario, result):
+                print(f'{"":9}  FAILED: {failure}')
+                failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Synthetic LibreHardwareMonitor data.json trees, shaped like the real web server output.
+Used by the benchmarks when no recorded data.json is given.
+"""
+
+import json
+import os
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class _TreeBuilder:
+    def __init__(self):
+        self._next_id = 0
+
+    def node(self, text, children=None, **fields):
+        node = {'id': self._next_id,
+                'Text': text,
+                'Min': '',
+                'Value': '',
+                'Max': '',
+                'ImageURL': '',
+                'Children': children or []}
+        self._next_id += 1
+        node.update(fields)
+        return node
+
+    def hardware(self, text, hardware_id, icon, categories):
+        return self.node(text, categories, ImageURL=f'images_icon/{icon}.png', HardwareId=hardware_id)
+
+    def category(self, text, sensors):
+        return self.node(text, sensors, ImageURL='images_icon/category.png')
+
+    def sensor(self, text, sensor_type, sensor_id, value, unit, raw_value=None):
+        fields = {'Type': sensor_type,
+                  'SensorId': sensor_id,
+                  'Value': f'{value} {unit}',
+                  'Min': f'{value} {unit}',
+                  'Max': f'{value} {unit}'}
+        if raw_value is not None:
+            fields['RawValue'] = raw_value
+        return self.node(text, **fields)
+
+
+def make_lhm_tree(cores=8, disks=2, nics=1, nvidia_gpus=1, intel_igpu=True, decimal_comma=False):
+    """
+    Build a data.json like tree with the given amount of hardware.
+    Disks are named disk1, disk2 ... and network adapters adapter1, adapter2 ... like in the app's setup.
+    """
+    b = _TreeBuilder()
+
+    def fmt(value):
+        text = f'{value:.1f}'
+        return text.replace('.', ',') if decimal_comma else text
+
+    hardware = []
+
+    cpu_id = '/intelcpu/0'
+    hardware.append(b.hardware('Intel Core i9', cpu_id, 'cpu', [
+        b.category('Clocks', [b.sensor(f'CPU Core #{core + 1}', 'Clock', f'{cpu_id}/clock/{core + 1}',
+                                       fmt(4700.0), 'MHz') for core in range(cores)]),
+        b.category('Temperatures', [b.sensor(f'CPU Core #{core + 1}', 'Temperature',
+                                             f'{cpu_id}/temperature/{core}', fmt(55.0), '°C')
+                                    for core in range(cores)]
+                   + [b.sensor('CPU Package', 'Temperature', f'{cpu_id}/temperature/{cores}', fmt(64.0), '°C')]),
+        b.category('Load', [b.sensor('CPU Total', 'Load', f'{cpu_id}/load/0', fmt(12.5), '%')]
+                   + [b.sensor(f'CPU Core #{core + 1}', 'Load', f'{cpu_id}/load/{core + 1}', fmt(10.0), '%')
+                      for core in range(cores)]),
+        b.category('Powers', [b.sensor('CPU Package', 'Power', f'{cpu_id}/power/0', fmt(35.2), 'W')]),
+    ]))
+
+    if intel_igpu:
+        igpu_id = '/gpu-intel-integrated/pciroot/0'
+        hardware.append(b.hardware('Intel UHD Graphics 770', igpu_id, 'intel', [
+            b.category('Load', [b.sensor('D3D 3D', 'Load', f'{igpu_id}/load/0', fmt(3.0), '%'),
+                                b.sensor('D3D Video Decode', 'Load', f'{igpu_id}/load/1', fmt(0.0), '%')]),
+        ]))
+
+    for gpu in range(nvidia_gpus):
+        gpu_id = f'/gpu-nvidia/{gpu}'
+        hardware.append(b.hardware(f'NVIDIA GeForce RTX 4070 #{gpu}', gpu_id, 'nvidia', [
+            b.category('Temperatures', [b.sensor('GPU Core', 'Temperature', f'{gpu_id}/temperature/0',
+                                                 fmt(48.0), '°C'),
+                                        b.sensor('GPU Hot Spot', 'Temperature', f'{gpu_id}/temperature/2',
+                                                 fmt(57.0), '°C')]),
+            b.category('Load', [b.sensor('GPU Core', 'Load', f'{gpu_id}/load/0', fmt(21.0), '%'),
+                                b.sensor('GPU Memory', 'Load', f'{gpu_id}/load/1', fmt(33.0), '%')]),
+            b.category('Clocks', [b.sensor('GPU Core', 'Clock', f'{gpu_id}/clock/0', fmt(2475.0), 'MHz')]),
+        ]))
+
+    for disk in range(disks):
+        disk_id = f'/nvme/{disk}'
+        hardware.append(b.hardware(f'disk{disk + 1}', disk_id, 'nvme', [
+            b.category('Temperatures', [b.sensor('Temperature', 'Temperature', f'{disk_id}/temperature/0',
+                                                 fmt(41.0), '°C')]),
+            b.category('Load', [b.sensor('Used Space', 'Load', f'{disk_id}/load/0', fmt(61.0), '%'),
+                                b.sensor('Read Activity', 'Load', f'{disk_id}/load/31', fmt(4.0), '%'),
+                                b.sensor('Write Activity', 'Load', f'{disk_id}/load/32', fmt(2.0), '%'),
+                                b.sensor('Total Activity', 'Load', f'{disk_id}/load/33', fmt(6.0), '%')]),
+            b.category('Throughput', [b.sensor('Read Rate', 'Throughput', f'{disk_id}/throughput/34',
+                                               fmt(12.3), 'MB/s', f'{fmt(12897484.8)} B/s'),
+                                      b.sensor('Write Rate', 'Throughput', f'{disk_id}/throughput/35',
+                                               fmt(1.2), 'MB/s', f'{fmt(1258291.2)} B/s')]),
+        ]))
+
+    for nic in range(nics):
+        nic_id = f'/nic/%7B{nic:08X}-0000-0000-0000-000000000000%7D'
+        hardware.append(b.hardware(f'adapter{nic + 1}', nic_id, 'nic', [
+            b.category('Data', [b.sensor('Data Uploaded', 'Data', f'{nic_id}/data/2', fmt(1.2), 'GB'),
+                                b.sensor('Data Downloaded', 'Data', f'{nic_id}/data/3', fmt(9.8), 'GB')]),
+            b.category('Throughput', [b.sensor('Upload Speed', 'Throughput', f'{nic_id}/throughput/7',
+                                               fmt(300.5), 'KB/s', f'{fmt(307710.3)} B/s'),
+                                      b.sensor('Download Speed', 'Throughput', f'{nic_id}/throughput/8',
+                                               fmt(1.5), 'MB/s', f'{fmt(1572864.0)} B/s')]),
+            b.category('Load', [b.sensor('Network Utilization', 'Load', f'{nic_id}/load/1', fmt(1.0), '%')]),
+        ]))
+
+    computer = b.node('DESKTOP-BENCH', hardware, ImageURL='images_icon/computer.png')
+    return b.node('Sensor', [computer])
+
+
+# tree sizes used across the benchmarks
+TREE_SIZES = {
+    'small': dict(cores=4, disks=1, nics=1, nvidia_gpus=0),
+    'medium': dict(cores=16, disks=4, nics=4, nvidia_gpus=1),
+    'huge': dict(cores=128, disks=48, nics=32, nvidia_gpus=4),
+}
+
+
+def fixture_path(size):
+    return os.path.join(FIXTURES_DIR, f'lhm_{size}.json')
+
+
+def load_or_make_tree(path=None, size='huge'):
+    # an explicit data.json, else the fixture of that size, else a freshly built tree
+    if not path and os.path.isfile(fixture_path(size)):
+        path = fixture_path(size)
+    if path:
+        with open(path, 'r', encoding='utf-8') as file_in_handle:
+            return json.load(file_in_handle)
+    return make_lhm_tree(**TREE_SIZES[size])
+
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(child) for child in node.get('Children', []))
+
+
+if __name__ == '__main__':
+    # (re)writes the fixtures used by the benchmarks
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for size, hardware in TREE_SIZES.items():
+        with open(fixture_path(size), 'w', encoding='utf-8') as file_out_handle:
+            json.dump(make_lhm_tree(**hardware), file_out_handle, ensure_ascii=False)
+        print(fixture_path(size))
@@ -0,0 +1,136 @@
+"""
+Simulates many agents pushing their stats to an aggregator, to size the aggregated view.
+
+    python benchmarks/multi_agent_sim.py [--agents 300] [--rate 2] [--seconds 20] [--transport udp|tcp]
+                                         [--cores 8] [--target HOST:PORT] [--output results.json]
+
+Each simulated agent has its own SnapshotStore fed with plausible random walks (the CPU moves on every tick,
+the temperatures and the RAM rarely) and its own AgentSender, so its own socket, like a real agent.
+Without --target, the frames go to an in-process Aggregator whose scheduler also builds the frames of all the
+hosts at the UI refresh interval, as the GUI would; the CPU time of its threads is reported as the aggregator
+cost, in % of one core. With --target, the frames go to a running aggregator (python main.py --aggregate PORT).
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from hwstats.aggregator import Aggregator
+from hwstats.collector import UI_REFRESH_INTERVAL
+from hwstats.instrumentation import INSTRUMENTATION
+from hwstats.lifecycle import Lifecycle
+from hwstats.snapshot import SnapshotStore
+from hwstats.wire import (AgentSender,
+                          parse_address)
+
+
+class SimulatedAgent:
+    def __init__(self, index: int, address: tuple, transport: str, cores: int):
+        self._random = random.Random(index)
+        self.store = SnapshotStore()
+        self.sender = AgentSender(self.store, address, f'sim-{index:04d}', transport)
+        self._cores = cores
+        self._cpu = self._random.uniform(0, 60)
+        self.store.publish(ram_total=32.0, ram_usage=round(self._random.uniform(4, 24), 1), CPU_temp=45)
+
+    def tick(self):
+        rand = self._random
+        self._cpu = min(100.0, max(0.0, self._cpu + rand.gauss(0, 5)))
+        per_core = tuple(round(min(100.0, max(0.0, self._cpu + rand.gauss(0, 10))), 1) for _ in range(self._cores))
+        changes = {'cpu_percent': round(self._cpu, 1),
+                   'cpu_per_core_percent': per_core,
+                   'network_upload_speed': round(rand.expovariate(5), 2),
+                   'network_download_speed': round(rand.expovariate(1), 2),
+                   'disk1_read_speed': round(rand.expovariate(2), 2) if rand.random() < 0.3 else 0.0,
+                   'disk1_write_speed': round(rand.expovariate(2), 2) if rand.random() < 0.3 else 0.0,
+                   'disk1_activity': round(rand.uniform(0, 20), 2)}
+        if rand.random() < 0.25:
+            # slow sensors: sampled every 2 s, the value itself seldom moves
+            current = self.store.current
+            changes['CPU_temp'] = current.CPU_temp + rand.choice((-1, 0, 0, 0, 1))
+            changes['ram_usage'] = round(current.ram_usage + rand.choice((-0.1, 0, 0, 0.1)), 1)
+        self.store.publish(**changes)
+        self.sender.send()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--agents', type=int, default=300)
+    parser.add_argument('--rate', type=float, default=2, help='frames per second of each agent')
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--transport', choices=('udp', 'tcp'), default='udp')
+    parser.add_argument('--cores', type=int, default=8, help='CPU cores of each simulated agent')
+    parser.add_argument('--target', metavar='HOST:PORT', help='send to a running aggregator instead')
+    parser.add_argument('--output', help='JSON file to write the results to')
+    args = parser.parse_args()
+
+    aggregator = None
+    lifecycle = Lifecycle(REPO_ROOT)
+    if args.target:
+        address = parse_address(args.target)
+    else:
+        INSTRUMENTATION.enabled = True
+        aggregator = Aggregator(lifecycle, '127.0.0.1', 0)
+        aggregator.scheduler.add_task('UI', aggregator.build_frames, UI_REFRESH_INTERVAL)
+        aggregator.start()
+        address = aggregator.address
+
+    agents = [SimulatedAgent(index, address, args.transport, args.cores) for index in range(args.agents)]
+
+    start_cpu = INSTRUMENTATION.thread_cpu_times()
+    start = time.monotonic()
+    deadline = start
+    ticks = 0
+    while time.monotonic() - start < args.seconds:
+        for agent in agents:
+            agent.tick()
+        ticks += 1
+        deadline += 1 / args.rate
+        time.sleep(max(0.0, deadline - time.monotonic()))
+    wall = time.monotonic() - start
+    end_cpu = INSTRUMENTATION.thread_cpu_times()
+    # the last frames are still in flight
+    time.sleep(0.5)
+
+    frames_sent = sum(agent.sender.frames_sent for agent in agents)
+    bytes_sent = sum(agent.sender.bytes_sent for agent in agents)
+    results = {'agents': args.agents,
+               'transport': args.transport,
+               'frames_per_second': round(frames_sent / wall, 1),
+               'sender_late_ticks': max(0, round(wall * args.rate) - ticks),
+               'bytes_per_frame': round(bytes_sent / max(1, frames_sent), 1)}
+
+    if aggregator is not None:
+        hosts = aggregator.hosts.values()
+        cpu = {name: round((end_cpu.get(name, 0) - start_cpu.get(name, 0)) / wall * 100, 2)
+               for name in ('aggregator', 'sampling-scheduler')}
+        build = INSTRUMENTATION.report(aggregator.scheduler)['histograms'].get('frame format', {})
+        results.update({'hosts': len(aggregator.hosts),
+                        'frames_received': sum(state.frames_received for state in hosts),
+                        'frames_lost': sum(state.frames_lost for state in hosts),
+                        'invalid_frames': aggregator.invalid_frames,
+                        'receive_cpu_percent': cpu['aggregator'],
+                        'frames_cpu_percent': cpu['sampling-scheduler'],
+                        'aggregator_cpu_percent': round(sum(cpu.values()), 2),
+                        'frame_format_p95_ms': build.get('p95_ms')})
+
+    for agent in agents:
+        agent.sender.close()
+    if aggregator is not None:
+        aggregator.shutdown()
+
+    for name, value in results.items():
+        print(f'{name:24} {value}')
+    if args.output:
+        with open(args.output, 'w') as file_out_handle:
+            json.dump(results, file_out_handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+"""
+Benchmark suite of the collection and render pipeline, runs headless with the offscreen Qt platform.
+
+    python benchmarks/run_all.py [--sizes small medium huge] [--iterations 300] [--cpu-seconds 20]
+                                 [--output results.json] [--compare baseline.json] [--tolerance 0.25]
+
+Per LHM tree size (benchmarks/fixtures/lhm_<size>.json):
+    fetch    GET of data.json from a local stub LHM server, over a keep-alive session
+    parse    json.loads of the response body
+    extract  LHMSensorReader.read() of the parsed tree
+Per frame, fed by a synthetic psutil-like backend (--disks and --nics devices):
+    io       IO_rates_updater, counters to rates
+    format   FrameBuilder.format_rows
+    color    FrameBuilder.cell_colors
+    build    FrameBuilder.build of the default 4x4 layout, and of the layout suggested for the synthetic disks
+             (build_suggested, one row per disk)
+    render   StatsGrid.update_cells and a synchronous repaint
+For each stage: median and p95 latency, and the bytes allocated per call (tracemalloc peak).
+Steady state: CPU usage of the full app (main.py) and of headless.py, measured as subprocesses.
+
+The results are written as JSON; --compare flags every value that grew by more than --tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from threading import Thread
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import psutil
+import requests
+from PySide6 import __version__ as pyside_version
+from PySide6.QtWidgets import QApplication
+
+from hwstats.backends.base import (SensorBackend,
+                                   SENSOR_KEYS)
+from hwstats.collector import (FrameBuilder,
+                               StatsCollector,
+                               IO_rates_updater,
+                               sensors_updater,
+                               CPU_usage_updater)
+from hwstats.layout import (DEFAULT_LAYOUT,
+                            suggest_layout)
+from hwstats.lhm_index import (LHMSensorReader,
+                               LHM_SENSORS)
+from hwstats.lifecycle import Lifecycle
+from hwstats.rates import RateEngine
+from hwstats.widgets import StatsGrid
+from lhm_stub_harness import StubLHMServer
+from lhm_tree import (load_or_make_tree,
+                      TREE_SIZES)
+
+# lower is better for every reported value
+COMPARED_METRICS = ('median_us', 'p95_us', 'alloc_bytes', 'cpu_percent')
+
+
+class SyntheticBackend(SensorBackend):
+    """
+    Deterministic stand-in for psutil and the sensors: random but plausible readings and ever growing counters.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, disks: int, nics: int, seed: int = 0):
+        self._random = random.Random(seed)
+        self._disks = {f'disk{index}': [0, 0, 0] for index in range(disks)}
+        self._nics = {f'eth{index}': [0, 0] for index in range(nics)}
+
+    def read(self):
+        return {key: self._random.uniform(30, 95) if key.endswith('_temp') else self._random.uniform(0, 100)
+                for key in SENSOR_KEYS}
+
+    def read_io_counters(self):
+        for counters in self._disks.values():
+            counters[0] += self._random.randrange(0, 200 * 1024 ** 2)
+            counters[1] += self._random.randrange(0, 200 * 1024 ** 2)
+            counters[2] += self._random.randrange(0, 500)
+        for counters in self._nics.values():
+            counters[0] += self._random.randrange(0, 10 * 1024 ** 2)
+            counters[1] += self._random.randrange(0, 100 * 1024 ** 2)
+        return ({disk: tuple(counters) for disk, counters in self._disks.items()},
+                {nic: tuple(counters) for nic, counters in self._nics.items()})
+
+
+class SyntheticCpuSampler:
+    def __init__(self, cores: int, seed: int = 0):
+        self._random = random.Random(seed)
+        self._cores = cores
+
+    def sample(self):
+        per_core = [round(self._random.uniform(0, 100), 1) for _ in range(self._cores)]
+        return round(sum(per_core) / len(per_core), 1), per_core
+
+
+def measure(function, iterations):
+    """
+    Latency percentiles of function(), then its allocations in a second pass, not to slow down the timed one.
+    """
+    function()  # warm up the caches
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        function()
+        durations.append(time.perf_counter_ns() - start)
+    durations.sort()
+
+    allocations = []
+    tracemalloc.start()
+    for _ in range(min(iterations, 50)):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        function()
+        allocations.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    return {'median_us': round(durations[len(durations) // 2] / 1000, 2),
+            'p95_us': round(durations[int(len(durations) * 0.95)] / 1000, 2),
+            'alloc_bytes': int(statistics.median(allocations))}
+
+
+def bench_lhm(size, iterations):
+    # the recorded fixture as served by LHM
+    body = json.dumps(load_or_make_tree(None, size), ensure_ascii=False).encode('utf-8')
+
+    server = StubLHMServer(body)
+    Thread(target=server.serve_forever, daemon=True).start()
+    session = requests.Session()
+    url = f'http://127.0.0.1:{server.server_address[1]}/data.json'
+
+    data = json.loads(body)
+    reader = LHMSensorReader(LHM_SENSORS)
+    results = {f'{size}/fetch': measure(lambda: session.get(url).content, iterations),
+               f'{size}/parse': measure(lambda: json.loads(body), iterations),
+               f'{size}/extract': measure(lambda: reader.read(data), iterations)}
+
+    session.close()
+    server.shutdown()
+    server.server_close()
+    return results
+
+
+def bench_frame(iterations, cores, disks, nics):
+    lifecycle = Lifecycle(REPO_ROOT)
+    backend = SyntheticBackend(disks, nics)
+    # a fixed layout: building the frames would otherwise switch to the one suggested for the synthetic hardware
+    collector = StatsCollector(lifecycle, sensor_backend=backend, layout=DEFAULT_LAYOUT)
+    store = collector.store
+    cpu_sampler = SyntheticCpuSampler(cores)
+    disk_rates = RateEngine()
+    nic_rates = RateEngine()
+
+    def sample():
+        CPU_usage_updater(store, cpu_sampler)
+        sensors_updater(store, backend)
+        IO_rates_updater(store, collector.histories, backend, disk_rates, nic_rates)
+        store.publish(ram_usage=round(random.uniform(4, 30), 1), ram_total=32.0)
+
+    # a ring of varied snapshots and of the frames built from them, as the UI task would
+    snapshots = []
+    frames = []
+    for _ in range(64):
+        sample()
+        snapshots.append(store.current)
+        frames.append(collector.build_frame(store.current))
+
+    suggested = FrameBuilder(collector.histories, suggest_layout(store.current, backend.discover()))
+
+    grid = StatsGrid(4, 4)
+    grid.show()
+    QApplication.processEvents()
+
+    counter = iter(range(10 ** 9))
+
+    def render():
+        grid.update_cells(*frames[next(counter) % len(frames)])
+        grid.repaint()
+
+    results = {'frame/io': measure(lambda: IO_rates_updater(store, collector.histories, backend,
+                                                            disk_rates, nic_rates), iterations),
+               'frame/format': measure(lambda: collector.frames.format_rows(snapshots[next(counter) % len(snapshots)]),
+                                       iterations),
+               'frame/color': measure(lambda: collector.frames.cell_colors(snapshots[next(counter) % len(snapshots)]),
+                                      iterations),
+               'frame/build': measure(lambda: collector.frames.build(snapshots[next(counter) % len(snapshots)],
+                                                                     time.time()), iterations),
+               'frame/build_suggested': measure(lambda: suggested.build(snapshots[next(counter) % len(snapshots)],
+                                                                        time.time()), iterations),
+               'frame/render': measure(render, iterations)}
+    grid.close()
+    return results
+
+
+def bench_app_cpu(command, seconds, warmup=3):
+    """
+    CPU usage (in % of one core) of the app running as a subprocess, after warmup seconds.
+    """
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    process = subprocess.Popen([sys.executable] + command, cwd=REPO_ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        time.sleep(warmup)
+        monitored = psutil.Process(process.pid)
+        start_cpu = sum(monitored.cpu_times()[:2])
+        start = time.monotonic()
+        time.sleep(seconds)
+        cpu = sum(monitored.cpu_times()[:2]) - start_cpu
+        wall = time.monotonic() - start
+    finally:
+        process.terminate()
+        process.wait(10)
+    return {'cpu_percent': round(cpu / wall * 100, 2)}
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print the relative change of every value present in both runs; return the number of regressions.
+    """
+    regressions = 0
+    for name in sorted(results):
+        for metric in COMPARED_METRICS:
+            new = results[name].get(metric)
+            old = baseline.get(name, {}).get(metric)
+            if new is None or old is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            regressed = change > tolerance
+            regressions += regressed
+            print(f'{name:16} {metric:12} {old:12.2f} -> {new:12.2f} {change:+8.1%}{"  REGRESSION" if regressed else ""}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=list(TREE_SIZES), choices=list(TREE_SIZES))
+    parser.add_argument('--iterations', type=int, default=300)
+    parser.add_argument('--cores', type=int, default=16)
+    parser.add_argument('--disks', type=int, default=4)
+    parser.add_argument('--nics', type=int, default=4)
+    parser.add_argument('--cpu-seconds', type=float, default=20, help='0 to skip the steady state measurements')
+    parser.add_argument('--output', help='JSON file to write the results to')
+    parser.add_argument('--compare', metavar='BASELINE', help='results JSON of a previous run')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='relative growth reported as a regression')
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+
+    results = {}
+    for size in args.sizes:
+        results.update(bench_lhm(size, args.iterations))
+    results.update(bench_frame(args.iterations, args.cores, args.disks, args.nics))
+    if args.cpu_seconds > 0:
+        results['app/gui'] = bench_app_cpu(['main.py'], args.cpu_seconds)
+        results['app/headless'] = bench_app_cpu(['headless.py', '--port', '0'], args.cpu_seconds)
+
+    for name, values in results.items():
+        print(f'{name:16} ' + '  '.join(f'{metric} {value}' for metric, value in values.items()))
+
+    if args.output:
+        report = {'meta': {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                           'python': platform.python_version(),
+                           'platform': platform.platform(),
+                           'pyside': pyside_version,
+                           'cpu_count': os.cpu_count(),
+                           'iterations': args.iterations},
+                  'results': results}
+        with open(args.output, 'w') as file_out_handle:
+            json.dump(report, file_out_handle, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as file_in_handle:
+            baseline = json.load(file_in_handle)['results']
+        print()
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Runs the samplers without any GUI and serves the stats over HTTP:
+
+    python headless.py [--host 0.0.0.0] [--port 9585] [--record DIR] [--instrument]
+
+    /metrics           OpenMetrics text, for Prometheus compatible scrapers
+    /snapshot.json     the latest snapshot
+    /history.json      the throughput histories
+    /diagnostics.json  timings and tick counters of the app itself (filled with --instrument)
+
+or as an agent, pushing the stats to an aggregator (python main.py --aggregate) instead of serving them:
+
+    python headless.py --agent HOST[:PORT] [--transport udp|tcp] [--name NAME]
+"""
+
+import argparse
+import signal
+
+from hwstats.collector import (StatsCollector,
+                               UI_REFRESH_INTERVAL)
+from hwstats.exporter import MetricsExporter
+from hwstats.instrumentation import INSTRUMENTATION
+from hwstats.lifecycle import Lifecycle
+from hwstats.wire import (AgentSender,
+                          parse_address)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on, 0.0.0.0 for all the interfaces')
+    parser.add_argument('--port', type=int, default=9585)
+    parser.add_argument('--record', metavar='DIR', help='also record the stats to this folder')
+    parser.add_argument('--instrument', action='store_true', help='measure the hot paths of the app itself')
+    parser.add_argument('--agent', metavar='HOST[:PORT]', help='push the stats to this aggregator, no HTTP server')
+    parser.add_argument('--transport', choices=('udp', 'tcp'), default='udp', help='transport of the agent frames')
+    parser.add_argument('--name', help='host name sent by the agent, the machine name by default')
+    args = parser.parse_args()
+
+    if args.instrument:
+        INSTRUMENTATION.enabled = True
+
+    lifecycle = Lifecycle()
+    collector = StatsCollector(lifecycle, record_directory=args.record)
+    exporter = None
+    sender = None
+    if args.agent:
+        sender = AgentSender(collector.store, parse_address(args.agent), args.name, args.transport)
+        # one frame per GUI refresh; a TCP send can block, it runs on the worker pool
+        collector.scheduler.add_task('agent', sender.send, UI_REFRESH_INTERVAL, blocking=args.transport == 'tcp')
+    else:
+        exporter = MetricsExporter(collector.store, collector.histories, args.host, args.port, collector.scheduler)
+        # the bodies are rendered at the pace the GUI would refresh, whatever the number of scrapers
+        collector.scheduler.add_task('exporter', exporter.refresh, UI_REFRESH_INTERVAL)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: lifecycle.stop())
+
+    collector.start()
+    if exporter is not None:
+        exporter.start()
+        host, port = exporter.address[:2]
+        print(f'serving http://{host}:{port}/metrics')
+    else:
+        host, port = sender.address
+        print(f'sending to {host}:{port} over {sender.transport}')
+
+    try:
+        while not lifecycle.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if exporter is not None:
+            exporter.shutdown()
+        collector.shutdown()
+        if sender is not None:
+            sender.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+"""
+Internals of pyFloatingHardwareStats.
+Only hwstats.widgets and hwstats.updaters depend on Qt, the collection modules can run headless.
+"""
@@ -0,0 +1,110 @@
+from threading import Lock
+from time import monotonic
+
+
+def scaled_interval(interval: float, scale: float, max_interval: float = None):
+    """
+    interval times scale, capped to max_interval unless interval is already longer.
+    """
+    scaled = interval * scale
+    if max_interval is not None:
+        scaled = min(scaled, max(interval, max_interval))
+    return scaled
+
+
+class RatePolicy:
+    """
+    How much the sampling and repainting slow down, and when they go back to full rate.
+    """
+
+    def __init__(self,
+                 hidden_factor: float = 8,
+                 stable_factor: float = 4,
+                 stable_after: float = 30,
+                 change_steps: int = 2,
+                 interaction_hold: float = 15,
+                 max_interval: float = 10):
+        self.hidden_factor = hidden_factor  # interval multiplier while the window is not exposed
+        self.stable_factor = stable_factor  # interval multiplier while no metric moved significantly
+        self.stable_after = stable_after  # seconds without a significant change before the metrics count as stable
+        self.change_steps = change_steps  # a move of that many color gradient steps in any cell is significant
+        self.interaction_hold = interaction_hold  # seconds at full rate after a user interaction
+        self.max_interval = max_interval  # no task interval is stretched beyond that (in seconds)
+
+
+class AdaptiveRateController:
+    """
+    Scales the intervals of the SamplingScheduler (and through on_scale_changed, the window timers):
+    full rate while the user interacts with the window or the metrics move,
+    slower while the metrics are stable and/or the window is not exposed (covered, minimized, locked session).
+    A significant change, an interaction or the window becoming visible again snaps back to full rate at once.
+    """
+
+    def __init__(self, scheduler, policy: RatePolicy = None, on_scale_changed=None):
+        self.policy = policy or RatePolicy()
+        self._scheduler = scheduler
+        self._on_scale_changed = on_scale_changed
+        self._lock = Lock()
+
+        self.scale = 1.0
+        self.visible = True
+        self._reference_steps = None
+        self._last_change = monotonic()
+        self._interaction_until = 0.0
+
+    @property
+    def stable(self):
+        return monotonic() - self._last_change >= self.policy.stable_after
+
+    def set_visible(self, visible: bool):
+        if visible == self.visible:
+            return
+        self.visible = visible
+        if visible:
+            # the user is looking again
+            self._last_change = monotonic()
+        self._update()
+
+    def notify_interaction(self):
+        self._interaction_until = monotonic() + self.policy.interaction_hold
+        self._update()
+
+    def observe(self, steps):
+        """
+        Feed the color steps matrix of each new frame; the metrics are stable while no cell moves
+        change_steps steps or more away from the frame of the last significant change.
+        The uncolored cells (None steps) are ignored.
+        """
+        flat_steps = [step for row in steps for step in row if step is not None]
+        reference = self._reference_steps
+        if reference is None or len(reference) != len(flat_steps) or \
+                any(abs(step - reference_step) >= self.policy.change_steps
+                    for step, reference_step in zip(flat_steps, reference)):
+            self._reference_steps = flat_steps
+            self._last_change = monotonic()
+        self._update()
+
+    def _update(self):
+        policy = self.policy
+        # observe() runs on the stats thread, set_visible() and notify_interaction() on the GUI thread: the scale is
+        # computed and handed to the scheduler and the timers under the lock so that they end up on the latest one
+        with self._lock:
+            scale = 1.0
+            if monotonic() >= self._interaction_until:
+                if not self.visible:
+                    scale *= policy.hidden_factor
+                if self.stable:
+                    scale *= policy.stable_factor
+
+            if scale == self.scale:
+                return
+            self.scale = scale
+            self._scheduler.set_interval_scale(scale, policy.max_interval)
+            if self._on_scale_changed is not None:
+                self._on_scale_changed(scale)
+
+    def report(self):
+        return {'scale': self.scale,
+                'visible': self.visible,
+                'stable': self.stable,
+                'interacting': monotonic() < self._interaction_until}
@@ -0,0 +1,206 @@
+import asyncio
+from threading import Thread
+from time import (monotonic,
+                  time)
+
+from hwstats.collector import (HISTORY_KEYS,
+                               FrameBuilder,
+                               make_histories)
+from hwstats.lifecycle import Lifecycle
+from hwstats.scheduler import SamplingScheduler
+from hwstats.snapshot import Snapshot
+from hwstats.wire import (AGGREGATOR_PORT,
+                          TCP_LENGTH,
+                          Frame,
+                          decode_frame)
+
+# per host throughput history used to scale the colors: 10 minutes at 2 frames per second;
+# shorter than on a single machine, it is kept for hundreds of hosts
+AGGREGATE_HISTORY_CAPACITY = 1200
+
+
+class HostState:
+    """
+    Latest snapshot and histories of one agent, rebuilt from its frames.
+    The last_good times are the reception times of the frames refreshing each field, so the staleness of
+    the cells does not depend on the clock of the agent, and a silent agent fades out like a failed sensor.
+    """
+
+    def __init__(self, name: str, address):
+        self.name = name
+        self.address = address
+        self.snapshot = Snapshot()
+        self.histories = make_histories(AGGREGATE_HISTORY_CAPACITY)
+        # the frames only carry the fields of the default layout
+        self.frames = FrameBuilder(self.histories, history_capacity=AGGREGATE_HISTORY_CAPACITY)
+
+        self.frames_received = 0
+        self.frames_lost = 0
+        self.last_seen = 0.0  # monotonic time of the last frame
+        self._last_sequence = None
+
+    def apply(self, frame: Frame, address, now: float):
+        if self._last_sequence is not None:
+            gap = (frame.sequence - self._last_sequence - 1) & 0xFFFFFFFF
+            if gap < 0x80000000:
+                self.frames_lost += gap
+            elif not frame.keyframe:
+                return  # reordered datagram, older than what was already applied
+        self._last_sequence = frame.sequence
+        self.address = address
+        self.frames_received += 1
+        self.last_seen = monotonic()
+
+        changes = dict(frame.values)
+        if frame.cores is not None:
+            changes['cpu_per_core_percent'] = frame.cores
+        changes['timestamp'] = frame.timestamp
+        if frame.fresh:
+            last_good = self.snapshot.last_good.copy()
+            for field in frame.fresh:
+                last_good[field] = now
+            changes['last_good'] = last_good
+        # a single reference swap, like SnapshotStore.publish()
+        self.snapshot = snapshot = self.snapshot.replace(**changes)
+
+        for key in HISTORY_KEYS:
+            if key in frame.fresh:
+                self.histories[key].append(getattr(snapshot, key))
+
+    def build_frame(self, now: float):
+        """
+        The (rows, colors, changed, stale) frame of the host, None if nothing changed since the previous one.
+        Also built without a new snapshot, the cells of a silent host have to turn stale.
+        """
+        rows, colors, changed, stale = self.frames.build(self.snapshot, now)
+        if not any(any(row) for row in changed):
+            return None
+        return rows, colors, changed, stale
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, aggregator):
+        self.aggregator = aggregator
+
+    def datagram_received(self, data, address):
+        self.aggregator.receive(data, address)
+
+
+class Aggregator:
+    """
+    Receives the frames of many agents (see hwstats.wire) on one asyncio loop, over UDP and TCP on the same port,
+    and keeps the latest state and histories of each host.
+    The loop runs in its own thread; the frames for the GUI are built by a task of the scheduler,
+    so a burst of frames never delays the repaints and the other way around.
+    """
+
+    def __init__(self, lifecycle: Lifecycle, host: str = '0.0.0.0', port: int = AGGREGATOR_PORT):
+        self.lifecycle = lifecycle
+        self.scheduler = SamplingScheduler(lifecycle)
+        self.host = host
+        self.port = port
+
+        self.hosts = {}  # {host name: HostState}, in order of appearance
+        self.invalid_frames = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = None
+        self._transport = None
+        self._server = None
+        self._connections = set()
+
+    @property
+    def address(self):
+        # the bound (host, port), once started
+        return self._transport.get_extra_info('sockname')[:2]
+
+    def receive(self, data: bytes, address):
+        try:
+            frame = decode_frame(data)
+        except ValueError:
+            self.invalid_frames += 1
+            return
+        state = self.hosts.get(frame.host)
+        if state is None:
+            state = self.hosts[frame.host] = HostState(frame.host, address)
+        state.apply(frame, address, time())
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        address = writer.get_extra_info('peername')
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                length, = TCP_LENGTH.unpack(await reader.readexactly(TCP_LENGTH.size))
+                self.receive(await reader.readexactly(length), address)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            self._connections.discard(task)
+
+    async def _serve(self):
+        self._transport, _ = await self._loop.create_datagram_endpoint(lambda: _DatagramProtocol(self),
+                                                                       local_addr=(self.host, self.port))
+        # the TCP agents use the port the UDP socket got, also when it was picked by the system
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.address[1])
+
+    async def _close(self):
+        self._transport.close()
+        self._server.close()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        self._loop.stop()
+
+    def start(self):
+        self._loop.run_until_complete(self._serve())
+        self._thread = Thread(target=self._loop.run_forever, name='aggregator', daemon=True)
+        self._thread.start()
+        self.lifecycle.on_stop(lambda: asyncio.run_coroutine_threadsafe(self._close(), self._loop))
+        self.scheduler.start()
+
+    def shutdown(self):
+        # wake up the scheduler and the loop, and wait for both
+        self.lifecycle.stop()
+        self.scheduler.join()
+        if self._thread is not None:
+            self._thread.join()
+        self._loop.close()
+
+    def build_frames(self):
+        """
+        [(host name, rows, colors, changed, stale)] of the hosts whose frame changed since the previous call.
+        """
+        now = time()
+        frames = []
+        for state in list(self.hosts.values()):
+            frame = state.build_frame(now)
+            if frame is not None:
+                frames.append((state.name,) + frame)
+        return frames
+
+    def cell_history(self, host: str, row: int, column: int):
+        """
+        The tooltip text of a cell of a host grid.
+        """
+        state = self.hosts[host]
+        cell = state.frames.cell(row, column)
+        if cell is None:
+            return ''
+        lines = [f'{host} ({state.address[0]}): {cell.label}',
+                 f'last frame {monotonic() - state.last_seen:.1f}s ago, '
+                 f'{state.frames_received} received, {state.frames_lost} lost']
+        history = state.histories.get(cell.selector)
+        if history is not None and len(history) > 1:
+            lines.append(f'max {history.max():.2f} over the last {len(history)} samples')
+        return '\n'.join(lines)
+
+    def report(self):
+        now = monotonic()
+        return {'invalid_frames': self.invalid_frames,
+                'hosts': {name: {'address': f'{state.address[0]}:{state.address[1]}',
+                                 'received': state.frames_received,
+                                 'lost': state.frames_lost,
+                                 'silent_for_s': round(now - state.last_seen, 1)}
+                          for name, state in list(self.hosts.items())}}
@@ -0,0 +1,23 @@
+"""
+Sensor backends: where the temperatures, GPU loads and disk/network stats come from.
+"""
+
+import sys
+
+from hwstats.backends.base import (DiscoveredSensor,
+                                   SensorBackend,
+                                   SENSOR_KEYS,
+                                   SensorsUnavailable,
+                                   empty_readings)
+
+
+def select_backend():
+    """
+    The native backend of the current platform.
+    """
+    if sys.platform.startswith('linux'):
+        from hwstats.backends.linux import LinuxSysfsBackend
+        return LinuxSysfsBackend()
+
+    from hwstats.backends.lhm import LibreHardwareMonitorBackend
+    return LibreHardwareMonitorBackend()
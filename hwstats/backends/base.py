@@ -0,0 +1,109 @@
+import psutil
+
+# the readings a sensor backend can provide; temperatures are in °C, loads in %
+SENSOR_KEYS = ('CPU_temp', 'iGPU_temp', 'iGPU_usage', 'dGPU_temp', 'dGPU_usage',
+               'disk1_activity', 'disk2_activity')
+
+
+class SensorsUnavailable(Exception):
+    """
+    Raised by SensorBackend.read() while the source is known to be down and is not polled, the last values stay.
+    """
+
+
+class DiscoveredSensor:
+    """
+    One sensor found by SensorBackend.discover(), a candidate for the cells of a layout (see hwstats.layout).
+    """
+    __slots__ = ('sensor_id', 'kind', 'name', 'device', 'device_type')
+
+    def __init__(self, sensor_id: str, kind: str, name: str, device: str, device_type: str):
+        self.sensor_id = sensor_id  # stable identifier, selected with 'sensor:<sensor_id>'
+        self.kind = kind  # 'temperature' (°C) or 'load' (%)
+        self.name = name  # ex: 'GPU Core', 'edge'
+        self.device = device  # the device it belongs to, the sensors of one device share it
+        self.device_type = device_type  # 'cpu', 'gpu', 'igpu' (integrated GPU), 'disk' or 'other'
+
+    def __repr__(self):
+        return f'DiscoveredSensor({self.sensor_id!r}, {self.kind!r}, {self.name!r}, {self.device_type!r})'
+
+
+def empty_readings(keys=SENSOR_KEYS):
+    return {key: 0 for key in keys}
+
+
+# the interfaces that carry traffic already counted on a physical one (or none at all): Hyper-V virtual switches,
+# VM host-only networks, VPN tunnels, bridges, Windows tunneling adapters and Wi-Fi Direct virtual adapters,
+# and their macOS/BSD counterparts
+VIRTUAL_NIC_PREFIXES = ('vEthernet', 'VirtualBox', 'VMware', 'Npcap', 'Network Bridge', 'Local Area Connection*',
+                        'isatap', 'Teredo', 'TAP-', 'OpenVPN', 'WireGuard', 'Tailscale', 'ZeroTier', 'NordLynx',
+                        'utun', 'tun', 'tap', 'bridge', 'awdl', 'llw', 'gif', 'stf', 'anpi', 'vmnet')
+
+
+def is_loopback_nic(name: str):
+    return name == 'lo' or name.startswith('Loopback')
+
+
+def is_virtual_nic(name: str):
+    return is_loopback_nic(name) or name.startswith(VIRTUAL_NIC_PREFIXES)
+
+
+class SensorBackend:
+    """
+    Source of the hardware sensors that psutil does not cover (temperatures, GPU load, disk activity ...)
+    and of the cumulative disk/network counters the throughputs are computed from.
+    A backend is polled by the sampling scheduler through read(); it may keep any state between polls.
+    """
+
+    name = 'base'
+    # True if read() can block for a noticeable time (ex: network requests),
+    # such backends are polled from the scheduler's worker pool
+    blocking = False
+    # the SENSOR_KEYS returned by read()
+    provided_keys = SENSOR_KEYS
+
+    def read(self):
+        """
+        Return a dict with a value for each of provided_keys, and the {sensor id: value} of the watched sensors
+        under 'sensors' if any; raise an exception when the sensors cannot be read
+        (SensorsUnavailable when the backend skips the poll on purpose).
+        """
+        raise NotImplementedError
+
+    def discover(self):
+        """
+        Return the DiscoveredSensor of every temperature and load this backend can read.
+        Backends finding them in the polled data return an empty list until their first successful read().
+        """
+        return []
+
+    def watch(self, sensor_ids):
+        """
+        Also read these sensors (DiscoveredSensor.sensor_id) on each poll, see read().
+        Unknown sensors read as 0. Called on the scheduler thread, possibly while a blocking read() runs on a worker.
+        """
+
+    def disk_activity(self):
+        """
+        Return the {disk: activity in %} of the last read(), keyed like read_io_counters(), for the disks whose
+        counters do not tell their busy time; the disks the backend cannot match to a disk of the counters
+        are left out. Empty while the backend is down.
+        """
+        return {}
+
+    def read_io_counters(self):
+        """
+        Return the cumulative counters of all the disks and network interfaces, discovered on each call:
+        ({disk: (bytes read, bytes written, busy milliseconds or None)}, {nic: (bytes sent, bytes received)}).
+        The default implementation makes one batched psutil call for each kind of device and leaves out the virtual
+        network interfaces, whose traffic would be counted twice in the network speeds.
+        """
+        disks = {disk: (counters.read_bytes, counters.write_bytes, getattr(counters, 'busy_time', None))
+                 for disk, counters in (psutil.disk_io_counters(perdisk=True) or {}).items()}
+        nics = {nic: (counters.bytes_sent, counters.bytes_recv)
+                for nic, counters in (psutil.net_io_counters(pernic=True) or {}).items()
+                if not is_virtual_nic(nic)}
+        return disks, nics
+
+    def close(self):
+        pass
@@ -0,0 +1,49 @@
+from time import monotonic
+
+
+class CircuitBreaker:
+    """
+    Stops polling an unreachable sensor source instead of blocking on it every poll.
+    After failure_threshold consecutive failures the circuit opens: no request is made until the retry delay
+    has passed, then a single trial request is allowed (half-open). Each failed trial doubles the delay,
+    up to max_delay; any success closes the circuit again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int = 3, base_delay: float = 2, max_delay: float = 60):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.state = self.CLOSED
+        self.failures = 0  # consecutive
+        self.retry_at = 0.0
+
+    @property
+    def retry_delay(self):
+        return min(self.max_delay, self.base_delay * 2 ** max(0, self.failures - self.failure_threshold))
+
+    def allow(self, now: float = None):
+        """
+        True if a request can be made now.
+        """
+        if self.state == self.CLOSED:
+            return True
+        now = monotonic() if now is None else now
+        if now >= self.retry_at:
+            self.state = self.HALF_OPEN
+            return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self, now: float = None):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.retry_at = (monotonic() if now is None else now) + self.retry_delay
@@ -0,0 +1,188 @@
+from threading import Lock
+
+from hwstats.backends.base import (DiscoveredSensor,
+                                   SensorBackend,
+                                   SensorsUnavailable,
+                                   empty_readings)
+from hwstats.backends.circuit_breaker import CircuitBreaker
+from hwstats.instrumentation import INSTRUMENTATION
+from hwstats.lhm_index import (LHMSensorIndex,
+                               LHMSensorReader,
+                               LHM_SENSORS,
+                               SensorSelector,
+                               topology_signature)
+
+LIBRE_HARDWARE_MONITOR_PORT = 8085
+# LHM runs on the same machine, a connection that takes longer than this is not coming
+CONNECT_TIMEOUT = 1
+
+# the sensor types offered by discover(), with their DiscoveredSensor kind
+DISCOVERED_TYPES = {'Temperature': 'temperature', 'Load': 'load'}
+# the load sensor of a storage hardware reported by disk_activity()
+DISK_ACTIVITY_SENSOR = 'Total Activity'
+
+
+def hardware_type(hardware_id: str):
+    """
+    The DiscoveredSensor.device_type of a LibreHardwareMonitor HardwareId (ex: '/gpu-amd/0', '/amdcpu/0', '/nvme/1').
+    """
+    kind = hardware_id.split('/')[1] if hardware_id.count('/') > 1 else ''
+    if kind.startswith('gpu'):
+        return 'igpu' if 'integrated' in kind else 'gpu'
+    if kind.endswith('cpu'):
+        return 'cpu'
+    if kind in ('hdd', 'ssd', 'nvme', 'storage'):
+        return 'disk'
+    return 'other'
+
+
+def windows_disk_name(hardware_id: str):
+    """
+    The psutil name of the disk of a LibreHardwareMonitor storage HardwareId, None for another hardware:
+    LHM numbers its storage hardware (ex: '/nvme/1') like Windows numbers its physical drives ('PhysicalDrive1').
+    """
+    index = hardware_id.rsplit('/', 1)[-1]
+    if hardware_type(hardware_id) != 'disk' or not index.isdigit():
+        return None
+    return f'PhysicalDrive{index}'
+
+
+class LibreHardwareMonitorBackend(SensorBackend):
+    """
+    Use LibreHardwareMonitor's web server JSON endpoint: 127.0.0.1:<port>/data.json.
+    The sensors are located once in the JSON tree and re-located only when the hardware topology changes.
+    The disk/network throughputs come from psutil's counters (see SensorBackend.read_io_counters),
+    the activity of each disk from its LHM storage hardware (see windows_disk_name()).
+    All the polls share one keep-alive connection, and ask for a compressed or a 304 Not Modified response
+    when the server supports it. While LHM is down, a CircuitBreaker spaces out the polls exponentially.
+    """
+
+    name = 'LibreHardwareMonitor'
+    blocking = True
+    # the disk activities are reported by disk_activity()
+    provided_keys = ('CPU_temp', 'iGPU_temp', 'iGPU_usage', 'dGPU_temp', 'dGPU_usage')
+
+    def __init__(self, port: int = LIBRE_HARDWARE_MONITOR_PORT, host: str = '127.0.0.1', timeout: float = 5):
+        self.url = f'http://{host}:{port}/data.json'
+        self.timeout = timeout
+        # (reader, watched sensor ids, {disk: SensorId of its activity}, topology signature), replaced under
+        # _reading_lock: by watch() on the scheduler thread and by read() on a worker when the topology changes
+        self._reading_lock = Lock()
+        self._reading = self._make_reading((), None)
+        # {disk: activity} of the last successful read()
+        self._disk_activity = {}
+
+        # created by the first poll, on a worker thread, so that importing requests does not delay the startup
+        self._session = None
+        self.breaker = CircuitBreaker()
+
+        # the validators of the last response, and its data reused on a 304
+        self._conditional_headers = {}
+        self._data = None
+
+    def _fetch(self):
+        if self._session is None:
+            import requests
+            # requests already asks for gzip/deflate and decompresses transparently
+            self._session = requests.Session()
+        with INSTRUMENTATION.span('LHM fetch'):
+            response = self._session.get(self.url, headers=self._conditional_headers,
+                                         timeout=(min(CONNECT_TIMEOUT, self.timeout), self.timeout))
+        if response.status_code == 304 and self._data is not None:
+            return self._data
+        response.raise_for_status()  # Raise exception for bad status codes
+        with INSTRUMENTATION.span('LHM decode'):
+            self._data = response.json()
+
+        self._conditional_headers = {}
+        if 'ETag' in response.headers:
+            self._conditional_headers['If-None-Match'] = response.headers['ETag']
+        if 'Last-Modified' in response.headers:
+            self._conditional_headers['If-Modified-Since'] = response.headers['Last-Modified']
+        return self._data
+
+    def read(self):
+        if not self.breaker.allow():
+            self._disk_activity = {}
+            raise SensorsUnavailable(f'{self.url} is down, next try in {self.breaker.retry_delay:.0f}s')
+
+        # Make HTTP request to LibreHardwareMonitor web server
+        try:
+            data = self._fetch()
+        except Exception:
+            self._disk_activity = {}
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+
+        with self._reading_lock:
+            if self._reading[3] != topology_signature(data):
+                self._reading = self._make_reading(self._reading[1], data)
+            reader, watched, disk_sensors, _ = self._reading
+
+        # all the sensors are read through the cached paths of the reader
+        with INSTRUMENTATION.span('LHM extract'):
+            values = reader.read(data)
+
+        readings = empty_readings(self.provided_keys)
+        for key in ('CPU_temp', 'dGPU_temp', 'dGPU_usage', 'iGPU_usage'):
+            readings[key] = values[key]
+        self._disk_activity = {disk: round(values.get(sensor_id, 0), 2) for disk, sensor_id in disk_sensors.items()}
+
+        # Integrated GPU temperature - fallback to CPU temperature
+        readings['iGPU_temp'] = readings['CPU_temp']
+        if watched:
+            readings['sensors'] = {sensor_id: values.get(sensor_id, 0) for sensor_id in watched}
+        return readings
+
+    def discover(self):
+        if self._data is None:
+            return []
+        index = LHMSensorIndex(self._data)
+        discovered = []
+        for sensor_type, kind in DISCOVERED_TYPES.items():
+            for _, node, hardware_text in index.by_type.get(sensor_type, ()):
+                sensor_id = node.get('SensorId')
+                if sensor_id is None:
+                    continue
+                # the SensorId is the HardwareId followed by /<type>/<index>
+                hardware_id = sensor_id.rsplit('/', 2)[0]
+                discovered.append(DiscoveredSensor(sensor_id, kind, node.get('Text', ''), hardware_text or hardware_id,
+                                                   hardware_type(hardware_id)))
+        return discovered
+
+    def watch(self, sensor_ids):
+        with self._reading_lock:
+            self._reading = self._make_reading(tuple(sensor_ids), self._data)
+
+    @staticmethod
+    def _make_reading(watched, data):
+        # the watched sensors and the disk activities are read through the same cached paths as the app's own
+        # metrics, the SensorIds never collide with the metric names
+        disk_sensors = {}
+        index = LHMSensorIndex(data) if data is not None else None
+        if index is not None:
+            for _, node, _ in index.by_type.get('Load', ()):
+                sensor_id = node.get('SensorId')
+                if sensor_id is None or DISK_ACTIVITY_SENSOR not in node.get('Text', ''):
+                    continue
+                # the SensorId is the HardwareId followed by /<type>/<index>
+                disk = windows_disk_name(sensor_id.rsplit('/', 2)[0])
+                if disk is not None:
+                    disk_sensors.setdefault(disk, sensor_id)
+
+        sensors = dict(LHM_SENSORS)
+        for sensor_id in (*watched, *disk_sensors.values()):
+            sensors[sensor_id] = [SensorSelector(None, '', sensor_id=sensor_id)]
+        reader = LHMSensorReader(sensors)
+        if index is not None:
+            # the tree is only walked once, the reader resolves its paths through the same index
+            reader.resolve(data, index)
+        return reader, watched, disk_sensors, topology_signature(data) if data is not None else None
+
+    def disk_activity(self):
+        return self._disk_activity
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
@@ -0,0 +1,293 @@
+import glob
+import os
+
+from hwstats.backends.base import (DiscoveredSensor,
+                                   SensorBackend,
+                                   empty_readings)
+
+# hwmon chips holding the CPU temperature, in priority order, with the preferred sensor labels
+# None means the first temperature input of the chip
+CPU_TEMPERATURE_CHIPS = (('coretemp', ('Package id 0',)),
+                         ('k10temp', ('Tctl', 'Tdie')),
+                         ('zenpower', ('Tdie', 'Tctl')),
+                         ('cpu_thermal', None),
+                         ('acpitz', None))
+DGPU_TEMPERATURE_CHIPS = (('amdgpu', ('edge',)),
+                          ('nouveau', None))
+
+# device types of the discovered hwmon chips, the other chips are 'other'
+CPU_CHIPS = ('coretemp', 'k10temp', 'zenpower', 'cpu_thermal')
+DISK_CHIPS = ('nvme', 'drivetemp')
+# drm drivers of integrated GPUs
+INTEGRATED_GPU_DRIVERS = ('i915', 'xe')
+
+# block devices that are never physical disks
+IGNORED_DISK_PREFIXES = ('loop', 'ram', 'zram', 'dm-', 'md', 'sr', 'fd')
+
+SECTOR_SIZE = 512  # /proc/diskstats always counts 512 bytes sectors
+
+
+class PersistentFile:
+    """
+    A sysfs/procfs file kept open for the whole run and re-read from its start on each poll,
+    which avoids the open/close system calls (and the path lookup) of every read.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._handle = open(path, 'rb', buffering=0)
+
+    def read(self):
+        self._handle.seek(0)
+        return self._handle.read()
+
+    def read_int(self):
+        return int(self.read())
+
+    def close(self):
+        self._handle.close()
+
+
+def _read_text(path):
+    try:
+        with open(path, 'r') as file_in_handle:
+            return file_in_handle.read().strip()
+    except OSError:
+        return None
+
+
+def _temperature_inputs(hwmon_dir: str):
+    # tempN_input files, in N order
+    return sorted(glob.glob(os.path.join(hwmon_dir, 'temp*_input')),
+                  key=lambda path: int(os.path.basename(path)[4:-6] or 0))
+
+
+def _labelled_temperatures(hwmon_dir: str):
+    # (input path, label) of each temperature of a chip, tempN when it has no label
+    return [(input_path, _read_text(input_path.replace('_input', '_label')) or os.path.basename(input_path)[:-6])
+            for input_path in _temperature_inputs(hwmon_dir)]
+
+
+def find_hwmon_temperature(sys_root: str, chips):
+    """
+    Return the path of the first tempN_input matching the (chip name, labels) priorities or None.
+    """
+    hwmon_by_name = {}
+    for hwmon_dir in sorted(glob.glob(os.path.join(sys_root, 'class', 'hwmon', 'hwmon*'))):
+        hwmon_by_name.setdefault(_read_text(os.path.join(hwmon_dir, 'name')), hwmon_dir)
+
+    for chip_name, labels in chips:
+        hwmon_dir = hwmon_by_name.get(chip_name)
+        if hwmon_dir is None:
+            continue
+
+        inputs = _temperature_inputs(hwmon_dir)
+        if labels:
+            for input_path in inputs:
+                if _read_text(input_path.replace('_input', '_label')) in labels:
+                    return input_path
+        if inputs:
+            return inputs[0]
+    return None
+
+
+def find_gpu_busy_percent(sys_root: str):
+    # amdgpu exposes the load of the GPU directly, other drivers have no such file
+    found = sorted(glob.glob(os.path.join(sys_root, 'class', 'drm', 'card*', 'device', 'gpu_busy_percent')))
+    return found[0] if found else None
+
+
+def discover_sensors(sys_root: str):
+    """
+    [(DiscoveredSensor, path, divisor)] of all the temperatures and GPU loads, the value is the file's integer
+    divided by divisor. The GPUs are found through /sys/class/drm, so their load and temperatures share a device
+    (ex: card0/busy, card0/edge), the other hwmon chips are named after the chip (ex: k10temp/Tctl, nvme#2/Composite).
+    """
+    discovered = []
+    gpu_hwmon_dirs = set()
+    for card_dir in sorted(glob.glob(os.path.join(sys_root, 'class', 'drm', 'card*'))):
+        card = os.path.basename(card_dir)
+        if '-' in card:
+            continue  # a connector of the card, ex: card0-DP-1
+        device_dir = os.path.join(card_dir, 'device')
+        driver = os.path.basename(os.path.realpath(os.path.join(device_dir, 'driver')))
+        device_type = 'igpu' if driver in INTEGRATED_GPU_DRIVERS else 'gpu'
+
+        busy_path = os.path.join(device_dir, 'gpu_busy_percent')
+        if os.path.exists(busy_path):
+            discovered.append((DiscoveredSensor(f'{card}/busy', 'load', 'busy', card, device_type), busy_path, 1))
+        for hwmon_dir in sorted(glob.glob(os.path.join(device_dir, 'hwmon', 'hwmon*'))):
+            gpu_hwmon_dirs.add(os.path.realpath(hwmon_dir))
+            for input_path, label in _labelled_temperatures(hwmon_dir):
+                discovered.append((DiscoveredSensor(f'{card}/{label}', 'temperature', label, card, device_type),
+                                   input_path, 1000))
+
+    chip_counts = {}
+    for hwmon_dir in sorted(glob.glob(os.path.join(sys_root, 'class', 'hwmon', 'hwmon*'))):
+        if os.path.realpath(hwmon_dir) in gpu_hwmon_dirs:
+            continue
+        chip = _read_text(os.path.join(hwmon_dir, 'name')) or os.path.basename(hwmon_dir)
+        # several chips of the same kind (ex: one per NVMe disk) are numbered in hwmon order
+        count = chip_counts[chip] = chip_counts.get(chip, 0) + 1
+        device = chip if count == 1 else f'{chip}#{count}'
+        device_type = 'cpu' if chip in CPU_CHIPS else 'disk' if chip in DISK_CHIPS else 'other'
+        for input_path, label in _labelled_temperatures(hwmon_dir):
+            discovered.append((DiscoveredSensor(f'{device}/{label}', 'temperature', label, device, device_type),
+                               input_path, 1000))
+    return discovered
+
+
+def is_physical_disk(sys_root: str, name: str):
+    # partitions do not have their own /sys/block entry
+    return not name.startswith(IGNORED_DISK_PREFIXES) and os.path.isdir(os.path.join(sys_root, 'block', name))
+
+
+def is_physical_nic(sys_root: str, name: str):
+    # loopback, bridges, veth ... are not backed by a device
+    return os.path.exists(os.path.join(sys_root, 'class', 'net', name, 'device'))
+
+
+def parse_diskstats(diskstats: bytes, is_wanted):
+    """
+    {disk: (bytes read, bytes written, ms spent doing I/O)} for the disks accepted by is_wanted(name).
+    """
+    counters = {}
+    for line in diskstats.split(b'\n'):
+        fields = line.split()
+        if len(fields) < 14:
+            continue
+        name = fields[2].decode()
+        if is_wanted(name):
+            counters[name] = (int(fields[5]) * SECTOR_SIZE, int(fields[9]) * SECTOR_SIZE, int(fields[12]))
+    return counters
+
+
+def parse_net_dev(net_dev: bytes, is_wanted):
+    """
+    {nic: (bytes sent, bytes received)} for the interfaces accepted by is_wanted(name).
+    """
+    counters = {}
+    for line in net_dev.split(b'\n')[2:]:
+        if b':' not in line:
+            continue
+        name, values = line.split(b':', 1)
+        name = name.strip().decode()
+        if is_wanted(name):
+            fields = values.split()
+            counters[name] = (int(fields[8]), int(fields[0]))
+    return counters
+
+
+class LinuxSysfsBackend(SensorBackend):
+    """
+    Reads the sensors straight from the kernel: temperatures from /sys/class/hwmon,
+    disk counters from /proc/diskstats and NIC counters from /proc/net/dev.
+    All the files are opened once and re-read in place, there is no HTTP, JSON decoding or process spawning.
+    The roots are configurable so that recorded sysfs/procfs trees can be used instead of the live ones.
+    """
+
+    name = 'Linux sysfs/procfs'
+    blocking = False
+    # the disk activity comes from the busy time of the I/O counters
+    provided_keys = ('CPU_temp', 'iGPU_temp', 'iGPU_usage', 'dGPU_temp', 'dGPU_usage')
+
+    def __init__(self, sys_root: str = '/sys', proc_root: str = '/proc'):
+        self._sys_root = sys_root
+        self._files = []
+
+        self._cpu_temp = self._open(find_hwmon_temperature(sys_root, CPU_TEMPERATURE_CHIPS))
+        self._dgpu_temp = self._open(find_hwmon_temperature(sys_root, DGPU_TEMPERATURE_CHIPS))
+        self._dgpu_busy = self._open(find_gpu_busy_percent(sys_root))
+
+        self._diskstats = self._open(os.path.join(proc_root, 'diskstats'))
+        self._net_dev = self._open(os.path.join(proc_root, 'net', 'dev'))
+
+        # device name -> is physical; each new name is checked against sysfs only once
+        self._physical_disks = {}
+        self._physical_nics = {}
+
+        # (sensor id, PersistentFile or None, divisor) of the watched sensors
+        self._watched = []
+
+    def _open(self, path):
+        if path is None:
+            return None
+        try:
+            persistent_file = PersistentFile(path)
+        except OSError:
+            return None
+        self._files.append(persistent_file)
+        return persistent_file
+
+    @staticmethod
+    def _read_int(persistent_file):
+        # None when the attribute cannot be read right now (ex: EBUSY or EPERM while a dGPU is runtime suspended)
+        try:
+            return persistent_file.read_int()
+        except (OSError, ValueError):
+            return None
+
+    def _read_millis(self, persistent_file):
+        # hwmon temperatures are in millidegrees
+        if persistent_file is None:
+            return 0
+        value = self._read_int(persistent_file)
+        return value / 1000 if value is not None else None
+
+    def _is_physical_disk(self, name):
+        physical = self._physical_disks.get(name)
+        if physical is None:
+            physical = self._physical_disks[name] = is_physical_disk(self._sys_root, name)
+        return physical
+
+    def _is_physical_nic(self, name):
+        physical = self._physical_nics.get(name)
+        if physical is None:
+            physical = self._physical_nics[name] = is_physical_nic(self._sys_root, name)
+        return physical
+
+    def read(self):
+        readings = empty_readings(self.provided_keys)
+
+        readings['CPU_temp'] = self._read_millis(self._cpu_temp)
+        # no kernel interface reports the integrated GPU temperature, use the CPU one like the LHM backend
+        readings['iGPU_temp'] = readings['CPU_temp']
+        readings['dGPU_temp'] = self._read_millis(self._dgpu_temp)
+        if self._dgpu_busy is not None:
+            readings['dGPU_usage'] = self._read_int(self._dgpu_busy)
+        if self._watched:
+            # a watched sensor that cannot be read is left out, it shows 0 like a missing one
+            sensors = {}
+            for sensor_id, persistent_file, divisor in self._watched:
+                value = self._read_int(persistent_file) if persistent_file is not None else 0
+                if value is not None:
+                    sensors[sensor_id] = value / divisor
+            readings['sensors'] = sensors
+        # the other readings that failed are not published, they keep their last value and go stale
+        return {key: value for key, value in readings.items() if value is not None}
+
+    def discover(self):
+        return [sensor for sensor, _, _ in discover_sensors(self._sys_root)]
+
+    def watch(self, sensor_ids):
+        for _, persistent_file, _ in self._watched:
+            if persistent_file is not None:
+                persistent_file.close()
+                self._files.remove(persistent_file)
+
+        found = {sensor.sensor_id: (path, divisor) for sensor, path, divisor in discover_sensors(self._sys_root)}
+        watched = []
+        for sensor_id in sensor_ids:
+            path, divisor = found.get(sensor_id, (None, 1))
+            watched.append((sensor_id, self._open(path), divisor))
+        self._watched = watched
+
+    def read_io_counters(self):
+        disks = parse_diskstats(self._diskstats.read(), self._is_physical_disk) if self._diskstats else {}
+        nics = parse_net_dev(self._net_dev.read(), self._is_physical_nic) if self._net_dev else {}
+        return disks, nics
+
+    def close(self):
+        for persistent_file in self._files:
+            persistent_file.close()
+        self._files = []
@@ -0,0 +1,498 @@
+from threading import Thread
+from time import (monotonic,
+                  time)
+
+import psutil
+
+from hwstats.backends import (SensorBackend,
+                              SensorsUnavailable,
+                              select_backend)
+from hwstats.colors import gradient_index
+from hwstats.cpu_sampler import CpuSampler
+from hwstats.instrumentation import INSTRUMENTATION
+from hwstats.layout import (DEFAULT_LAYOUT,
+                            Layout,
+                            compile_layout,
+                            suggest_layout)
+from hwstats.lifecycle import Lifecycle
+from hwstats.rates import RateEngine
+from hwstats.recorder import (Recorder,
+                              RecordingReader,
+                              Replay)
+from hwstats.ring_buffer import RingBuffer
+from hwstats.rollups import RollupEngine
+from hwstats.scheduler import SamplingScheduler
+from hwstats.snapshot import (Snapshot,
+                              SnapshotStore)
+
+# number of samples kept for each throughput history (used to scale the colors)
+# 4000 samples at the I/O sampling interval is ~33 minutes
+HISTORY_CAPACITY = 4000
+HISTORY_KEYS = ('disk1_read_speed', 'disk1_write_speed', 'disk2_read_speed', 'disk2_write_speed',
+                'network_upload_speed', 'network_download_speed')
+
+# sampling intervals, in seconds
+CPU_SAMPLING_INTERVAL = 0.5
+RAM_SAMPLING_INTERVAL = 0.5
+SENSORS_SAMPLING_INTERVAL = 2.0  # relaxed polling interval
+IO_SAMPLING_INTERVAL = 0.5
+UI_REFRESH_INTERVAL = 0.5
+RECORDING_INTERVAL = 0.5  # only the snapshots that changed since the previous tick are recorded
+REPLAY_INTERVAL = 0.5
+ROLLUP_INTERVAL = 0.5  # not longer than the shortest sampling interval, so that no sample is missed
+# the sensor backend starts last (for LHM: importing requests and opening the connection),
+# once the cheap samplers delivered the first frame
+SENSORS_START_DELAY = 0.5
+
+# a value not refreshed for that many sampling periods of its sampler is shown dimmed instead of as if it was current,
+# and never before STALE_AFTER seconds (also the limit of the values whose sampler is not known)
+STALE_INTERVALS = 3
+STALE_AFTER = STALE_INTERVALS * SENSORS_SAMPLING_INTERVAL
+# the snapshot fields published by the I/O sampler, see IO_rates_updater()
+IO_FIELDS = ('disks', 'nics', 'network_upload_speed', 'network_download_speed',
+             'disk1_read_speed', 'disk1_write_speed', 'disk1_activity',
+             'disk2_read_speed', 'disk2_write_speed', 'disk2_activity')
+
+# (label, seconds) of the windows summarized by the cell tooltips, the sparkline shows the last one
+TOOLTIP_WINDOWS = (('10 min', 600), ('1 h', 3600), ('24 h', 86400))
+SPARKLINE_WINDOW = 3600
+
+# time constant of the EWMA smoothing of the throughputs, None to show the raw rates
+IO_RATES_SMOOTHING = None
+
+
+def new_history(capacity: int = HISTORY_CAPACITY):
+    history = RingBuffer(capacity)
+    history.append(0.001)  # keeps the color scaling range non-empty until the first real sample
+    return history
+
+
+def make_histories(capacity: int = HISTORY_CAPACITY):
+    """
+    The throughput histories (in MB/s) used to scale the colors, one RingBuffer per HISTORY_KEYS.
+    """
+    return {key: new_history(capacity) for key in HISTORY_KEYS}
+
+
+class FrameBuilder:
+    """
+    Builds the frames of one grid from a Layout: the texts, color steps and staleness of its cells,
+    and which cells differ from the previous frame.
+    The layout is compiled once, so a frame costs one accessor call per cell whatever the grid size,
+    and the text of a cell is only formatted again when its value changed.
+    """
+
+    def __init__(self, histories: dict, layout: Layout = DEFAULT_LAYOUT, history_capacity: int = HISTORY_CAPACITY):
+        self.histories = histories
+        self.history_capacity = history_capacity
+        # the histories of the auto ranged cells that are not in histories, fed by build()
+        self._own_histories = {}
+        self._fed_at = {}
+
+        self.set_layout(layout)
+
+    def _history_for(self, selector: str):
+        history = self.histories.get(selector)
+        if history is None:
+            history = self._own_histories.get(selector)
+            if history is None:
+                history = self._own_histories[selector] = new_history(self.history_capacity)
+        return history
+
+    def set_layout(self, layout: Layout):
+        """
+        Build the next frames from this layout; the first one has all its cells changed.
+        """
+        rows = compile_layout(layout, self._history_for)
+        cells = [cell for row in rows for cell in row if cell is not None]
+        # the own histories of the cells that left the layout are dropped
+        selectors = {cell.selector for cell in cells}
+        self._own_histories = {selector: history for selector, history in self._own_histories.items()
+                               if selector in selectors}
+        # {selector: (read, source, history)} of the own histories used by the layout
+        self._fed = {cell.selector: (cell.read, cell.source, self._own_histories[cell.selector])
+                     for cell in cells if cell.selector in self._own_histories}
+        self.layout = layout
+        self._rows = rows
+
+        # previously built rows
+        self.last_rows = None
+        self._last_colors = None
+        self._last_stale = None
+
+    def cell(self, row: int, column: int):
+        """
+        The CompiledCell shown at (row, column), None for an empty cell or one outside of the layout.
+        """
+        rows = self._rows
+        if row < len(rows) and column < len(rows[row]):
+            return rows[row][column]
+        return None
+
+    def cells(self):
+        return [cell for row in self._rows for cell in row if cell is not None]
+
+    def build(self, snapshot: Snapshot, now: float, stale_after: dict = None):
+        """
+        Return the (rows, colors, changed, stale) matrices of the given snapshot, shaped like the layout.
+        stale flags the cells whose value was not refreshed for stale_after[source field] seconds before now
+        (STALE_AFTER for the fields not in stale_after),
+        changed flags the cells whose text, color step or staleness differ from the previous frame.
+        """
+        cell_rows = self._rows
+        with INSTRUMENTATION.span('frame format'):
+            rows, values = self._texts(cell_rows, snapshot)
+        with INSTRUMENTATION.span('frame color'):
+            self._feed_histories(snapshot)
+            colors = self._colors(cell_rows, values, snapshot)
+
+        last_good = snapshot.last_good
+        default_before = now - STALE_AFTER
+        stale_before = {source: now - seconds for source, seconds in stale_after.items()} if stale_after else {}
+        stale = [[cell is not None and last_good.get(cell.source, 0) < stale_before.get(cell.source, default_before)
+                  for cell in row]
+                 for row in cell_rows]
+
+        if self.last_rows is None:
+            changed = [[True] * len(row) for row in rows]
+        else:
+            changed = [[text != last_text or color != last_color or is_stale != was_stale
+                        for text, last_text, color, last_color, is_stale, was_stale
+                        in zip(*row)]
+                       for row in zip(rows, self.last_rows, colors, self._last_colors, stale, self._last_stale)]
+
+        self.last_rows  = [row[:] for row in rows] # deep copy
+        self._last_colors = [row[:] for row in colors]
+        self._last_stale = stale
+
+        return rows, colors, changed, stale
+
+    @staticmethod
+    def _texts(cell_rows, snapshot: Snapshot):
+        # (texts, values) of the cells, each value is read once per frame
+        texts = []
+        values = []
+        for row in cell_rows:
+            row_texts = []
+            row_values = []
+            for cell in row:
+                if cell is None:
+                    row_texts.append('')
+                    row_values.append(None)
+                    continue
+                value = cell.read(snapshot)
+                if value != cell.value or cell.text is None:
+                    cell.value = value
+                    cell.text = cell.template(value)
+                row_texts.append(cell.text)
+                row_values.append(value)
+            texts.append(row_texts)
+            values.append(row_values)
+        return texts, values
+
+    @staticmethod
+    def _colors(cell_rows, values, snapshot: Snapshot):
+        colors = []
+        for row, row_values in zip(cell_rows, values):
+            row_colors = []
+            for cell, value in zip(row, row_values):
+                if cell is None:
+                    row_colors.append(None)
+                elif cell.read_high is not None:
+                    row_colors.append(gradient_index(value, cell.low, cell.read_high(snapshot)))
+                elif cell.high is not None:
+                    row_colors.append(gradient_index(value, cell.low, cell.high))
+                else:
+                    row_colors.append(None)
+            colors.append(row_colors)
+        return colors
+
+    def _feed_histories(self, snapshot: Snapshot):
+        # one sample per new value of the source, like the histories fed by the samplers
+        last_good = snapshot.last_good
+        for selector, (read, source, history) in self._fed.items():
+            sampled_at = last_good.get(source)
+            if sampled_at is not None and sampled_at != self._fed_at.get(selector):
+                self._fed_at[selector] = sampled_at
+                history.append(read(snapshot))
+
+    def format_rows(self, snapshot: Snapshot):
+        """
+        The texts of the grid.
+        """
+        return self._texts(self._rows, snapshot)[0]
+
+    def cell_colors(self, snapshot: Snapshot):
+        """
+        The color steps of the grid (indices in hwstats.colors.gradient(), None for the uncolored cells);
+        the auto ranged values are scaled to the max of their history.
+        """
+        values = [[cell.read(snapshot) if cell is not None else None for cell in row] for row in self._rows]
+        return self._colors(self._rows, values, snapshot)
+
+
+def CPU_usage_updater(store: SnapshotStore, cpu_sampler: CpuSampler):
+    # non-blocking: usage since the previous call, so over the last sampling interval
+    cpu_percent, cpu_per_core_percent = cpu_sampler.sample()
+    store.publish(cpu_percent=cpu_percent,
+                  cpu_per_core_percent=tuple(cpu_per_core_percent))
+
+
+def RAM_stats_updater(store: SnapshotStore):
+    virtual_memory = psutil.virtual_memory()
+    ram_usage = virtual_memory.used / (1024 ** 3)  # in GB
+    ram_total = virtual_memory.total / (1024 ** 3)  # in GB
+    store.publish(ram_usage=round(ram_usage,1),
+                  ram_total=round(ram_total,1))
+
+
+def sensors_updater(store: SnapshotStore, sensor_backend: SensorBackend):
+    """
+    Poll the sensor backend once and publish its readings.
+    """
+    try:
+        readings = sensor_backend.read()
+        sensors = readings.pop('sensors', None)
+
+        # temperatures are shown as integers
+        changes = {key: int(value) if key.endswith('_temp') else round(value, 2) for key, value in readings.items()}
+        if sensors is not None:
+            changes['sensors'] = {sensor_id: round(value, 2) for sensor_id, value in sensors.items()}
+        store.publish(**changes)
+
+    except SensorsUnavailable:
+        # the backend is backing off, it already reported why
+        pass
+
+    except Exception as e:
+        # On error, keep the last good values, their age tells they are stale
+        print(f'{sensor_backend.name} error: {e}')
+
+
+def IO_rates_updater(store: SnapshotStore, histories: dict, sensor_backend: SensorBackend,
+                     disk_rates: RateEngine, nic_rates: RateEngine):
+    """
+    Compute the throughput of every disk and network interface from their cumulative counters.
+    disk1/disk2 are the first two disks reported, the network speeds are summed over all the interfaces.
+    The activity of a disk comes from its busy time, else from the backend's reading for the very same disk.
+    """
+    disk_counters, nic_counters = sensor_backend.read_io_counters()
+    disk_activity = sensor_backend.disk_activity()
+    now = monotonic()
+    disks = disk_rates.update(disk_counters, now)
+    nics = nic_rates.update(nic_counters, now)
+
+    # per device stats, in MB/s; the disk activity (in %) is None when neither source knows it
+    disk_stats = {disk: (round(read_rate / (1024 ** 2), 2),
+                         round(write_rate / (1024 ** 2), 2),
+                         round(min(100.0, busy_rate / 10), 2) if disk_counters[disk][2] is not None
+                         else disk_activity.get(disk))
+                  for disk, (read_rate, write_rate, busy_rate) in disks.items()}
+    nic_stats = {nic: (round(sent_rate / (1024 ** 2), 2), round(received_rate / (1024 ** 2), 2))
+                 for nic, (sent_rate, received_rate) in nics.items()}
+
+    changes = {'disks': disk_stats,
+               'nics': nic_stats,
+               'network_upload_speed': round(sum(stats[0] for stats in nic_stats.values()), 2),
+               'network_download_speed': round(sum(stats[1] for stats in nic_stats.values()), 2)}
+    disk_values = list(disk_stats.values())
+    for disk_index in range(2):
+        prefix = f'disk{disk_index + 1}'
+        read_speed, write_speed, activity = disk_values[disk_index] if disk_index < len(disk_values) else (0, 0, None)
+        changes[f'{prefix}_read_speed'] = read_speed
+        changes[f'{prefix}_write_speed'] = write_speed
+        if activity is not None:
+            changes[f'{prefix}_activity'] = activity
+
+    store.publish(**changes)
+
+    # Append to history; the ring buffers drop the oldest samples by themselves
+    for key, history in histories.items():
+        history.append(changes[key])
+
+
+class StatsCollector:
+    """
+    Samples all the stats through a single SamplingScheduler and builds the frames shown by the GUI.
+    Has no GUI dependency, so the whole collection pipeline can also run headless.
+    The snapshots can be recorded to record_directory, or be replayed from a recording instead of being sampled.
+    Without a layout, the grid shows DEFAULT_LAYOUT until the first sensor poll, then the layout suggested for the
+    discovered hardware, also written to layout_path if given.
+    """
+
+    def __init__(self, lifecycle: Lifecycle, sensor_backend: SensorBackend = None,
+                 record_directory: str = None, replay: RecordingReader = None, replay_speed: float = 1.0,
+                 layout: Layout = None, layout_path: str = None):
+        self.lifecycle = lifecycle
+        self.scheduler = SamplingScheduler(lifecycle)
+
+        # every sampler publishes complete snapshots here
+        self.store = SnapshotStore()
+
+        # the throughput histories (in MB/s), used to scale the colors
+        self.histories = make_histories()
+        self.frames = FrameBuilder(self.histories, layout or DEFAULT_LAYOUT)
+        # a replay has no hardware to discover, its snapshots only hold the fields of DEFAULT_LAYOUT
+        self._discover_layout = layout is None and replay is None
+        self.layout_path = layout_path
+
+        # min/max/mean of the value of every grid cell over up to a week
+        self.rollups = RollupEngine(())
+        self._track_cells()
+
+        self.sensor_backend = None
+        self.replay = None
+        self._published_fields = ()
+        if replay is not None:
+            # nothing is sampled, the recorded snapshots are published instead
+            self.replay = Replay(replay, self.store, self.histories, replay_speed)
+            self.scheduler.add_task('replay', lambda: self.replay.step(REPLAY_INTERVAL), REPLAY_INTERVAL)
+        else:
+            self.sensor_backend = sensor_backend if sensor_backend is not None else select_backend()
+            sensor_ids = self.frames.layout.sensor_ids()
+            if sensor_ids:
+                self.sensor_backend.watch(sensor_ids)
+            self._add_samplers()
+
+        self.scheduler.add_task('rollups', lambda: self.rollups.add_snapshot(self.store.current), ROLLUP_INTERVAL)
+
+        self.recorder = None
+        if record_directory is not None:
+            self.recorder = Recorder(record_directory)
+            self.scheduler.add_task('recorder', lambda: self.recorder.record(self.store.current), RECORDING_INTERVAL)
+
+    def _add_samplers(self):
+        # registered in priority order, the tasks sharing a deadline run in that order
+        # the sampler takes its reference cpu_times() snapshot right away
+        cpu_sampler = CpuSampler()
+        cpu_task = self.scheduler.add_task('CPU', lambda: CPU_usage_updater(self.store, cpu_sampler),
+                                           CPU_SAMPLING_INTERVAL)
+
+        ram_task = self.scheduler.add_task('RAM', lambda: RAM_stats_updater(self.store), RAM_SAMPLING_INTERVAL)
+
+        # all the disks and NICs are discovered and sampled with one batched read per tick
+        disk_rates = RateEngine(IO_RATES_SMOOTHING)
+        nic_rates = RateEngine(IO_RATES_SMOOTHING)
+        io_task = self.scheduler.add_task('IO', lambda: IO_rates_updater(self.store, self.histories,
+                                                                         self.sensor_backend, disk_rates, nic_rates),
+                                          IO_SAMPLING_INTERVAL)
+
+        # backends doing network requests can block for seconds, they run on the scheduler's worker pool
+        sensors_task = self.scheduler.add_task(self.sensor_backend.name,
+                                               lambda: sensors_updater(self.store, self.sensor_backend),
+                                               SENSORS_SAMPLING_INTERVAL, blocking=self.sensor_backend.blocking,
+                                               start_delay=SENSORS_START_DELAY)
+
+        # the fields published by each sampler, their cells go stale after a few of its (scaled) periods
+        self._published_fields = ((cpu_task, ('cpu_percent', 'cpu_per_core_percent')),
+                                  (ram_task, ('ram_usage', 'ram_total')),
+                                  (io_task, IO_FIELDS),
+                                  (sensors_task, tuple(self.sensor_backend.provided_keys) + ('sensors',)))
+
+    def stale_after(self):
+        """
+        {snapshot field: seconds without a refresh before its cells are shown stale}, following the current
+        sampling periods (see SamplingScheduler.sampling_period()); empty for a replay.
+        """
+        stale_after = {}
+        for task, fields in self._published_fields:
+            seconds = max(STALE_AFTER, STALE_INTERVALS * self.scheduler.sampling_period(task))
+            for field in fields:
+                stale_after[field] = seconds
+        return stale_after
+
+    def _track_cells(self):
+        # the rollups of the cells that stay in a new layout keep their history, the others are dropped
+        cells = self.frames.cells()
+        self.rollups.retain({cell.selector for cell in cells})
+        for cell in cells:
+            self.rollups.track(cell.selector, cell.read, cell.source)
+
+    def apply_layout(self, layout: Layout):
+        """
+        Show this layout from the next frame on.
+        """
+        if self.sensor_backend is not None:
+            self.sensor_backend.watch(layout.sensor_ids())
+        self.frames.set_layout(layout)
+        self._track_cells()
+
+    def _discover(self, snapshot: Snapshot):
+        # the sensors are known from the first successful sensor poll, the disks (and the activities the backend
+        # matched to them) from the next I/O tick; the I/O ticks also refresh the disk activities of SENSOR_KEYS
+        last_good = snapshot.last_good
+        polled_at = min((last_good[key] for key in self.sensor_backend.provided_keys if key in last_good), default=None)
+        if polled_at is None or last_good.get('disks', 0) <= polled_at:
+            return
+        self._discover_layout = False
+
+        layout = suggest_layout(snapshot, self.sensor_backend.discover())
+        try:
+            layout.check()
+        except ValueError as e:
+            # not saved, so that the next start tries again
+            print(f'the layout suggested for the discovered hardware is not valid, keeping the current one: {e}')
+            return
+        self.apply_layout(layout)
+        if self.layout_path is not None:
+            try:
+                layout.save(self.layout_path)
+                print(f'layout of the discovered hardware written to {self.layout_path}')
+            except OSError as e:
+                print(f'could not write the layout to {self.layout_path}: {e}')
+
+    def start(self):
+        self.scheduler.start()
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop the samplers. With wait=False, only the scheduler thread is waited for: a blocking sampler still
+        running (ex: an LHM poll stuck until its timeout) finishes on a helper thread, which then closes the backend.
+        """
+        # wake up the scheduler and wait for the samplers to finish
+        self.lifecycle.stop()
+        self.scheduler.join(wait)
+        # the recorder is only written by the scheduler thread
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.sensor_backend is not None:
+            if wait:
+                self.sensor_backend.close()
+            else:
+                Thread(target=self._close_backend, name='sampler-shutdown', daemon=True).start()
+
+    def _close_backend(self):
+        self.scheduler.join()
+        self.sensor_backend.close()
+
+    def cell_history(self, row: int, column: int):
+        """
+        The tooltip text of a grid cell: min/mean/max over the TOOLTIP_WINDOWS and a sparkline of the last hour.
+        """
+        cell = self.frames.cell(row, column)
+        if cell is None:
+            return ''
+        if cell.selector not in self.rollups.rollups:
+            return cell.label  # the layout is being replaced
+        # the time of the latest snapshot, also right when replaying
+        now = self.store.current.timestamp
+
+        lines = [cell.label]
+        for window_label, window in TOOLTIP_WINDOWS:
+            summary = self.rollups.summary(cell.selector, now - window, now + 1)
+            if summary is not None:
+                lines.append(f'{window_label}: min {summary[0]:.1f}  avg {summary[2]:.1f}  max {summary[1]:.1f}')
+        sparkline = self.rollups.sparkline(cell.selector, now - SPARKLINE_WINDOW, now + 1)
+        if sparkline:
+            lines.append(sparkline)
+        return '\n'.join(lines)
+
+    def build_frame(self, snapshot: Snapshot):
+        """
+        Return the (rows, colors, changed, stale) matrices of the given snapshot, see FrameBuilder.build().
+        """
+        if self._discover_layout:
+            self._discover(snapshot)
+        # a replayed snapshot is as fresh as it was when it was recorded
+        now = snapshot.timestamp if self.replay is not None else time()
+        return self.frames.build(snapshot, now, self.stale_after())
@@ -0,0 +1,31 @@
+# number of quantized steps of the green (low load) to red (high load) gradient
+GRADIENT_STEPS = 32
+
+_gradient = None
+
+
+def gradient():
+    """
+    The (r, g, b) of each step; step i is the color of the value at i / (GRADIENT_STEPS - 1) of the range.
+    Computed once, on first use: ag95 is only imported then, not while the window starts up.
+    """
+    global _gradient
+    if _gradient is None:
+        from ag95 import red_green_from_range_value
+        _gradient = tuple(red_green_from_range_value(step, 0, GRADIENT_STEPS - 1) for step in range(GRADIENT_STEPS))
+    return _gradient
+
+
+def gradient_index(value: float, low: float, high: float):
+    """
+    The GRADIENT step of value within [low, high], clamped to the ends of the gradient.
+    Values closer than one step apart share the same index, so jitter does not change the color.
+    """
+    if high <= low:
+        return 0
+    index = int((value - low) * (GRADIENT_STEPS - 1) / (high - low) + 0.5)
+    if index < 0:
+        return 0
+    if index >= GRADIENT_STEPS:
+        return GRADIENT_STEPS - 1
+    return index
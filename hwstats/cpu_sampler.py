@@ -0,0 +1,60 @@
+import psutil
+
+
+def _total_and_idle(times):
+    """
+    Mirrors psutil's own accounting: guest time is already included in user/nice on Linux
+    and iowait counts as idle.
+    """
+    total = sum(times) - getattr(times, 'guest', 0) - getattr(times, 'guest_nice', 0)
+    idle = times.idle + getattr(times, 'iowait', 0)
+    return total, idle
+
+
+class CpuSampler:
+    """
+    Non-blocking CPU utilization from cpu_times() snapshots.
+    Each sample() takes one per-core snapshot (a single system call for all the cores) and computes the
+    utilization of every core since the previous sample; the total is derived from the same deltas.
+    """
+
+    def __init__(self):
+        self._previous = self._snapshot()
+
+        self.total_percent = 0
+        self.per_core_percent = [0.0] * len(self._previous)
+
+    @staticmethod
+    def _snapshot():
+        return [_total_and_idle(core_times) for core_times in psutil.cpu_times(percpu=True)]
+
+    def sample(self):
+        """
+        Return (total utilization, [utilization of each core]) in percents, since the previous call.
+        """
+        current = self._snapshot()
+        previous = self._previous
+        self._previous = current
+
+        if len(current) != len(previous):
+            # cores went online/offline, restart the measurement from this snapshot
+            self.per_core_percent = [0.0] * len(current)
+            return self.total_percent, self.per_core_percent
+
+        per_core_percent = []
+        total_delta_sum = 0
+        busy_delta_sum = 0
+        for (total, idle), (previous_total, previous_idle) in zip(current, previous):
+            total_delta = total - previous_total
+            busy_delta = total_delta - (idle - previous_idle)
+            total_delta_sum += total_delta
+            busy_delta_sum += busy_delta
+            if total_delta > 0:
+                per_core_percent.append(round(min(100.0, max(0.0, 100 * busy_delta / total_delta)), 1))
+            else:
+                per_core_percent.append(0.0)
+
+        if total_delta_sum > 0:
+            self.total_percent = round(min(100.0, max(0.0, 100 * busy_delta_sum / total_delta_sum)), 1)
+        self.per_core_percent = per_core_percent
+        return self.total_percent, per_core_percent
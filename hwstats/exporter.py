@@ -0,0 +1,197 @@
+import json
+from http.server import (BaseHTTPRequestHandler,
+                         ThreadingHTTPServer)
+from threading import (Lock,
+                       Thread)
+
+from hwstats.backends import SENSOR_KEYS
+from hwstats.instrumentation import INSTRUMENTATION
+from hwstats.snapshot import Snapshot
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+JSON_CONTENT_TYPE = 'application/json'
+
+# the snapshot holds the RAM in GB and the throughputs in MB/s, OpenMetrics wants base units
+GIGABYTE = 1024 ** 3
+MEGABYTE = 1024 ** 2
+
+# (metric name, unit, help, snapshot field, labels, scale) of the single value gauges; the values of a scale other
+# than 1 are exported as whole numbers of the unit
+GAUGES = (
+    ('pyfhs_cpu_utilization', 'percent', 'CPU utilization', 'cpu_percent', '', 1),
+    ('pyfhs_ram_used', 'bytes', 'Used RAM', 'ram_usage', '', GIGABYTE),
+    ('pyfhs_ram_total', 'bytes', 'Total RAM', 'ram_total', '', GIGABYTE),
+    ('pyfhs_temperature', 'celsius', 'Hardware temperatures', 'CPU_temp', 'sensor="cpu"', 1),
+    ('pyfhs_temperature', 'celsius', None, 'iGPU_temp', 'sensor="igpu"', 1),
+    ('pyfhs_temperature', 'celsius', None, 'dGPU_temp', 'sensor="dgpu"', 1),
+    ('pyfhs_gpu_utilization', 'percent', 'GPU utilization', 'iGPU_usage', 'gpu="igpu"', 1),
+    ('pyfhs_gpu_utilization', 'percent', None, 'dGPU_usage', 'gpu="dgpu"', 1),
+)
+# (metric name, unit, help, index in the tuples of Snapshot.disks, scale) of the per disk gauges
+DISK_GAUGES = (
+    ('pyfhs_disk_read', 'bytes_per_second', 'Disk read throughput', 0, MEGABYTE),
+    ('pyfhs_disk_write', 'bytes_per_second', 'Disk write throughput', 1, MEGABYTE),
+    ('pyfhs_disk_activity', 'percent', 'Disk activity', 2, 1),
+)
+# same for Snapshot.nics
+NIC_GAUGES = (
+    ('pyfhs_network_upload', 'bytes_per_second', 'Network upload throughput', 0, MEGABYTE),
+    ('pyfhs_network_download', 'bytes_per_second', 'Network download throughput', 1, MEGABYTE),
+)
+
+
+def _escape_label(value: str):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_openmetrics(snapshot: Snapshot):
+    """
+    The snapshot as an OpenMetrics text exposition.
+    """
+    lines = []
+
+    def family(name, unit, help_text):
+        full_name = f'{name}_{unit}'
+        lines.append(f'# TYPE {full_name} gauge')
+        lines.append(f'# UNIT {full_name} {unit}')
+        lines.append(f'# HELP {full_name} {help_text}')
+        return full_name
+
+    def sample(full_name, labels, value, scale):
+        value = value if scale == 1 else f'{value * scale:.0f}'
+        lines.append(f'{full_name}{{{labels}}} {value}' if labels else f'{full_name} {value}')
+
+    # the samples of a family follow its metadata, the families sharing a name are consecutive in GAUGES
+    for name, unit, help_text, field, labels, scale in GAUGES:
+        full_name = family(name, unit, help_text) if help_text else f'{name}_{unit}'
+        sample(full_name, labels, getattr(snapshot, field), scale)
+
+    full_name = family('pyfhs_cpu_core_utilization', 'percent', 'Utilization of each CPU core')
+    for core_index, percent in enumerate(snapshot.cpu_per_core_percent):
+        lines.append(f'{full_name}{{core="{core_index}"}} {percent}')
+
+    for label_name, devices, gauges in (('disk', snapshot.disks, DISK_GAUGES), ('nic', snapshot.nics, NIC_GAUGES)):
+        labels = [(f'{label_name}="{_escape_label(device)}"', stats) for device, stats in devices.items()]
+        for name, unit, help_text, index, scale in gauges:
+            full_name = family(name, unit, help_text)
+            for label, stats in labels:
+                # the disk activity is None when the I/O counters do not tell it
+                if stats[index] is not None:
+                    sample(full_name, label, stats[index], scale)
+
+    # lets the scrapers drop the values of a sensor backend that is down
+    full_name = family('pyfhs_sensor_last_good_timestamp', 'seconds', 'Time each sensor was last read successfully')
+    for key in SENSOR_KEYS:
+        last_good = snapshot.last_good.get(key)
+        if last_good is not None:
+            lines.append(f'{full_name}{{sensor="{key}"}} {last_good}')
+
+    full_name = family('pyfhs_snapshot_timestamp', 'seconds', 'Time of the last published sample')
+    lines.append(f'{full_name} {snapshot.timestamp}')
+
+    lines.append('# EOF\n')
+    return '\n'.join(lines).encode('utf-8')
+
+
+def render_json(snapshot: Snapshot):
+    return json.dumps(snapshot.as_dict(), separators=(',', ':')).encode('utf-8')
+
+
+def render_history_json(histories: dict):
+    return json.dumps({key: history.to_list() for key, history in histories.items()},
+                      separators=(',', ':')).encode('utf-8')
+
+
+class MetricsExporter:
+    """
+    Serves the collected stats over HTTP:
+    /metrics (OpenMetrics text), /snapshot.json, /history.json (the throughput histories, in MB/s)
+    and /diagnostics.json (the self-instrumentation report, rendered on each request).
+    The bodies are rendered once per sample by refresh(), meant to be a scheduler task, and the very same bytes
+    are then sent to every scraper; the bigger history body is rendered on the first request after each sample.
+    """
+
+    def __init__(self, store, histories: dict, host: str = '127.0.0.1', port: int = 9585, scheduler=None):
+        self._store = store
+        self._histories = histories
+        self._scheduler = scheduler
+
+        # path -> (content type, body); replaced as a whole, so the request threads never see a partial update
+        self.bodies = {}
+        self._rendered_snapshot = None
+
+        self._history_lock = Lock()
+        self._history_body = None
+        self._history_snapshot = None
+
+        self.server = ThreadingHTTPServer((host, port), _ExporterRequestHandler)
+        self.server.daemon_threads = True
+        self.server.exporter = self
+        self._thread = None
+
+        self.refresh()
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def refresh(self):
+        snapshot = self._store.current
+        if snapshot is self._rendered_snapshot:
+            return
+        with INSTRUMENTATION.span('exporter render'):
+            self.bodies = {'/metrics': (OPENMETRICS_CONTENT_TYPE, render_openmetrics(snapshot)),
+                           '/snapshot.json': (JSON_CONTENT_TYPE, render_json(snapshot))}
+        self._rendered_snapshot = snapshot
+
+    def history_body(self):
+        snapshot = self._rendered_snapshot
+        with self._history_lock:
+            if self._history_snapshot is not snapshot:
+                self._history_body = render_history_json(self._histories)
+                self._history_snapshot = snapshot
+            return self._history_body
+
+    def get(self, path: str):
+        """
+        Return the (content type, body) of the path or None.
+        """
+        if path == '/history.json':
+            return JSON_CONTENT_TYPE, self.history_body()
+        if path == '/diagnostics.json':
+            return JSON_CONTENT_TYPE, json.dumps(INSTRUMENTATION.report(self._scheduler)).encode('utf-8')
+        return self.bodies.get(path)
+
+    def start(self):
+        self._thread = Thread(target=self.server.serve_forever, name='metrics-exporter', daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class _ExporterRequestHandler(BaseHTTPRequestHandler):
+    # keep-alive, scrapers reuse their connection
+    protocol_version = 'HTTP/1.1'
+    # the headers and the body are written separately, Nagle would hold the body back until the client ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        found = self.server.exporter.get(self.path.split('?', 1)[0])
+        if found is None:
+            self.send_error(404)
+            return
+
+        content_type, body = found
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # scrapes are far too frequent to be logged
+        pass
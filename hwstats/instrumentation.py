@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+from array import array
+from time import (perf_counter,
+                  time)
+
+# bucket n counts the durations in [2^(n-1), 2^n) microseconds, the last one everything longer (~1 hour)
+HISTOGRAM_BUCKETS = 32
+
+
+class LatencyHistogram:
+    """
+    Log2 histogram of durations: fixed memory, one array increment per sample, percentiles within a factor 2.
+    """
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.buckets = array('q', bytes(8 * HISTOGRAM_BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        microseconds = int(seconds * 1_000_000)
+        self.buckets[min(microseconds.bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float):
+        """
+        Upper bound of the bucket holding that fraction of the samples, in seconds.
+        """
+        if not self.count:
+            return 0.0
+        wanted = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= wanted:
+                return min(self.max, (1 << bucket) / 1_000_000)
+        return self.max
+
+    def summary(self):
+        return {'count': self.count,
+                'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+                'p50_ms': round(self.percentile(0.5) * 1000, 3),
+                'p95_ms': round(self.percentile(0.95) * 1000, 3),
+                'p99_ms': round(self.percentile(0.99) * 1000, 3),
+                'max_ms': round(self.max * 1000, 3)}
+
+
+class _Span:
+    __slots__ = ('_histogram', '_start')
+
+    def __init__(self, histogram: LatencyHistogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.record(perf_counter() - self._start)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Instrumentation:
+    """
+    Self-measurement of the app: a latency histogram per hot path, filled through
+        with INSTRUMENTATION.span('LHM fetch'):
+            ...
+    While disabled, span() returns a shared no-op context manager, so the instrumented code pays one attribute
+    check and an empty with block. The histograms are updated without lock: a sample racing with a report
+    can be missed by that report, which is fine for diagnostics.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.started = time()
+
+    def histogram(self, name: str):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def span(self, name: str):
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self.histogram(name))
+
+    def record(self, name: str, seconds: float):
+        if self.enabled:
+            self.histogram(name).record(seconds)
+
+    def reset(self):
+        self.histograms = {}
+        self.started = time()
+
+    @staticmethod
+    def thread_cpu_times():
+        """
+        {thread name: CPU seconds} of the Python threads of the process.
+        """
+        # only needed once diagnostics are asked for, not worth slowing down the startup
+        import psutil
+
+        names = {thread.native_id: thread.name for thread in threading.enumerate()}
+        try:
+            threads = psutil.Process().threads()
+        except psutil.Error:
+            return {}
+        return {names.get(thread.id, str(thread.id)): round(thread.user_time + thread.system_time, 3)
+                for thread in threads}
+
+    def report(self, scheduler=None):
+        report = {'time': time(),
+                  'enabled_for_s': round(time() - self.started, 1),
+                  'histograms': {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+                  'thread_cpu_s': self.thread_cpu_times()}
+        if scheduler is not None:
+            # dropped: ticks skipped because the previous run was not done, late: ticks started after their deadline
+            report['tasks'] = {task.name: {'runs': task.runs,
+                                           'dropped': task.overruns,
+                                           'late': task.late,
+                                           'errors': task.errors,
+                                           'max_duration_ms': round(task.max_duration * 1000, 3),
+                                           'interval_s': round(scheduler.effective_interval(task), 3)}
+                               for task in scheduler.tasks}
+            # above 1 while the adaptive rate controller slowed the sampling down
+            report['interval_scale'] = scheduler.interval_scale
+        return report
+
+    def dump(self, path: str, scheduler=None):
+        with open(path, 'w') as file_out_handle:
+            json.dump(self.report(scheduler), file_out_handle, indent=2)
+
+
+def format_summary(report: dict):
+    """
+    One line for the diagnostics row: rate, UI tick lateness, dropped ticks, the slowest stage and the CPU time.
+    """
+    histograms = report['histograms']
+    parts = []
+    if 'interval_scale' in report:
+        parts.append(f"rate 1/{report['interval_scale']:g}")
+    lateness = histograms.get('tick lateness UI')
+    if lateness:
+        parts.append(f"UI late p95 {lateness['p95_ms']:.1f}ms")
+    if 'tasks' in report:
+        parts.append(f"dropped {sum(task['dropped'] for task in report['tasks'].values())}")
+    stages = {name: summary for name, summary in histograms.items() if not name.startswith('tick lateness')}
+    if stages:
+        slowest = max(stages, key=lambda name: stages[name]['p95_ms'])
+        parts.append(f"slowest {slowest} p95 {stages[slowest]['p95_ms']:.1f}ms")
+    parts.append(f"CPU {sum(report['thread_cpu_s'].values()):.1f}s")
+    return ' | '.join(parts)
+
+
+def format_report(report: dict):
+    lines = [f"instrumented for {report['enabled_for_s']}s"]
+    for name, summary in report['histograms'].items():
+        lines.append(f"{name}: n={summary['count']} p50 {summary['p50_ms']}ms p95 {summary['p95_ms']}ms "
+                     f"max {summary['max_ms']}ms")
+    for name, task in report.get('tasks', {}).items():
+        lines.append(f"task {name}: every {task['interval_s']}s runs {task['runs']} dropped {task['dropped']} "
+                     f"late {task['late']} errors {task['errors']}")
+    for name, cpu in report['thread_cpu_s'].items():
+        lines.append(f"thread {name}: CPU {cpu}s")
+    return '\n'.join(lines)
+
+
+# shared by all the modules, enabled from the diagnostics menu of the window or with PYFHS_INSTRUMENTATION=1
+INSTRUMENTATION = Instrumentation(enabled=os.environ.get('PYFHS_INSTRUMENTATION') == '1')
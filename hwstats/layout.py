@@ -0,0 +1,322 @@
+import json
+from operator import attrgetter
+
+from hwstats.snapshot import SNAPSHOT_DEFAULTS
+
+# the layout file, next to the app; when it is missing, the layout suggested for the discovered hardware is written
+LAYOUT_FILE = 'layout.json'
+
+# high end of a color range that follows the max of the cell's recent values, for the throughputs
+AUTO_RANGE = 'auto'
+# default color ranges
+LOAD_RANGE = (0, 100)
+TEMPERATURE_RANGE = (40, 90)
+
+# the snapshot fields a selector can name directly
+FIELD_SELECTORS = frozenset(field for field, default in SNAPSHOT_DEFAULTS.items()
+                            if isinstance(default, (int, float)) and field != 'timestamp')
+# the selectors computed from other fields: {selector: (read(snapshot), field telling the age of the value)}
+DERIVED_SELECTORS = {
+    'ram_percent': (lambda s: round((s.ram_usage / s.ram_total) * 100, 1) if s.ram_total > 0 else 0, 'ram_usage'),
+}
+# position of each metric in the tuples of Snapshot.disks and Snapshot.nics
+DISK_METRICS = {'read': 0, 'write': 1, 'activity': 2}
+NIC_METRICS = {'upload': 0, 'download': 1}
+
+# the sensors picked by suggest_layout(), by order of preference, as substrings of DiscoveredSensor.name;
+# the first sensor of the right kind when none matches
+CPU_TEMPERATURE_NAMES = ('CPU Package', 'Tctl', 'Tdie', 'Package id 0', 'SoC')
+GPU_LOAD_NAMES = ('GPU Core', 'D3D 3D', 'busy')
+GPU_TEMPERATURE_NAMES = ('GPU Core', 'edge', 'junction')
+
+
+def compile_selector(selector: str):
+    """
+    Return (read(snapshot), source) for a selector: read returns the selected value of a snapshot with a single
+    attribute or dict lookup, source is the snapshot field whose last_good time is the age of that value.
+    Raise ValueError for a selector that does not name anything, see Layout.
+    """
+    if selector in DERIVED_SELECTORS:
+        return DERIVED_SELECTORS[selector]
+    if selector in FIELD_SELECTORS:
+        return attrgetter(selector), selector
+
+    kind, _, name = selector.partition(':')
+    if kind == 'sensor' and name:
+        # a sensor that is not (or no longer) read shows 0, like a missing sensor of the backends
+        return (lambda snapshot: snapshot.sensors.get(name, 0)), 'sensors'
+
+    device, _, metric = name.rpartition(':')
+    if kind == 'disk' and device and metric in DISK_METRICS:
+        index = DISK_METRICS[metric]
+
+        def read_disk(snapshot):
+            stats = snapshot.disks.get(device)
+            # a missing disk, or an activity that is not known, shows 0
+            value = stats[index] if stats is not None else None
+            return value if value is not None else 0
+        return read_disk, 'disks'
+    if kind == 'nic' and device and metric in NIC_METRICS:
+        index = NIC_METRICS[metric]
+
+        def read_nic(snapshot):
+            stats = snapshot.nics.get(device)
+            return stats[index] if stats is not None else 0
+        return read_nic, 'nics'
+
+    raise ValueError(f'unknown selector {selector!r}')
+
+
+class CellSpec:
+    """
+    One cell of a Layout: the label and selector of its value, the str.format() of the value,
+    and the color range [low, high] of the value. high is a number, a selector (ex: 'ram_total'),
+    or AUTO_RANGE for the max of the cell's recent values; a cell without high is not colored.
+    """
+    __slots__ = ('label', 'selector', 'format', 'low', 'high')
+
+    def __init__(self, label: str, selector: str, format: str = '{}', low: float = 0, high=100):
+        self.label = label
+        self.selector = selector
+        self.format = format
+        self.low = low
+        self.high = high
+
+    def template(self):
+        """
+        The format of the whole text of the cell, ex: 'CPU[%]: {}'.
+        """
+        label = self.label.replace('{', '{{').replace('}', '}}')
+        return f'{label}: {self.format}' if label else self.format
+
+    def check(self):
+        """
+        Raise ValueError if the selectors, the format or the range are not valid.
+        """
+        if not all(isinstance(text, str) for text in (self.label, self.selector, self.format)):
+            raise ValueError(f'the label, selector and format of a cell are strings: {self.to_json()!r}')
+        compile_selector(self.selector)
+        if isinstance(self.high, str):
+            if self.high != AUTO_RANGE:
+                compile_selector(self.high)
+        elif self.high is not None and not isinstance(self.high, (int, float)):
+            raise ValueError(f'{self.label}: invalid range end {self.high!r}')
+        if not isinstance(self.low, (int, float)):
+            raise ValueError(f'{self.label}: invalid range start {self.low!r}')
+        try:
+            self.template().format(0.0)
+        except (ValueError, IndexError, KeyError) as e:
+            raise ValueError(f'{self.label}: invalid format {self.format!r} ({e})')
+
+    def to_json(self):
+        cell = {'label': self.label, 'selector': self.selector}
+        if self.format != '{}':
+            cell['format'] = self.format
+        cell['range'] = [self.low, self.high] if self.high is not None else None
+        return cell
+
+    @classmethod
+    def from_json(cls, cell: dict):
+        if not isinstance(cell, dict) or 'selector' not in cell or set(cell) - {'label', 'selector', 'format', 'range'}:
+            raise ValueError(f'invalid cell {cell!r}')
+        color_range = cell.get('range', LOAD_RANGE)
+        if color_range is not None and (not isinstance(color_range, (list, tuple)) or len(color_range) != 2):
+            raise ValueError(f'invalid range {color_range!r}, expected [low, high] or null')
+        low, high = color_range if color_range is not None else (0, None)
+        spec = cls(cell.get('label', cell['selector']), cell['selector'], cell.get('format', '{}'), low, high)
+        spec.check()
+        return spec
+
+
+class Layout:
+    """
+    The cells of the grid, row by row; None for an empty cell. The rows are padded to the widest one.
+    Stored as JSON: {"rows": [[{"label": "CPU[%]", "selector": "cpu_percent", "format": "{}", "range": [0, 100]},
+    ...], ...]}, where format defaults to "{}" and range to [0, 100] (null for an uncolored cell).
+    The selectors are:
+        FIELD                   a snapshot field (ex: cpu_percent, CPU_temp, disk1_read_speed) or ram_percent
+        disk:NAME:METRIC        read or write (MB/s) or activity (%) of one disk (ex: disk:nvme0n1:read)
+        nic:NAME:METRIC         upload or download (MB/s) of one network interface (ex: nic:eth0:download)
+        sensor:ID               a sensor found by the backend's discovery (ex: sensor:/gpu-amd/0/load/0,
+                                sensor:card0/edge)
+    """
+
+    def __init__(self, rows):
+        width = max((len(row) for row in rows), default=0)
+        self.rows = [list(row) + [None] * (width - len(row)) for row in rows]
+
+    @property
+    def row_count(self):
+        return len(self.rows)
+
+    @property
+    def column_count(self):
+        return len(self.rows[0]) if self.rows else 0
+
+    def sensor_ids(self):
+        """
+        The ids of the backend sensors the cells select, for SensorBackend.watch().
+        """
+        selectors = [selector for row in self.rows for spec in row if spec is not None
+                     for selector in (spec.selector, spec.high) if isinstance(selector, str)]
+        return list(dict.fromkeys(selector[len('sensor:'):] for selector in selectors
+                                  if selector.startswith('sensor:')))
+
+    def check(self):
+        """
+        Raise ValueError if a cell is not valid, see CellSpec.check().
+        """
+        for row in self.rows:
+            for spec in row:
+                if spec is not None:
+                    spec.check()
+
+    def to_json(self):
+        return {'rows': [[spec.to_json() if spec is not None else None for spec in row] for row in self.rows]}
+
+    @classmethod
+    def from_json(cls, data: dict):
+        rows = data.get('rows') if isinstance(data, dict) else None
+        if not rows or not all(isinstance(row, list) for row in rows):
+            raise ValueError('a layout needs a non-empty list of rows')
+        return cls([[CellSpec.from_json(cell) if cell is not None else None for cell in row] for row in rows])
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, 'r', encoding='utf-8') as file_in_handle:
+            return cls.from_json(json.load(file_in_handle))
+
+    def save(self, path: str):
+        # one cell per line, the file is meant to be edited by hand
+        rows = ',\n'.join('    [\n' + ',\n'.join('      ' + json.dumps(cell, ensure_ascii=False) for cell in row)
+                          + '\n    ]' for row in self.to_json()['rows'])
+        with open(path, 'w', encoding='utf-8') as file_out_handle:
+            file_out_handle.write('{\n  "rows": [\n' + rows + '\n  ]\n}\n')
+
+
+# the grid of the previous versions, only made of fixed snapshot fields: also the layout of the replays and of
+# the aggregated hosts, whose snapshots only hold those fields
+DEFAULT_LAYOUT = Layout([
+    [CellSpec('CPU[%]', 'cpu_percent'), CellSpec('RAM[%]', 'ram_percent'),
+     CellSpec('iGPU[%]', 'iGPU_usage'), CellSpec('dGPU[%]', 'dGPU_usage')],
+    [CellSpec('CPU[C]', 'CPU_temp', low=40, high=90), CellSpec('RAM[GB]', 'ram_usage', high='ram_total'),
+     CellSpec('iGPU[C]', 'iGPU_temp', low=40, high=90), CellSpec('dGPU[C]', 'dGPU_temp', low=40, high=90)],
+    [CellSpec('NET⬆️', 'network_upload_speed', high=AUTO_RANGE), CellSpec('D1[%]', 'disk1_activity'),
+     CellSpec('D1_R[MB\\s]', 'disk1_read_speed', high=AUTO_RANGE),
+     CellSpec('D1_W[MB\\s]', 'disk1_write_speed', high=AUTO_RANGE)],
+    [CellSpec('NET⬇️', 'network_download_speed', high=AUTO_RANGE), CellSpec('D2[%]', 'disk2_activity'),
+     CellSpec('D2_R[MB\\s]', 'disk2_read_speed', high=AUTO_RANGE),
+     CellSpec('D2_W[MB\\s]', 'disk2_write_speed', high=AUTO_RANGE)],
+])
+
+
+class CompiledCell:
+    """
+    A CellSpec with its selectors resolved to accessors, see compile_layout().
+    Keeps its last value and text, the text is only formatted again when the value changes.
+    """
+    __slots__ = ('label', 'selector', 'read', 'source', 'template', 'low', 'high', 'read_high', 'value', 'text')
+
+    def __init__(self, spec: CellSpec, history_for):
+        self.label = spec.label
+        self.selector = spec.selector
+        self.read, self.source = compile_selector(spec.selector)
+        self.template = spec.template().format
+        self.low = spec.low
+
+        # the high end of the color range: a number in high, or read_high(snapshot) for the ranges that move;
+        # both are None for an uncolored cell
+        self.high = None
+        self.read_high = None
+        if spec.high == AUTO_RANGE:
+            history = history_for(spec.selector)
+            self.read_high = lambda snapshot: history.max()
+        elif isinstance(spec.high, str):
+            self.read_high = compile_selector(spec.high)[0]
+        else:
+            self.high = spec.high
+
+        self.value = None
+        self.text = None
+
+
+def compile_layout(layout: Layout, history_for):
+    """
+    The rows of CompiledCell (None for the empty cells) of a layout; history_for(selector) returns the RingBuffer
+    of recent values scaling the colors of an AUTO_RANGE cell.
+    """
+    return [[CompiledCell(spec, history_for) if spec is not None else None for spec in row] for row in layout.rows]
+
+
+def _pick(sensors, kind: str, names):
+    candidates = [sensor for sensor in sensors if sensor.kind == kind]
+    for name in names:
+        for sensor in candidates:
+            if name in sensor.name:
+                return sensor
+    return candidates[0] if candidates else None
+
+
+def _sensor_cell(label: str, sensor):
+    if sensor is None:
+        return None
+    if sensor.kind == 'temperature':
+        return CellSpec(label, f'sensor:{sensor.sensor_id}', '{:.0f}', *TEMPERATURE_RANGE)
+    return CellSpec(label, f'sensor:{sensor.sensor_id}', '{}', *LOAD_RANGE)
+
+
+def suggest_layout(snapshot, sensors):
+    """
+    A layout for the hardware found on the first poll: the snapshot's disks and the backend's DiscoveredSensor.
+    Same arrangement as DEFAULT_LAYOUT: a column of load and temperature for the CPU, the RAM and each GPU,
+    then one row per disk with its activity and throughputs, next to the total network throughputs.
+    A backend that cannot discover its sensors keeps the fixed iGPU/dGPU readings.
+    """
+    devices = {}  # {(device type, device): [sensors]}, in discovery order
+    for sensor in sensors:
+        devices.setdefault((sensor.device_type, sensor.device), []).append(sensor)
+
+    cpu_temperature = _pick([sensor for sensor in sensors if sensor.device_type == 'cpu'], 'temperature',
+                            CPU_TEMPERATURE_NAMES)
+    columns = [(CellSpec('CPU[%]', 'cpu_percent'),
+                _sensor_cell('CPU[C]', cpu_temperature) or CellSpec('CPU[C]', 'CPU_temp', '{}', *TEMPERATURE_RANGE)),
+               (CellSpec('RAM[%]', 'ram_percent'), CellSpec('RAM[GB]', 'ram_usage', high='ram_total'))]
+
+    if sensors:
+        # the integrated GPU first, like in the default layout
+        gpus = sorted(((device_type, device_sensors) for (device_type, _), device_sensors in devices.items()
+                       if device_type in ('igpu', 'gpu')), key=lambda gpu: gpu[0] != 'igpu')
+        counts = {}
+        for device_type, device_sensors in gpus:
+            counts[device_type] = counts.get(device_type, 0) + 1
+        numbers = {}
+        for device_type, device_sensors in gpus:
+            name = 'iGPU' if device_type == 'igpu' else 'dGPU'
+            numbers[device_type] = numbers.get(device_type, 0) + 1
+            if counts[device_type] > 1:
+                name += str(numbers[device_type])
+            temperature = _pick(device_sensors, 'temperature', GPU_TEMPERATURE_NAMES)
+            if temperature is None and device_type == 'igpu':
+                # the integrated GPU shares the CPU die, as the backends assume for iGPU_temp
+                temperature = cpu_temperature
+            columns.append((_sensor_cell(f'{name}[%]', _pick(device_sensors, 'load', GPU_LOAD_NAMES)),
+                            _sensor_cell(f'{name}[C]', temperature)))
+    else:
+        columns += [(CellSpec('iGPU[%]', 'iGPU_usage'), CellSpec('iGPU[C]', 'iGPU_temp', '{}', *TEMPERATURE_RANGE)),
+                    (CellSpec('dGPU[%]', 'dGPU_usage'), CellSpec('dGPU[C]', 'dGPU_temp', '{}', *TEMPERATURE_RANGE))]
+    rows = [[column[0] for column in columns], [column[1] for column in columns]]
+
+    network = (CellSpec('NET⬆️', 'network_upload_speed', high=AUTO_RANGE),
+               CellSpec('NET⬇️', 'network_download_speed', high=AUTO_RANGE))
+    disks = list(snapshot.disks.items())
+    for index in range(max(len(disks), len(network))):
+        row = [network[index] if index < len(network) else None]
+        if index < len(disks):
+            disk, (_, _, activity) = disks[index]
+            prefix = f'D{index + 1}'
+            # no activity cell for a disk whose activity is not known, see SensorBackend.disk_activity()
+            row.append(CellSpec(f'{prefix}[%]', f'disk:{disk}:activity') if activity is not None else None)
+            row += [CellSpec(f'{prefix}_R[MB\\s]', f'disk:{disk}:read', high=AUTO_RANGE),
+                    CellSpec(f'{prefix}_W[MB\\s]', f'disk:{disk}:write', high=AUTO_RANGE)]
+        rows.append(row)
+    return Layout(rows)
@@ -0,0 +1,205 @@
+class SensorSelector:
+    """
+    Describes one sensor of LibreHardwareMonitor's data.json tree.
+    The first sensor (in tree order) matching all the given filters is selected.
+    """
+    __slots__ = ('sensor_type', 'name', 'hardware', 'sensor_id_prefix', 'sensor_id_contains', 'field', 'sensor_id')
+
+    def __init__(self, sensor_type, name, hardware=None, sensor_id_prefix=None, sensor_id_contains=None,
+                 field='Value', sensor_id=None):
+        self.sensor_type = sensor_type
+        self.name = name  # substring of the sensor's "Text"
+        self.hardware = hardware  # exact "Text" of the owning hardware node (ex: 'disk1')
+        self.sensor_id_prefix = sensor_id_prefix
+        self.sensor_id_contains = sensor_id_contains
+        self.field = field  # 'Value' or 'RawValue'
+        self.sensor_id = sensor_id  # exact SensorId, ex: '/gpu-amd/0/temperature/0'
+
+    def matches(self, node, hardware_text):
+        if self.name not in node.get('Text', ''):
+            return False
+        if self.hardware is not None and self.hardware != hardware_text:
+            return False
+        sensor_id = node.get('SensorId', '')
+        if self.sensor_id is not None and self.sensor_id != sensor_id:
+            return False
+        if self.sensor_id_prefix is not None and not sensor_id.startswith(self.sensor_id_prefix):
+            return False
+        if self.sensor_id_contains is not None and self.sensor_id_contains not in sensor_id:
+            return False
+        return True
+
+
+# the sensors read by the app; each metric has a list of selectors, tried in order
+LHM_SENSORS = {
+    'CPU_temp': [SensorSelector('Temperature', 'CPU Package'),
+                 SensorSelector('Temperature', 'SoC')],
+    # usually NVIDIA GPU is under hardware ID "/gpu-nvidia/0"
+    'dGPU_temp': [SensorSelector('Temperature', 'GPU Core', sensor_id_prefix='/gpu-nvidia')],
+    'dGPU_usage': [SensorSelector('Load', 'GPU Core', sensor_id_prefix='/gpu-nvidia')],
+    # usually Intel GPU is under "/gpu-intel-integrated/"
+    'iGPU_usage': [SensorSelector('Load', 'D3D 3D', sensor_id_contains='/gpu-intel-integrated/')],
+}
+
+
+def parse_sensor_value(value_str):
+    """
+    Extract the numeric part of a LibreHardwareMonitor value string.
+    Ex: "64.0 °C" -> 64.0, "64,0 °C" -> 64.0, "307710,3 B/s" -> 307710.3
+    """
+    try:
+        # Handle both '.' and ',' as decimal separators
+        return float(value_str.split()[0].replace(',', '.'))
+    except (ValueError, AttributeError, IndexError):
+        return 0
+
+
+def is_hardware_node(node):
+    # hardware devices have a HardwareId and an icon; categories and sensors do not match both
+    return ('HardwareId' in node
+            and 'SensorId' not in node
+            and node.get('ImageURL', '').startswith('images_icon/'))
+
+
+def topology_signature(data):
+    """
+    Cheap fingerprint of the hardware topology: the HardwareIds of the nodes directly under each computer node.
+    Only a couple of levels are visited, so it can be computed on every poll.
+    """
+    return tuple(hardware.get('HardwareId')
+                 for computer in data.get('Children', [])
+                 for hardware in computer.get('Children', []))
+
+
+class LHMSensorIndex:
+    """
+    Flat index over LibreHardwareMonitor's data.json tree, built in a single traversal.
+    Every sensor is recorded together with its path (the child indexes leading to it from the root),
+    so that once resolved, a sensor can be re-read from the next poll's tree without any search.
+    """
+
+    def __init__(self, data):
+        self.by_sensor_id = {}  # SensorId -> (path, node)
+        self.by_hardware_id = {}  # HardwareId -> (path, node)
+        self.by_hardware_text = {}  # hardware Text -> (path, node); the first one in tree order wins
+        self.by_key = {}  # (hardware Text, sensor Type, sensor Text) -> (path, node)
+        self.by_type = {}  # sensor Type -> [(path, node, hardware Text), ...] in tree order
+
+        # iterative depth first traversal, children visited in their natural order
+        stack = [((), data, None)]
+        while stack:
+            path, node, hardware_text = stack.pop()
+
+            if is_hardware_node(node):
+                hardware_text = node.get('Text')
+                self.by_hardware_id.setdefault(node['HardwareId'], (path, node))
+                self.by_hardware_text.setdefault(hardware_text, (path, node))
+
+            if 'Type' in node:
+                sensor_type = node['Type']
+                self.by_type.setdefault(sensor_type, []).append((path, node, hardware_text))
+                self.by_key.setdefault((hardware_text, sensor_type, node.get('Text')), (path, node))
+                if 'SensorId' in node:
+                    self.by_sensor_id.setdefault(node['SensorId'], (path, node))
+
+            children = node.get('Children')
+            if children:
+                for child_index in range(len(children) - 1, -1, -1):
+                    stack.append((path + (child_index,), children[child_index], hardware_text))
+
+    def find(self, selector: SensorSelector):
+        """
+        Return the (path, node) of the first sensor matching the selector or None if there is no such sensor.
+        """
+        if selector.sensor_id is not None:
+            return self.by_sensor_id.get(selector.sensor_id)
+
+        if selector.hardware is not None \
+                and selector.sensor_id_prefix is None \
+                and selector.sensor_id_contains is None:
+            # exact key hit, the most common case
+            found = self.by_key.get((selector.hardware, selector.sensor_type, selector.name))
+            if found:
+                return found
+
+        for path, node, hardware_text in self.by_type.get(selector.sensor_type, ()):
+            if selector.matches(node, hardware_text):
+                return path, node
+        return None
+
+
+def node_at(data, path):
+    node = data
+    for child_index in path:
+        node = node['Children'][child_index]
+    return node
+
+
+class LHMSensorReader:
+    """
+    Reads a fixed set of metrics from successive data.json trees.
+    The sensor paths are resolved once through an LHMSensorIndex and reused for each new tree;
+    the index is only rebuilt when the hardware topology changes.
+    """
+
+    def __init__(self, sensors: dict = None):
+        self._sensors = sensors if sensors is not None else LHM_SENSORS
+
+        self._signature = None
+        # metric name -> (path, SensorId, field) or None if the sensor does not exist
+        self._resolved = {}
+
+        # number of full index builds, handy for benchmarks and diagnostics
+        self.index_builds = 0
+
+    def resolve(self, data, index: LHMSensorIndex = None):
+        """
+        Resolve the sensor paths on data now, through index if one was already built for that very tree.
+        """
+        self._resolve(data, topology_signature(data), index)
+
+    def _resolve(self, data, signature, index: LHMSensorIndex = None):
+        if index is None:
+            index = LHMSensorIndex(data)
+            self.index_builds += 1
+
+        self._resolved = {}
+        for metric, selectors in self._sensors.items():
+            self._resolved[metric] = None
+            for selector in selectors:
+                found = index.find(selector)
+                if found:
+                    path, node = found
+                    self._resolved[metric] = (path, node.get('SensorId'), selector.field)
+                    break
+        self._signature = signature
+
+    def _read_resolved(self, data):
+        values = {}
+        for metric, resolved in self._resolved.items():
+            if resolved is None:
+                values[metric] = 0
+                continue
+            path, sensor_id, field = resolved
+            node = node_at(data, path)
+            if node.get('SensorId') != sensor_id:
+                # the tree shifted under the same hardware list
+                raise LookupError(metric)
+            values[metric] = parse_sensor_value(node.get(field, '0'))
+        return values
+
+    def read(self, data):
+        """
+        Return a dict with the current value of each metric (0 for missing sensors).
+        Metrics selected with field='RawValue' keep the raw unit (ex: B/s for throughputs).
+        """
+        signature = topology_signature(data)
+        if signature != self._signature:
+            self._resolve(data, signature)
+
+        try:
+            return self._read_resolved(data)
+        except (LookupError, TypeError):
+            # a cached path is no longer valid, rebuild once and read again
+            self._resolve(data, signature)
+            return self._read_resolved(data)
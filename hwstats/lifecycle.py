@@ -0,0 +1,95 @@
+import json
+import os
+from threading import Event
+
+
+def resolve_base_path(working_dir: str = None):
+    """
+    The folder holding the runtime files (version.txt, icon.ico, the saved window position ...).
+    PyInstaller one-folder builds keep them in an _internal sub-folder.
+    """
+    working_dir = os.path.abspath(working_dir or os.getcwd())
+    internal_dir = os.path.join(working_dir, '_internal')
+    if os.path.isdir(internal_dir):
+        return internal_dir
+    return working_dir
+
+
+class Lifecycle:
+    """
+    Shared run/stop state of the app.
+    All the samplers wait on the same stop event, so stop() wakes them up immediately
+    instead of letting them finish their current sleep.
+    The runtime base path is resolved once, when the object is created.
+    """
+
+    def __init__(self, base_path: str = None):
+        self.base_path = base_path or resolve_base_path()
+        self._stop_event = Event()
+        self._stop_callbacks = []
+
+    def running_path(self, relative_path: str):
+        return os.path.join(self.base_path, relative_path)
+
+    @property
+    def stopping(self):
+        return self._stop_event.is_set()
+
+    def stop(self):
+        self._stop_event.set()
+        for callback in self._stop_callbacks:
+            callback()
+
+    def on_stop(self, callback):
+        """
+        Call callback() when stop() is called, for the threads that wait on something else than wait().
+        """
+        self._stop_callbacks.append(callback)
+        if self.stopping:
+            callback()
+
+    def wait(self, timeout: float):
+        """
+        Sleep for up to timeout seconds; returns True if a stop was requested meanwhile.
+        """
+        return self._stop_event.wait(timeout)
+
+
+class WindowPositionStore:
+    """
+    Persists the last position of the main window between runs.
+    """
+
+    # older versions saved the position in the file that was also used as the exit flag
+    LEGACY_FILE_NAME = 'exit'
+
+    def __init__(self, lifecycle: Lifecycle, file_name: str = 'window_position.json'):
+        self._path = lifecycle.running_path(file_name)
+        self._legacy_path = lifecycle.running_path(self.LEGACY_FILE_NAME)
+
+    def load(self):
+        """
+        Return the saved (x, y) position or (0, 0) if there is none.
+        """
+        for path in (self._path, self._legacy_path):
+            if not os.path.isfile(path):
+                continue
+            try:
+                with open(path, 'r') as file_in_handle:
+                    last_position = json.load(file_in_handle)
+                return last_position['dragged_x_pos'], last_position['dragged_y_pos']
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+            finally:
+                if path == self._legacy_path:
+                    # a leftover exit file is not needed anymore
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+        return 0, 0
+
+    def save(self, x, y):
+        with open(self._path, 'w') as file_out_handle:
+            json.dump({'dragged_x_pos': x,
+                       'dragged_y_pos': y}, file_out_handle)
@@ -0,0 +1,80 @@
+from math import exp
+from time import monotonic
+
+# counters below this value that go backwards are assumed to be 32 bits counters that wrapped
+WRAP_32 = 2 ** 32
+
+
+def counter_delta(previous: int, current: int):
+    """
+    Increase of a cumulative counter, or None if the counter was reset (device re-attached, driver reload ...).
+    """
+    if current >= previous:
+        return current - previous
+    if previous < WRAP_32:
+        delta = current + WRAP_32 - previous
+        # a real wrap only happens close to the limit
+        if delta < WRAP_32 // 2:
+            return delta
+    return None
+
+
+class RateEngine:
+    """
+    Turns cumulative counters (bytes read/written/sent/received, busy milliseconds ...) of many devices
+    into per second rates, using the deltas over a monotonic clock.
+    Devices can appear (their first sample only sets the baseline) or disappear (their state is dropped) between
+    updates. Counter wraps are handled and counter resets re-baseline the device.
+    Optionally the rates are smoothed with a time aware EWMA of the given time constant.
+    """
+
+    def __init__(self, smoothing_seconds: float = None):
+        self.smoothing_seconds = smoothing_seconds
+
+        # device -> (time, counters tuple)
+        self._previous = {}
+        # device -> rates tuple
+        self.rates = {}
+
+    def update(self, counters: dict, now: float = None):
+        """
+        counters is {device: (counter, counter, ...)}, the same counters order for each update.
+        Return {device: (rate per second, ...)} for the currently present devices.
+        """
+        now = monotonic() if now is None else now
+        previous = self._previous
+        smoothing_seconds = self.smoothing_seconds
+
+        rates = {}
+        for device, values in counters.items():
+            last = previous.get(device)
+            if last is None or len(last[1]) != len(values):
+                # new device, only the baseline for now
+                rates[device] = (0.0,) * len(values)
+                continue
+
+            last_time, last_values = last
+            elapsed = now - last_time
+            old_rates = self.rates.get(device)
+            if elapsed <= 0:
+                rates[device] = old_rates or (0.0,) * len(values)
+                continue
+
+            if smoothing_seconds:
+                alpha = 1 - exp(-elapsed / smoothing_seconds)
+            device_rates = []
+            for index, (last_value, value) in enumerate(zip(last_values, values)):
+                if last_value is None or value is None:
+                    device_rates.append(0.0)
+                    continue
+                delta = counter_delta(last_value, value)
+                rate = delta / elapsed if delta is not None else 0.0
+                if smoothing_seconds and old_rates is not None:
+                    rate = old_rates[index] + alpha * (rate - old_rates[index])
+                device_rates.append(rate)
+            rates[device] = tuple(device_rates)
+
+        # the devices missing from counters are forgotten
+        self._previous = {device: (now, values) for device, values in counters.items()}
+        self.rates = rates
+        return rates
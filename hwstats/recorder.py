@@ -0,0 +1,281 @@
+import glob
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_left
+
+from hwstats.snapshot import (Snapshot,
+                              SNAPSHOT_DEFAULTS)
+
+# the scalar snapshot fields, recorded as one float64 column each;
+# the per core usages get one column per core, the per device dicts are not recorded
+SCALAR_FIELDS = tuple(field for field, default in SNAPSHOT_DEFAULTS.items() if isinstance(default, (int, float)))
+CORE_COLUMN_PREFIX = 'core'
+# temperatures are published as integers, recorded as floats like all the other values
+INTEGER_FIELDS = frozenset(field for field in SCALAR_FIELDS if field.endswith('_temp'))
+
+SEGMENT_SUFFIX = '.hwseg'
+MAGIC = b'HWSEG001'
+# magic, number of rows written, capacity in rows, header size, length of the JSON list of the columns
+HEADER = struct.Struct('<8sQIII')
+PAGE_SIZE = 4096
+
+# 2 hours at the UI refresh interval, a few MB per segment
+SEGMENT_ROWS = 14400
+MAX_RECORDING_BYTES = 256 * 1024 ** 2
+
+
+def snapshot_columns(snapshot: Snapshot):
+    return SCALAR_FIELDS + tuple(f'{CORE_COLUMN_PREFIX}{core_index}'
+                                 for core_index in range(len(snapshot.cpu_per_core_percent)))
+
+
+def list_segments(directory: str):
+    # the names start with the time of their first row, so the name order is the time order
+    return sorted(glob.glob(os.path.join(directory, '*' + SEGMENT_SUFFIX)))
+
+
+class SegmentWriter:
+    """
+    One preallocated, memory-mapped segment file, laid out column by column:
+    a header page, then capacity float64 values for each column in turn.
+    The row count in the header is updated after each row is complete, so a reader never sees a partial row.
+    """
+
+    def __init__(self, path: str, columns: tuple, capacity: int):
+        self.path = path
+        self.columns = columns
+        self.capacity = capacity
+
+        columns_json = json.dumps(columns).encode('utf-8')
+        self.header_size = -(-(HEADER.size + len(columns_json)) // PAGE_SIZE) * PAGE_SIZE
+        self.size = self.header_size + 8 * capacity * len(columns)
+
+        self._file = open(path, 'w+b')
+        self._file.truncate(self.size)
+        self._map = mmap.mmap(self._file.fileno(), self.size)
+        self._map[:HEADER.size + len(columns_json)] = (
+            HEADER.pack(MAGIC, 0, capacity, self.header_size, len(columns_json)) + columns_json)
+        self._values = memoryview(self._map)[self.header_size:].cast('d')
+        self.rows = 0
+
+    @property
+    def full(self):
+        return self.rows >= self.capacity
+
+    def append(self, values):
+        capacity = self.capacity
+        column_values = self._values
+        row = self.rows
+        for column_index, value in enumerate(values):
+            column_values[column_index * capacity + row] = value
+        self.rows = row + 1
+        struct.pack_into('<Q', self._map, 8, self.rows)
+
+    def close(self):
+        self._values.release()
+        self._map.close()
+        self._file.close()
+
+
+class Recorder:
+    """
+    Appends each new snapshot to fixed-width, column oriented segment files in directory.
+    A new segment is started when the current one is full or when the columns change (ex: a different core count),
+    and the oldest segments are deleted so that the recording stays under max_bytes.
+    """
+
+    def __init__(self, directory: str, segment_rows: int = SEGMENT_ROWS, max_bytes: int = MAX_RECORDING_BYTES):
+        self.directory = directory
+        self.segment_rows = segment_rows
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._segment = None
+        self._last_snapshot = None
+
+    def record(self, snapshot: Snapshot):
+        if snapshot is self._last_snapshot:
+            return
+        self._last_snapshot = snapshot
+
+        columns = snapshot_columns(snapshot)
+        if self._segment is None or self._segment.full or self._segment.columns != columns:
+            self._rotate(columns, snapshot.timestamp)
+
+        values = [getattr(snapshot, field) for field in SCALAR_FIELDS]
+        values.extend(snapshot.cpu_per_core_percent)
+        self._segment.append(values)
+
+    def _rotate(self, columns, timestamp):
+        if self._segment is not None:
+            self._segment.close()
+
+        name = f'{int(timestamp * 1000):015d}'
+        path = os.path.join(self.directory, name + SEGMENT_SUFFIX)
+        collision = 0
+        while os.path.exists(path):
+            # same millisecond as the previous segment, only possible with a column change;
+            # '_' sorts after '.', so the new segment follows the previous one in list_segments()
+            collision += 1
+            path = os.path.join(self.directory, f'{name}_{collision:03d}{SEGMENT_SUFFIX}')
+
+        segment_size = PAGE_SIZE + 8 * self.segment_rows * len(columns)
+        self._enforce_size_cap(segment_size)
+        self._segment = SegmentWriter(path, columns, self.segment_rows)
+
+    def _enforce_size_cap(self, new_segment_size):
+        segments = list_segments(self.directory)
+        total = sum(os.path.getsize(path) for path in segments) + new_segment_size
+        for path in segments:
+            if total <= self.max_bytes:
+                break
+            total -= os.path.getsize(path)
+            os.remove(path)
+
+    def close(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+
+class SegmentReader:
+    """
+    Read-only memory map of a segment; the columns are zero-copy float64 views of the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, _, self.capacity, header_size, columns_length = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a recording segment')
+        self.columns = tuple(json.loads(self._map[HEADER.size:HEADER.size + columns_length]))
+        self._column_index = {column: index for index, column in enumerate(self.columns)}
+        self._values = memoryview(self._map)[header_size:].cast('d')
+
+    @property
+    def rows(self):
+        # re-read on each access, the segment may still be written to
+        return struct.unpack_from('<Q', self._map, 8)[0]
+
+    def column(self, name: str, rows: int = None):
+        start = self._column_index[name] * self.capacity
+        return self._values[start:start + (self.rows if rows is None else rows)]
+
+    def row_range(self, start: float, end: float):
+        """
+        The (first, last + 1) rows whose timestamps are within [start, end).
+        """
+        timestamps = self.column('timestamp')
+        return bisect_left(timestamps, start), bisect_left(timestamps, end)
+
+    def close(self):
+        self._values.release()
+        self._map.close()
+        self._file.close()
+
+
+class RecordingReader:
+    """
+    Slices time ranges out of a recording directory without loading the segments:
+    the matching rows are found by bisecting the memory-mapped timestamp column of each segment.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._segments = {}
+
+    def _segment_readers(self):
+        for path in list_segments(self.directory):
+            reader = self._segments.get(path)
+            if reader is None:
+                try:
+                    reader = self._segments[path] = SegmentReader(path)
+                except (OSError, ValueError):
+                    continue
+            yield reader
+
+    def time_span(self):
+        """
+        The (first, last) recorded timestamps, or None for an empty recording.
+        """
+        timestamps = [reader.column('timestamp') for reader in self._segment_readers()]
+        timestamps = [column for column in timestamps if len(column)]
+        if not timestamps:
+            return None
+        return timestamps[0][0], timestamps[-1][-1]
+
+    def read_range(self, start: float, end: float, columns=('timestamp',)):
+        """
+        {column: list of values} of the rows recorded within [start, end).
+        """
+        values = {column: [] for column in columns}
+        for reader in self._segment_readers():
+            first, last = reader.row_range(start, end)
+            if first >= last:
+                continue
+            for column in columns:
+                if column in reader.columns:
+                    values[column].extend(reader.column(column)[first:last])
+                else:
+                    values[column].extend([0.0] * (last - first))
+        return values
+
+    def iter_snapshot_changes(self, start: float, end: float):
+        """
+        Yield the recorded rows within [start, end) as snapshot fields, ready for SnapshotStore.publish().
+        """
+        for reader in self._segment_readers():
+            first, last = reader.row_range(start, end)
+            if first >= last:
+                continue
+            scalar_columns = [(field, reader.column(field)) for field in SCALAR_FIELDS if field in reader.columns]
+            core_columns = [reader.column(column) for column in reader.columns
+                            if column.startswith(CORE_COLUMN_PREFIX)]
+            for row in range(first, last):
+                changes = {field: int(column[row]) if field in INTEGER_FIELDS else column[row]
+                           for field, column in scalar_columns}
+                changes['cpu_per_core_percent'] = tuple(column[row] for column in core_columns)
+                yield changes
+
+    def close(self):
+        for reader in self._segments.values():
+            reader.close()
+        self._segments = {}
+
+
+class Replay:
+    """
+    Publishes a recording into a SnapshotStore as if it was sampled live, speed times faster than real time.
+    step() is meant to be called periodically by the scheduler, in place of the samplers.
+    """
+
+    def __init__(self, reader: RecordingReader, store, histories: dict, speed: float = 1.0):
+        self._reader = reader
+        self._store = store
+        self._histories = histories
+        self.speed = speed
+
+        span = reader.time_span()
+        if span is None:
+            raise ValueError(f'no recording found in {reader.directory}')
+        self.start, self.end = span
+        self.position = self.start  # recorded time replayed so far
+        self.finished = False
+
+    def step(self, interval: float):
+        if self.finished:
+            return
+        end = self.position + interval * self.speed
+        for changes in self._reader.iter_snapshot_changes(self.position, end):
+            self._store.publish(**changes)
+            for key, history in self._histories.items():
+                history.append(changes[key])
+        self.position = end
+        if self.position > self.end:
+            self.finished = True
+            print('replay finished')
@@ -0,0 +1,74 @@
+from array import array
+
+
+class RingBuffer:
+    """
+    Fixed capacity, array backed history of float samples.
+    The rolling maximum of the window is kept up to date incrementally through a monotonic deque,
+    itself stored in a preallocated array, so both append() and max() are O(1) (amortized for append)
+    and neither allocates new containers, whatever the capacity.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        if capacity < 1:
+            raise ValueError(f'RingBuffer capacity must be positive, got {capacity}')
+
+        self._capacity = capacity
+        self._values = array('d', bytes(8 * capacity))
+        # total number of samples ever appended; sample n lives at _values[n % capacity]
+        self._count = 0
+
+        # monotonic deque of sample numbers whose values are decreasing from head to tail;
+        # the head is always the maximum of the current window
+        self._max_deque = array('q', bytes(8 * capacity))
+        self._max_head = 0
+        self._max_tail = 0
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def __len__(self):
+        return min(self._count, self._capacity)
+
+    def append(self, value: float):
+        capacity = self._capacity
+        values = self._values
+        max_deque = self._max_deque
+        sample_nr = self._count
+
+        values[sample_nr % capacity] = value
+
+        # drop the maximum candidates that just left the window
+        oldest_kept = sample_nr - capacity
+        head = self._max_head
+        tail = self._max_tail
+        while head < tail and max_deque[head % capacity] <= oldest_kept:
+            head += 1
+        # drop the candidates that can never be the maximum again
+        while head < tail and values[max_deque[(tail - 1) % capacity] % capacity] <= value:
+            tail -= 1
+        max_deque[tail % capacity] = sample_nr
+        tail += 1
+
+        self._max_head = head
+        self._max_tail = tail
+        self._count = sample_nr + 1
+
+    def max(self, default: float = 0):
+        if not self._count:
+            return default
+        return self._values[self._max_deque[self._max_head % self._capacity] % self._capacity]
+
+    def latest(self, default: float = 0):
+        if not self._count:
+            return default
+        return self._values[(self._count - 1) % self._capacity]
+
+    def __iter__(self):
+        # oldest to newest
+        for sample_nr in range(max(0, self._count - self._capacity), self._count):
+            yield self._values[sample_nr % self._capacity]
+
+    def to_list(self):
+        return list(self)
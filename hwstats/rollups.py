@@ -0,0 +1,173 @@
+from array import array
+from operator import attrgetter
+
+# (bucket size in seconds, number of buckets): 6 hours at 10 s, 24 hours at 1 min, 7 days at 10 min
+ROLLUP_TIERS = ((10, 6 * 360), (60, 24 * 60), (600, 7 * 144))
+
+SPARKLINE_BLOCKS = '▁▂▃▄▅▆▇█'
+
+
+class RollupTier:
+    """
+    Fixed size circular array of time buckets, each holding the min/max/sum/count of the samples it received.
+    Bucket number n (the n-th resolution-long period since the epoch) lives in slot n % capacity,
+    a slot still holding an older bucket is reset when a sample of a newer one arrives.
+    """
+
+    def __init__(self, resolution: float, capacity: int):
+        self.resolution = resolution
+        self.capacity = capacity
+
+        self._buckets = array('q', [-1]) * capacity  # bucket number held by each slot, -1 when empty
+        self._min = array('d', bytes(8 * capacity))
+        self._max = array('d', bytes(8 * capacity))
+        self._sum = array('d', bytes(8 * capacity))
+        self._count = array('q', bytes(8 * capacity))
+        self.latest_bucket = -1
+
+    def add(self, timestamp: float, value: float):
+        bucket = int(timestamp // self.resolution)
+        slot = bucket % self.capacity
+        if self._buckets[slot] != bucket:
+            if bucket < self.latest_bucket - self.capacity + 1:
+                return  # older than the whole tier
+            self._buckets[slot] = bucket
+            self._min[slot] = self._max[slot] = self._sum[slot] = value
+            self._count[slot] = 1
+        else:
+            if value < self._min[slot]:
+                self._min[slot] = value
+            if value > self._max[slot]:
+                self._max[slot] = value
+            self._sum[slot] += value
+            self._count[slot] += 1
+        if bucket > self.latest_bucket:
+            self.latest_bucket = bucket
+
+    def covers(self, start: float):
+        return start >= (self.latest_bucket - self.capacity + 1) * self.resolution
+
+    def buckets(self, start: float, end: float):
+        """
+        Yield (bucket start time, min, max, mean, count) of the non-empty buckets overlapping [start, end), oldest first.
+        """
+        first = max(int(start // self.resolution), self.latest_bucket - self.capacity + 1)
+        last = min(int(end // self.resolution), self.latest_bucket)
+        for bucket in range(first, last + 1):
+            slot = bucket % self.capacity
+            if self._buckets[slot] == bucket:
+                count = self._count[slot]
+                yield bucket * self.resolution, self._min[slot], self._max[slot], self._sum[slot] / count, count
+
+
+class Rollup:
+    """
+    The rollup tiers of one metric, from the finest to the coarsest resolution.
+    """
+
+    def __init__(self, tiers=ROLLUP_TIERS):
+        self.tiers = [RollupTier(resolution, capacity) for resolution, capacity in tiers]
+
+    def add(self, timestamp: float, value: float):
+        for tier in self.tiers:
+            tier.add(timestamp, value)
+
+    def best_tier(self, start: float):
+        # the finest tier still holding start, or the coarsest one if none does
+        for tier in self.tiers:
+            if tier.covers(start):
+                return tier
+        return self.tiers[-1]
+
+    def query(self, start: float, end: float):
+        """
+        (resolution, buckets) of [start, end) at the best resolution available for that window.
+        """
+        tier = self.best_tier(start)
+        return tier.resolution, list(tier.buckets(start, end))
+
+
+class RollupEngine:
+    """
+    Long term history of the given snapshot fields, and of the metrics added with track(), in bounded memory
+    (RRD style). Each new sample of a metric, detected through the snapshot's last_good times,
+    is folded into all the tiers, which is O(1) per sample whatever the history length.
+    """
+
+    def __init__(self, fields, tiers=ROLLUP_TIERS):
+        self.tiers = tiers
+        self.rollups = {}
+        # {metric: (read(snapshot), snapshot field whose last_good time is the time of the sample)}
+        self._sources = {}
+        self._folded_at = {}
+        self._last_snapshot = None
+        for field in fields:
+            self.track(field, attrgetter(field), field)
+
+    def track(self, name: str, read, source: str):
+        """
+        Also keep the history of read(snapshot), sampled when the source field is published;
+        a metric that is already tracked keeps its history.
+        """
+        if name in self.rollups:
+            return
+        self.rollups[name] = Rollup(self.tiers)
+        self._folded_at[name] = None
+        self._sources[name] = (read, source)
+
+    def retain(self, names):
+        """
+        Drop the history of the tracked metrics that are not in names.
+        """
+        for name in [name for name in self.rollups if name not in names]:
+            del self.rollups[name]
+            del self._folded_at[name]
+            del self._sources[name]
+
+    def add_snapshot(self, snapshot):
+        if snapshot is self._last_snapshot:
+            return
+        self._last_snapshot = snapshot
+
+        last_good = snapshot.last_good
+        for name, rollup in self.rollups.items():
+            read, source = self._sources[name]
+            sampled_at = last_good.get(source)
+            if sampled_at is not None and sampled_at != self._folded_at[name]:
+                self._folded_at[name] = sampled_at
+                rollup.add(sampled_at, read(snapshot))
+
+    def query(self, field: str, start: float, end: float):
+        return self.rollups[field].query(start, end)
+
+    def summary(self, field: str, start: float, end: float):
+        """
+        (min, max, mean) of the field over [start, end), None if there is no sample in that window.
+        """
+        _, buckets = self.query(field, start, end)
+        if not buckets:
+            return None
+        count = sum(bucket[4] for bucket in buckets)
+        return (min(bucket[1] for bucket in buckets),
+                max(bucket[2] for bucket in buckets),
+                sum(bucket[3] * bucket[4] for bucket in buckets) / count)
+
+    def sparkline(self, field: str, start: float, end: float, points: int = 30):
+        """
+        The means of the field over [start, end) as a line of block characters, empty periods shown as spaces.
+        """
+        _, buckets = self.query(field, start, end)
+        if not buckets:
+            return ''
+        step = (end - start) / points
+        sums = [0.0] * points
+        counts = [0] * points
+        for bucket_start, _, _, mean, count in buckets:
+            point = min(points - 1, max(0, int((bucket_start - start) // step)))
+            sums[point] += mean * count
+            counts[point] += count
+        means = [sums[point] / counts[point] if counts[point] else None for point in range(points)]
+        present = [mean for mean in means if mean is not None]
+        low, high = min(present), max(present)
+        scale = (len(SPARKLINE_BLOCKS) - 1) / (high - low) if high > low else 0
+        return ''.join(' ' if mean is None else SPARKLINE_BLOCKS[int((mean - low) * scale)] for mean in means)
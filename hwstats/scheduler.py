@@ -0,0 +1,198 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from threading import (Event,
+                       Thread)
+from time import monotonic
+
+from hwstats.adaptive import scaled_interval
+from hwstats.instrumentation import INSTRUMENTATION
+from hwstats.lifecycle import Lifecycle
+
+# a tick started later than that after its deadline is counted as late
+LATE_TOLERANCE = 0.05
+
+
+class ScheduledTask:
+    """
+    One periodic job of the SamplingScheduler, with its run statistics.
+    """
+    __slots__ = ('name', 'function', 'interval', 'blocking', 'next_deadline', 'period', 'running',
+                 'runs', 'overruns', 'late', 'errors', 'last_duration', 'max_duration')
+
+    def __init__(self, name, function, interval, blocking):
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.blocking = blocking  # blocking tasks run on the worker pool instead of the scheduler thread
+
+        self.next_deadline = 0
+        self.period = interval  # the interval next_deadline was scheduled with
+        self.running = False
+
+        self.runs = 0
+        self.overruns = 0  # deadlines missed because the previous run was still going or the loop was late
+        self.late = 0  # runs started more than LATE_TOLERANCE after their deadline
+        self.errors = 0
+        self.last_duration = 0
+        self.max_duration = 0
+
+
+class SamplingScheduler:
+    """
+    Runs all the registered sampler tasks from a single thread, on fixed-rate deadlines:
+    the next deadline of a task is its previous deadline plus its interval, regardless of how long the task took,
+    so the periods do not drift.
+    Blocking probes (ex: HTTP requests) are handed over to a small bounded worker pool;
+    a blocking task that is still running when its next deadline comes is not started twice, the tick is counted
+    as an overrun instead.
+    All the intervals can be stretched at runtime by set_interval_scale() (see hwstats.adaptive);
+    going back to a shorter interval pulls the pending deadlines in right away.
+    """
+
+    def __init__(self, lifecycle: Lifecycle, max_workers: int = 2):
+        self.lifecycle = lifecycle
+        self._max_workers = max_workers
+
+        self._tasks = []
+        self._heap = []  # (deadline, registration order, task)
+        self._thread = None
+        self._executor = None
+
+        self.interval_scale = 1.0
+        self.max_interval = None
+        self._pending_scale = None
+        # wakes the scheduler thread up for a stop or a new interval scale
+        self._wake = Event()
+        lifecycle.on_stop(self._wake.set)
+
+    @property
+    def tasks(self):
+        return list(self._tasks)
+
+    def add_task(self, name: str, function, interval: float, blocking: bool = False, start_delay: float = 0):
+        """
+        Register function() to be called every interval seconds.
+        Tasks sharing a deadline run in the order they were registered.
+        """
+        if self._thread is not None:
+            raise RuntimeError(f'Cannot add the task {name} after the scheduler was started')
+
+        task = ScheduledTask(name, function, interval, blocking)
+        task.next_deadline = start_delay
+        self._tasks.append(task)
+        return task
+
+    def effective_interval(self, task: ScheduledTask):
+        """
+        The current interval of the task: its own one times interval_scale, capped to max_interval
+        (unless the task's own interval is already longer).
+        """
+        return scaled_interval(task.interval, self.interval_scale, self.max_interval)
+
+    def sampling_period(self, task: ScheduledTask):
+        """
+        The longest time between two runs of the task under the current scale: its effective interval, or the
+        interval its pending deadline was scheduled with when that one is longer (right after a scale down).
+        """
+        return max(task.period, self.effective_interval(task))
+
+    def set_interval_scale(self, scale: float, max_interval: float = None):
+        """
+        Multiply all the task intervals by scale, from any thread.
+        """
+        self._pending_scale = (scale, max_interval)
+        self._wake.set()
+
+    def _apply_interval_scale(self, now):
+        self.interval_scale, self.max_interval = self._pending_scale
+        self._pending_scale = None
+        rescheduled = []
+        for deadline, order, task in self._heap:
+            # a shorter interval takes effect now, a longer one from the next run on
+            task.next_deadline = min(deadline, now + self.effective_interval(task))
+            rescheduled.append((task.next_deadline, order, task))
+        heapq.heapify(rescheduled)
+        self._heap[:] = rescheduled
+
+    def start(self):
+        now = monotonic()
+        for order, task in enumerate(self._tasks):
+            task.next_deadline += now
+            heapq.heappush(self._heap, (task.next_deadline, order, task))
+
+        if any(task.blocking for task in self._tasks):
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='sampler')
+
+        self._thread = Thread(target=self._run, name='sampling-scheduler')
+        self._thread.start()
+
+    def join(self, wait: bool = True):
+        """
+        Wait for the scheduler thread and, unless wait is False, for the in-flight blocking tasks
+        (the queued ones are dropped); the lifecycle has to be stopped first.
+        """
+        if self._thread is not None:
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _execute(self, task: ScheduledTask):
+        start = monotonic()
+        try:
+            task.function()
+        except Exception as e:
+            task.errors += 1
+            print(f'{task.name} sampler error: {e}')
+        finally:
+            task.last_duration = monotonic() - start
+            task.max_duration = max(task.max_duration, task.last_duration)
+            if INSTRUMENTATION.enabled:
+                INSTRUMENTATION.record(f'task {task.name}', task.last_duration)
+            task.runs += 1
+            task.running = False
+
+    def _dispatch(self, task: ScheduledTask):
+        if task.running:
+            # the previous run did not finish in time, skip this tick
+            task.overruns += 1
+            return
+
+        task.running = True
+        if task.blocking:
+            self._executor.submit(self._execute, task)
+        else:
+            self._execute(task)
+
+    def _run(self):
+        heap = self._heap
+        while heap and not self.lifecycle.stopping:
+            now = monotonic()
+            if self._pending_scale is not None:
+                self._apply_interval_scale(now)
+
+            deadline, order, task = heap[0]
+            if deadline > now:
+                self._wake.wait(deadline - now)
+                self._wake.clear()
+                continue
+
+            heapq.heappop(heap)
+            lateness = now - deadline
+            if lateness > LATE_TOLERANCE:
+                task.late += 1
+            if INSTRUMENTATION.enabled:
+                INSTRUMENTATION.record(f'tick lateness {task.name}', lateness)
+            self._dispatch(task)
+
+            # fixed rate: the next deadline only depends on the previous one
+            interval = self.effective_interval(task)
+            task.period = interval
+            next_deadline = deadline + interval
+            now = monotonic()
+            if next_deadline <= now:
+                # one or more whole periods were missed, skip them instead of running in a burst
+                missed_periods = int((now - deadline) // interval)
+                task.overruns += missed_periods
+                next_deadline = deadline + (missed_periods + 1) * interval
+            task.next_deadline = next_deadline
+            heapq.heappush(heap, (next_deadline, order, task))
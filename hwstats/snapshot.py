@@ -0,0 +1,90 @@
+from threading import Lock
+from time import time
+
+# the fixed layout of a snapshot, with the default value of each field
+SNAPSHOT_DEFAULTS = {
+    'timestamp': 0.0,  # wall clock time of the last publish
+    'cpu_percent': 0,
+    'cpu_per_core_percent': (),
+    'ram_usage': 0,  # in GB
+    'ram_total': 0,  # in GB
+    'CPU_temp': 0,
+    'iGPU_temp': 0,
+    'iGPU_usage': 0,
+    'dGPU_temp': 0,
+    'dGPU_usage': 0,
+    'disk1_activity': 0,
+    'disk1_read_speed': 0,  # MB/s
+    'disk1_write_speed': 0,
+    'disk2_activity': 0,
+    'disk2_read_speed': 0,
+    'disk2_write_speed': 0,
+    'network_upload_speed': 0,
+    'network_download_speed': 0,
+    'disks': {},  # {disk: (read MB/s, write MB/s, activity % or None)}
+    'nics': {},  # {nic: (upload MB/s, download MB/s)}
+    'sensors': {},  # {sensor id: value} of the sensors watched for the layout, see SensorBackend.watch()
+    'last_good': {},  # {field: wall clock time it was last published}
+}
+SNAPSHOT_FIELDS = tuple(SNAPSHOT_DEFAULTS)
+
+
+class Snapshot:
+    """
+    One consistent set of all the collected stats.
+    Snapshots are never modified once published: a sampler publishes a new snapshot with its fields replaced,
+    so a reader holding a snapshot never sees a mix of old and new values.
+    """
+    __slots__ = SNAPSHOT_FIELDS
+
+    def __init__(self, **values):
+        for field, default in SNAPSHOT_DEFAULTS.items():
+            setattr(self, field, values.get(field, default))
+
+    def replace(self, **changes):
+        new_snapshot = Snapshot.__new__(Snapshot)
+        for field in SNAPSHOT_FIELDS:
+            setattr(new_snapshot, field, changes[field] if field in changes else getattr(self, field))
+        return new_snapshot
+
+    def age(self, field: str, now: float = None):
+        """
+        Seconds since the field was last published with a good value, infinite if it never was.
+        """
+        last_good = self.last_good.get(field)
+        if last_good is None:
+            return float('inf')
+        return (time() if now is None else now) - last_good
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in SNAPSHOT_FIELDS}
+
+
+class SnapshotStore:
+    """
+    Holds the latest published Snapshot.
+    Publishing builds the next snapshot aside and swaps a single reference, so readers do not take any lock:
+    they read store.current once and use that snapshot for the whole frame.
+    The lock only serializes the samplers among themselves, so that no update is lost.
+    Every published field gets its last_good time set: a sampler that fails publishes nothing,
+    so its fields keep their last good values and their age grows.
+    """
+
+    def __init__(self):
+        self._current = Snapshot()
+        self._publish_lock = Lock()
+
+    @property
+    def current(self):
+        return self._current
+
+    def publish(self, **changes):
+        with self._publish_lock:
+            timestamp = changes.setdefault('timestamp', time())
+            last_good = self._current.last_good.copy()
+            for field in changes:
+                last_good[field] = timestamp
+            changes['last_good'] = last_good
+            snapshot = self._current.replace(**changes)
+            self._current = snapshot
+        return snapshot
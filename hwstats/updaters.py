@@ -0,0 +1,68 @@
+from PySide6.QtCore import (Signal,
+                            QObject)
+
+from hwstats.adaptive import (AdaptiveRateController,
+                              RatePolicy)
+from hwstats.collector import (StatsCollector,
+                               UI_REFRESH_INTERVAL)
+
+
+# Qt side of the StatsCollector: emits the frames to the GUI thread
+class StatsUpdater(QObject):
+    stats_updated = Signal(list, list, list, list)  # Signal to send updated stats to the main thread
+    cores_updated = Signal(list)  # Signal to send the usage of each CPU core to the main thread
+    rate_scale_changed = Signal(float)  # Signal to send the new interval scale of the adaptive rate
+
+    def __init__(self, collector: StatsCollector, rate_policy: RatePolicy = None):
+        super().__init__()
+
+        self.collector = collector
+        self.scheduler = collector.scheduler
+        self.rate_controller = None
+        if rate_policy is not None:
+            self.rate_controller = AdaptiveRateController(collector.scheduler, rate_policy,
+                                                          self.rate_scale_changed.emit)
+        # registered after the fast samplers so that it runs right after them when they share its deadlines
+        self.collector.scheduler.add_task('UI', self.update_stats, UI_REFRESH_INTERVAL)
+
+    def start(self):
+        self.collector.start()
+
+    def update_stats(self):
+        # one consistent snapshot for the whole frame
+        snapshot = self.collector.store.current
+        rows, colors, changed, stale = self.collector.build_frame(snapshot)
+        if self.rate_controller is not None:
+            self.rate_controller.observe(colors)
+
+        # Emit formatted data, the signals are queued to the GUI thread
+        self.stats_updated.emit(rows, colors, changed, stale)
+        self.cores_updated.emit(list(snapshot.cpu_per_core_percent))
+
+    def shutdown(self):
+        # called on the GUI thread, which must not wait for a stuck blocking sampler
+        self.collector.shutdown(wait=False)
+
+
+# Qt side of the Aggregator: emits the frames of the hosts to the GUI thread
+class AggregateUpdater(QObject):
+    hosts_updated = Signal(list)  # Signal to send the frames of the hosts that changed to the main thread
+
+    def __init__(self, aggregator):
+        super().__init__()
+
+        self.aggregator = aggregator
+        self.scheduler = aggregator.scheduler
+        self.rate_controller = None
+        self.scheduler.add_task('UI', self.update_hosts, UI_REFRESH_INTERVAL)
+
+    def start(self):
+        self.aggregator.start()
+
+    def update_hosts(self):
+        frames = self.aggregator.build_frames()
+        if frames:
+            self.hosts_updated.emit(frames)
+
+    def shutdown(self):
+        self.aggregator.shutdown()
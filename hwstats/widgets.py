@@ -0,0 +1,301 @@
+from PySide6.QtWidgets import (QWidget,
+                               QGridLayout,
+                               QLabel,
+                               QToolTip)
+from PySide6.QtCore import (Qt,
+                            QEvent,
+                            QPoint,
+                            QRect,
+                            QRectF,
+                            QPointF,
+                            QSize)
+from PySide6.QtGui import (QPainter,
+                           QColor,
+                           QFont,
+                           QFontMetrics,
+                           QStaticText,
+                           QPaintEvent)
+
+from hwstats.colors import (gradient,
+                            gradient_index)
+from hwstats.instrumentation import INSTRUMENTATION
+
+
+def faded(color: QColor):
+    # most of the saturation removed, the value is still readable but clearly not live
+    hue, saturation, value, alpha = color.getHsv()
+    return QColor.fromHsv(hue, saturation // 4, value, alpha)
+
+
+_gradient_colors = {}
+
+
+def gradient_colors(stale: bool = False):
+    """
+    The QColor of each gradient step (faded ones for the stale values), shared by all the widgets;
+    built on first use, the placeholder cells of the first frame do not need them.
+    """
+    colors = _gradient_colors.get(stale)
+    if colors is None:
+        colors = tuple(QColor(*rgb) for rgb in gradient())
+        if stale:
+            colors = tuple(faded(color) for color in colors)
+        _gradient_colors[stale] = colors
+    return colors
+
+
+class CoreHeatmap(QWidget):
+    """
+    Compact row with one colored block per CPU core, green (idle) to red (saturated).
+    Makes a single saturated core visible even when the total CPU usage is low.
+    """
+
+    def __init__(self, parent=None, height: int = 6):
+        super().__init__(parent)
+        self.setFixedHeight(height)
+
+        self._per_core_percent = []
+        self._steps = []
+        self._colors = []
+
+    def set_values(self, per_core_percent: list):
+        if per_core_percent == self._per_core_percent:
+            return
+        self._per_core_percent = list(per_core_percent)
+        self.setToolTip(' '.join(f'{percent:.0f}' for percent in per_core_percent))
+
+        # only repainted when a core moves to another gradient step
+        steps = [gradient_index(percent, 0, 100) for percent in per_core_percent]
+        if steps != self._steps:
+            self._steps = steps
+            colors = gradient_colors()
+            self._colors = [colors[step] for step in steps]
+            self.update()
+
+    def paintEvent(self, event: QPaintEvent):
+        if not self._colors:
+            return
+
+        painter = QPainter(self)
+        block_width = self.width() / len(self._colors)
+        for core_index, color in enumerate(self._colors):
+            painter.fillRect(QRectF(core_index * block_width, 0, block_width, self.height()), color)
+        # thin separators keep neighbouring cores apart when they have the same color
+        if block_width >= 3:
+            painter.setPen(Qt.white)
+            for core_index in range(1, len(self._colors)):
+                x = core_index * block_width
+                painter.drawLine(QPointF(x, 0), QPointF(x, self.height()))
+        painter.end()
+
+
+class StatsGrid(QWidget):
+    """
+    The grid of stats, drawn by a single widget in one paintEvent instead of one styled QLabel per cell.
+    The font and its metrics are created once, each cell keeps a prepared QStaticText (a cached text layout)
+    and a shared QColor fill, and only the rectangles of the changed cells are repainted.
+    Stale cells (values that could not be refreshed) are drawn faded.
+    Until the first frame, the cells show placeholder texts, drawn as stale.
+    The shape follows the layout of the frames, see set_shape().
+    """
+
+    CELL_SPACING = 4
+    STALE_TEXT_COLOR = QColor(128, 128, 128)
+    PLACEHOLDER_TEXT = '…'
+
+    def __init__(self, rows: int = 4, columns: int = 4, parent=None):
+        super().__init__(parent)
+
+        self._font = QFont('Arial')
+        self._font.setPixelSize(10)
+        self._font.setBold(True)
+        self._font_metrics = QFontMetrics(self._font)
+        self._row_height = self._font_metrics.height()
+        self._tooltip_provider = None
+
+        self.set_shape(rows, columns)
+
+    @property
+    def shape(self):
+        return self._rows, self._columns
+
+    def set_shape(self, rows: int, columns: int):
+        """
+        Resize the grid to rows x columns cells, all showing placeholders until the next frame.
+        """
+        self._rows = rows
+        self._columns = columns
+
+        self._texts = [[self.PLACEHOLDER_TEXT] * columns for _ in range(rows)]
+        self._static_texts = [[self._make_static_text(text) for text in row] for row in self._texts]
+        self._fills = [[None] * columns for _ in range(rows)]
+        self._stale = [[True] * columns for _ in range(rows)]
+
+        # the columns only grow, so the window does not jitter when a value gets one digit shorter
+        self._column_widths = [max(self._text_width(row_index, column_index) for row_index in range(rows))
+                               for column_index in range(columns)]
+        self._column_offsets = [0] * columns
+        self._relayout()
+        self.update()
+
+    def _make_static_text(self, text):
+        static_text = QStaticText(text)
+        static_text.setTextFormat(Qt.PlainText)
+        static_text.setPerformanceHint(QStaticText.AggressiveCaching)
+        static_text.prepare(font=self._font)
+        return static_text
+
+    def _text_width(self, row_index, column_index):
+        # a few pixels of spacing keep neighbouring cells readable
+        return self._font_metrics.horizontalAdvance(self._texts[row_index][column_index]) + self.CELL_SPACING
+
+    def _relayout(self):
+        offset = 0
+        for column_index in range(self._columns):
+            self._column_offsets[column_index] = offset
+            offset += self._column_widths[column_index]
+        self.setMinimumSize(self.sizeHint())
+        self.updateGeometry()
+
+    def sizeHint(self):
+        return QSize(sum(self._column_widths), self._row_height * self._rows)
+
+    def _cell_rect(self, row_index, column_index):
+        # the last column also takes whatever extra width the layout gives to the grid
+        if column_index == self._columns - 1:
+            width = max(self._column_widths[column_index], self.width() - self._column_offsets[column_index])
+        else:
+            width = self._column_widths[column_index]
+        return QRect(self._column_offsets[column_index], row_index * self._row_height, width, self._row_height)
+
+    def cell_at(self, pos: QPoint):
+        """
+        The (row, column) of the cell under pos, or None.
+        """
+        for r in range(self._rows):
+            for c in range(self._columns):
+                if self._cell_rect(r, c).contains(pos):
+                    return r, c
+        return None
+
+    def set_tooltip_provider(self, provider):
+        """
+        provider(row, column) returns the tooltip text of a cell; it is only called when a tooltip is shown.
+        """
+        self._tooltip_provider = provider
+
+    def event(self, event: QEvent):
+        if event.type() == QEvent.ToolTip and self._tooltip_provider is not None:
+            cell = self.cell_at(event.pos())
+            if cell is None:
+                QToolTip.hideText()
+            else:
+                # the tooltip goes away as soon as the mouse leaves the cell
+                QToolTip.showText(event.globalPos(), self._tooltip_provider(*cell), self, self._cell_rect(*cell))
+            return True
+        return super().event(event)
+
+    def update_cells(self, rows, colors, changed, stale=None):
+        """
+        Apply a frame of (rows, colors, changed, stale) matrices, as emitted by the StatsUpdater;
+        colors holds gradient steps (see hwstats.colors), each one maps to a prebuilt QColor, or None for no fill.
+        """
+        if stale is None:
+            stale = [[False] * len(row) for row in rows]
+
+        colors_by_staleness = (gradient_colors(), gradient_colors(stale=True))
+        dirty = []
+        relayout = False
+        for r, (row_data, color_row, changed_row, stale_row) in enumerate(zip(rows, colors, changed, stale)):
+            for c, (text, colour, changed_flag, stale_flag) in enumerate(zip(row_data, color_row, changed_row,
+                                                                             stale_row)):
+                if not changed_flag:
+                    continue
+                if text != self._texts[r][c]:
+                    self._texts[r][c] = text
+                    self._static_texts[r][c] = self._make_static_text(text)
+                    width = self._text_width(r, c)
+                    if width > self._column_widths[c]:
+                        self._column_widths[c] = width
+                        relayout = True
+                self._fills[r][c] = colors_by_staleness[stale_flag][colour] if colour is not None else None
+                self._stale[r][c] = stale_flag
+                dirty.append((r, c))
+
+        if relayout:
+            self._relayout()
+            self.update()
+        else:
+            for r, c in dirty:
+                self.update(self._cell_rect(r, c))
+
+    def paintEvent(self, event: QPaintEvent):
+        with INSTRUMENTATION.span('grid paint'):
+            self._paint(event)
+
+    def _paint(self, event: QPaintEvent):
+        painter = QPainter(self)
+        painter.setFont(self._font)
+
+        exposed = event.rect()
+        for r in range(self._rows):
+            for c in range(self._columns):
+                rect = self._cell_rect(r, c)
+                if not rect.intersects(exposed):
+                    continue
+                fill = self._fills[r][c]
+                if fill is not None:
+                    painter.fillRect(rect, fill)
+                painter.setPen(self.STALE_TEXT_COLOR if self._stale[r][c] else Qt.black)
+                painter.drawStaticText(rect.topLeft(), self._static_texts[r][c])
+        painter.end()
+
+
+class HostsGrid(QWidget):
+    """
+    One StatsGrid per host, under a label with its name, laid out columns hosts wide in order of appearance.
+    Fed with the frames of hwstats.aggregator.Aggregator.build_frames(); a host gets its grid with its first frame.
+    """
+
+    def __init__(self, columns: int = 8, parent=None):
+        super().__init__(parent)
+
+        self._columns = columns
+        self._grids = {}
+        self._tooltip_provider = None
+
+        self._layout = QGridLayout(self)
+        self._layout.setSpacing(2)
+        self._layout.setContentsMargins(0, 0, 0, 0)
+
+    @property
+    def host_count(self):
+        return len(self._grids)
+
+    def set_tooltip_provider(self, provider):
+        """
+        provider(host, row, column) returns the tooltip text of a cell of a host.
+        """
+        self._tooltip_provider = provider
+
+    def _add_host(self, host: str, rows: int, columns: int):
+        index = len(self._grids)
+        row, column = divmod(index, self._columns)
+
+        label = QLabel(host, self)
+        label.setStyleSheet("font-size: 9px; font-weight: bold;")
+        grid = StatsGrid(rows, columns, self)
+        if self._tooltip_provider is not None:
+            provider = self._tooltip_provider
+            grid.set_tooltip_provider(lambda r, c: provider(host, r, c))
+        self._layout.addWidget(label, 2 * row, column)
+        self._layout.addWidget(grid, 2 * row + 1, column)
+        self._grids[host] = grid
+        return grid
+
+    def update_hosts(self, frames: list):
+        for host, rows, colors, changed, stale in frames:
+            grid = self._grids.get(host)
+            if grid is None:
+                grid = self._add_host(host, len(rows), len(rows[0]))
+            grid.update_cells(rows, colors, changed, stale)
@@ -0,0 +1,211 @@
+import socket
+import struct
+from time import monotonic
+
+from hwstats.backends.circuit_breaker import CircuitBreaker
+from hwstats.recorder import (SCALAR_FIELDS,
+                              INTEGER_FIELDS)
+from hwstats.snapshot import Snapshot
+
+AGGREGATOR_PORT = 9586
+
+# the fixed layout of a frame: the scalar snapshot fields, in that order, then the per core usages
+WIRE_FIELDS = tuple(field for field in SCALAR_FIELDS if field != 'timestamp')
+CORES_BIT = len(WIRE_FIELDS)
+assert CORES_BIT < 64
+
+MAGIC = b'HW'
+VERSION = 1
+KEYFRAME = 0x01
+# magic, version, flags, sequence number, snapshot timestamp, fresh fields mask, sent fields mask,
+# length of the host name; then the host name, a float32 per sent field and if sent, the core count
+# and a uint8 percent per core
+HEADER = struct.Struct('<2sBBIdQQB')
+TCP_LENGTH = struct.Struct('<H')
+
+# a full frame every that many frames (10 s at the UI refresh interval), so that a restarted aggregator
+# or a lost datagram is caught up with quickly
+KEYFRAME_INTERVAL = 20
+
+
+def parse_address(text: str, default_host: str = '127.0.0.1', default_port: int = AGGREGATOR_PORT):
+    """
+    (host, port) of 'host:port', 'host' or ':port'.
+    """
+    host, _, port = text.rpartition(':') if ':' in text else (text, '', '')
+    return host or default_host, int(port) if port else default_port
+
+
+class Frame:
+    """
+    One decoded frame: the fields refreshed on the agent since its previous frame, and the values sent.
+    """
+    __slots__ = ('host', 'flags', 'sequence', 'timestamp', 'fresh', 'values', 'cores')
+
+    def __init__(self, host, flags, sequence, timestamp, fresh, values, cores):
+        self.host = host
+        self.flags = flags
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.fresh = fresh  # field names, 'cpu_per_core_percent' for the cores
+        self.values = values  # {field: value}
+        self.cores = cores  # tuple of percents, None if not sent
+
+    @property
+    def keyframe(self):
+        return bool(self.flags & KEYFRAME)
+
+
+class FrameEncoder:
+    """
+    Encodes the snapshots of one agent as compact binary frames.
+    Only the values that changed since the previous frame are sent, as float32; the fresh mask still tells
+    which fields were sampled again (with the same value), so that the aggregator knows they are not stale.
+    """
+
+    def __init__(self, host: str, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.host = host.encode('utf-8')[:255]
+        self.keyframe_interval = keyframe_interval
+        self.sequence = 0
+        self.reset()
+
+    def reset(self):
+        # the next frame is a keyframe (ex: after a reconnection)
+        self._sent_values = [None] * len(WIRE_FIELDS)
+        self._sent_cores = None
+        self._sent_last_good = {}
+        self._frames_to_keyframe = 0
+
+    def encode(self, snapshot: Snapshot):
+        keyframe = self._frames_to_keyframe <= 0
+        self._frames_to_keyframe = self.keyframe_interval if keyframe else self._frames_to_keyframe - 1
+
+        last_good = snapshot.last_good
+        sent_last_good = self._sent_last_good
+        sent_values = self._sent_values
+        fresh_mask = 0
+        sent_mask = 0
+        values = []
+        for index, field in enumerate(WIRE_FIELDS):
+            sampled_at = last_good.get(field)
+            if sampled_at is not None and sampled_at != sent_last_good.get(field):
+                fresh_mask |= 1 << index
+            value = getattr(snapshot, field)
+            if keyframe or value != sent_values[index]:
+                sent_mask |= 1 << index
+                sent_values[index] = value
+                values.append(value)
+
+        cores = snapshot.cpu_per_core_percent
+        sampled_at = last_good.get('cpu_per_core_percent')
+        if sampled_at is not None and sampled_at != sent_last_good.get('cpu_per_core_percent'):
+            fresh_mask |= 1 << CORES_BIT
+        cores_bytes = b''
+        if keyframe or cores != self._sent_cores:
+            sent_mask |= 1 << CORES_BIT
+            self._sent_cores = cores
+            cores_bytes = bytes((len(cores),)) + bytes(min(255, max(0, round(percent))) for percent in cores)
+        self._sent_last_good = last_good
+
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        return b''.join((HEADER.pack(MAGIC, VERSION, KEYFRAME if keyframe else 0, self.sequence,
+                                     snapshot.timestamp, fresh_mask, sent_mask, len(self.host)),
+                         self.host,
+                         struct.pack(f'<{len(values)}f', *values),
+                         cores_bytes))
+
+
+def decode_frame(data: bytes):
+    """
+    The Frame encoded in data; raises ValueError on anything that is not a valid frame.
+    """
+    try:
+        magic, version, flags, sequence, timestamp, fresh_mask, sent_mask, host_length = HEADER.unpack_from(data)
+    except struct.error:
+        raise ValueError('truncated frame header')
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('not a hwstats frame')
+    offset = HEADER.size
+    host = data[offset:offset + host_length].decode('utf-8', 'replace')
+    offset += host_length
+
+    sent_fields = [field for index, field in enumerate(WIRE_FIELDS) if sent_mask >> index & 1]
+    try:
+        sent_values = struct.unpack_from(f'<{len(sent_fields)}f', data, offset)
+    except struct.error:
+        raise ValueError('truncated frame values')
+    offset += 4 * len(sent_fields)
+    # float32 only keeps ~7 digits, round back to what the agent published
+    values = {field: int(round(value)) if field in INTEGER_FIELDS else round(value, 2)
+              for field, value in zip(sent_fields, sent_values)}
+
+    cores = None
+    if sent_mask >> CORES_BIT & 1:
+        if offset >= len(data) or offset + 1 + data[offset] > len(data):
+            raise ValueError('truncated frame cores')
+        cores = tuple(float(percent) for percent in data[offset + 1:offset + 1 + data[offset]])
+
+    fresh = [field for index, field in enumerate(WIRE_FIELDS) if fresh_mask >> index & 1]
+    if fresh_mask >> CORES_BIT & 1:
+        fresh.append('cpu_per_core_percent')
+    return Frame(host, flags, sequence, timestamp, fresh, values, cores)
+
+
+class AgentSender:
+    """
+    Pushes the latest snapshot of the store to an aggregator, one frame per send() call,
+    as UDP datagrams or as length-prefixed frames over a TCP connection.
+    A failed send closes the socket, which is reopened with a backoff, and makes the next frame a keyframe.
+    """
+
+    def __init__(self, store, address: tuple, host_name: str = None, transport: str = 'udp'):
+        if transport not in ('udp', 'tcp'):
+            raise ValueError(f'unknown transport {transport}')
+        self.store = store
+        self.address = address
+        self.transport = transport
+        self.encoder = FrameEncoder(host_name or socket.gethostname())
+        self.breaker = CircuitBreaker(failure_threshold=1)
+
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self._socket = None
+
+    def _connect(self):
+        if self.transport == 'udp':
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._socket.connect(self.address)
+        else:
+            self._socket = socket.create_connection(self.address, timeout=1)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send(self):
+        now = monotonic()
+        if not self.breaker.allow(now):
+            return
+        try:
+            if self._socket is None:
+                self._connect()
+            frame = self.encoder.encode(self.store.current)
+            if self.transport == 'udp':
+                self._socket.send(frame)
+            else:
+                self._socket.sendall(TCP_LENGTH.pack(len(frame)) + frame)
+        except OSError as e:
+            # UDP only fails when the aggregator host is unreachable, TCP on any connection loss;
+            # reported once, the retries are quiet
+            if self.breaker.state == CircuitBreaker.CLOSED:
+                print(f'aggregator {self.address[0]}:{self.address[1]} error: {e}')
+            self.close()
+            # what was not delivered is sent again, with the next keyframe
+            self.encoder.reset()
+            self.breaker.record_failure(now)
+            return
+        self.breaker.record_success()
+        self.frames_sent += 1
+        self.bytes_sent += len(frame)
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
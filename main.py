@@ -1,382 +1,99 @@
+import time
+
+# the startup milestones are measured from here, see record_startup()
+STARTED = time.perf_counter()
+
 from PySide6.QtWidgets import (QApplication,
                                QWidget,
                                QFrame,
                                QLabel,
+                               QMenu,
                                QGridLayout,
                                QMainWindow)
 from PySide6.QtCore import (Qt,
-                            QTimer,
-                            Signal,
-                            QThread)
+                            QTimer)
 from PySide6.QtGui import (QMouseEvent,
                            QIcon,
-                           QCloseEvent)
-from threading import Thread
-from time import sleep
-from ag95 import red_green_from_range_value
-import sys
-import psutil
-import win32gui
-import win32con
+                           QCloseEvent,
+                           QContextMenuEvent,
+                           QPaintEvent)
+# only the modules needed to paint the first frame are imported here, the samplers and their dependencies
+# (psutil, requests, ag95, pywin32 ...) are imported once it is on screen, see DraggableWindow.start_updater
+from hwstats.adaptive import (RatePolicy,
+                              scaled_interval)
+from hwstats.lifecycle import (Lifecycle,
+                               WindowPositionStore)
+from hwstats.instrumentation import (INSTRUMENTATION,
+                                     format_report,
+                                     format_summary)
+from hwstats.layout import (DEFAULT_LAYOUT,
+                            LAYOUT_FILE,
+                            Layout)
+from hwstats.widgets import (CoreHeatmap,
+                             HostsGrid,
+                             StatsGrid)
+import argparse
 import os
-import json
-import requests
-
-LIBRE_HARDWARE_MONITOR_PORT = 8085
-
-def CPU_usage_updater(data_storage: dict):
-    while not os.path.isfile(get_running_path('exit')):
-        cpu_percent = psutil.cpu_percent(interval=0.5)
-        data_storage['cpu_percent'] = cpu_percent
-
-        # no sleep() needed here as cpu_percent() already takes up 0.5s
-
+import sys
 
-def RAM_stats_updater(data_storage: dict):
-    while not os.path.isfile(get_running_path('exit')):
-        ram_usage = psutil.virtual_memory().used / (1024 ** 3)  # in GB
-        ram_total = psutil.virtual_memory().total / (1024 ** 3)  # in GB
-        data_storage |= {'ram_usage': round(ram_usage,1),
-                         'ram_total': round(ram_total,1)}
+# show a compact row with the usage of each CPU core under the grid
+SHOW_CORE_HEATMAP = True
+# the folder of the capped on-disk recording of the stats kept with --record, see --replay to play it back
+RECORDINGS_FOLDER = 'recordings'
+# slow the sampling and the timers down while the window is not visible or the values are stable,
+# None (or --fixed-rate) for the fixed rates
+ADAPTIVE_RATE_POLICY = RatePolicy()
+# number of host grids side by side with --aggregate
+AGGREGATE_GRID_COLUMNS = 8
 
-        sleep(0.5)
 
-def libre_hw_mon_updater(data_storage: dict):
+def record_startup(milestone: str):
     """
-    Use LibreHardwareMonitor's web server JSON endpoint.
-    Polls the HTTP endpoint at 127.0.0.1:<LIBRE_HARDWARE_MONITOR_PORT>/data.json every 2 seconds.
+    Record the time from the start of main.py to a startup milestone (first paint, first data).
+    With PYFHS_STARTUP_TRACE=<file>, also append it with the wall clock time to that file,
+    for benchmarks/bench_startup.py (a windowed build has no stdout).
     """
-    while not os.path.isfile(get_running_path('exit')):
-        try:
-            # Make HTTP request to LibreHardwareMonitor web server
-            response = requests.get(f'http://127.0.0.1:{LIBRE_HARDWARE_MONITOR_PORT}/data.json', timeout=5)
-            response.raise_for_status()  # Raise exception for bad status codes
-            data = response.json()
-
-            # Initialize with defaults
-            cpu_temp = 0
-            igpu_temp = 0
-            igpu_usage = 0
-            dgpu_temp = 0
-            dgpu_usage = 0
-            disk1_activity = 0
-            disk1_read_speed = 0
-            disk1_write_speed = 0
-            disk2_activity = 0
-            disk2_read_speed = 0
-            disk2_write_speed = 0
-            network_upload_speed = 0
-            network_download_speed = 0
-
-            # Helper function to search for sensors in the nested JSON structure
-            def find_sensor(data_node, sensor_type, name_filter=None, hardware_id_filter=None):
-                """Recursively search for sensors in the JSON tree"""
-                results = []
-
-                # Check if this node is a sensor
-                if 'Type' in data_node:
-                    if data_node['Type'] == sensor_type:
-                        if name_filter is None or (name_filter and name_filter in data_node.get('Text', '')):
-                            if hardware_id_filter is None or (
-                                    hardware_id_filter and hardware_id_filter in data_node.get('HardwareId', '')):
-                                results.append(data_node)
-
-                # Recursively search children
-                for child in data_node.get('Children', []):
-                    results.extend(find_sensor(child, sensor_type, name_filter, hardware_id_filter))
-
-                return results
-
-            # Helper function to find a hardware node by its exact "Text" field
-            def find_hardware_node(data_node, text_to_find):
-                """Recursively search the JSON tree for a hardware node with a specific Text value."""
-                if data_node.get('Text') == text_to_find and 'HardwareId' in data_node:
-                    # Check if it's a hardware device and not just a category
-                    if data_node.get('ImageURL', '').startswith('images_icon/'):
-                        return data_node
-                for child in data_node.get('Children', []):
-                    found = find_hardware_node(child, text_to_find)
-                    if found:
-                        return found
-                return None
-
-            # Helper function to extract "Total Activity" from a disk node
-            def get_disk_activity(disk_node):
-                if not disk_node:
-                    return 0
-                activity_sensors = find_sensor(disk_node, 'Load', 'Total Activity')
-                if activity_sensors:
-                    value_str = activity_sensors[0].get('Value', '0')
-                    try:
-                        # Handle comma as decimal separator
-                        return float(value_str.split()[0].replace(',', '.'))
-                    except (ValueError, AttributeError, IndexError):
-                        pass
-                return 0
-
-            # Helper function to get throughput in MB/s
-            def get_throughput_in_MBs(node, rate_name):
-                if not node:
-                    return 0
-                throughput_sensors = find_sensor(node, 'Throughput', rate_name)
-                if throughput_sensors:
-                    # Use RawValue which is in B/s for consistent conversion
-                    value_str = throughput_sensors[0].get('RawValue', '0')
-                    try:
-                        # Value is like "307710.3 B/s" or "307710,3 B/s", handle both decimal separators
-                        bytes_per_second_str = value_str.split()[0].replace(',', '.')
-                        bytes_per_second = float(bytes_per_second_str)
-                        megabytes_per_second = bytes_per_second / (1024 ** 2)
-                        return megabytes_per_second
-                    except (ValueError, AttributeError, IndexError):
-                        pass
-                return 0
-
-            # Find 'disk1' and 'disk2' and get their stats
-            disk1_node = find_hardware_node(data, 'disk1')
-            disk1_activity = get_disk_activity(disk1_node)
-            disk1_read_speed = get_throughput_in_MBs(disk1_node, "Read Rate")
-            disk1_write_speed = get_throughput_in_MBs(disk1_node, "Write Rate")
-
-            disk2_node = find_hardware_node(data, 'disk2')
-            disk2_activity = get_disk_activity(disk2_node)
-            disk2_read_speed = get_throughput_in_MBs(disk2_node, "Read Rate")
-            disk2_write_speed = get_throughput_in_MBs(disk2_node, "Write Rate")
-
-            # Find 'adapter1' and get its stats
-            adapter1_node = find_hardware_node(data, 'adapter1')
-            network_upload_speed = get_throughput_in_MBs(adapter1_node, "Upload Speed")
-            network_download_speed = get_throughput_in_MBs(adapter1_node, "Download Speed")
-
-            # Find CPU temperature (CPU Package or SoC)
-            cpu_temp_sensors = find_sensor(data, 'Temperature', 'CPU Package')
-            if not cpu_temp_sensors:
-                cpu_temp_sensors = find_sensor(data, 'Temperature', 'SoC')
-
-            if cpu_temp_sensors:
-                # Extract numeric value from "Value" field (e.g., "64.0 °C" -> 64.0 or "64,0 °C" -> 64.0)
-                value_str = cpu_temp_sensors[0].get('Value', '0')
-                try:
-                    # Handle both '.' and ',' as decimal separators
-                    cpu_temp = float(value_str.split()[0].replace(',', '.'))
-                except (ValueError, AttributeError, IndexError):
-                    cpu_temp = 0
-
-            # Find dedicated GPU (NVIDIA) temperature
-            dgpu_temp_sensors = find_sensor(data, 'Temperature', 'GPU Core')
-            # Filter for NVIDIA GPU by checking parent HardwareId
-            if dgpu_temp_sensors:
-                # We need to check if this is actually the NVIDIA GPU
-                # usually NVIDIA GPU is under hardware ID "/gpu-nvidia/0"
-                nvidia_dgpu_temp = [s for s in dgpu_temp_sensors
-                                    if s.get('SensorId', '').startswith('/gpu-nvidia')]
-                if nvidia_dgpu_temp:
-                    value_str = nvidia_dgpu_temp[0].get('Value', '0')
-                    try:
-                        # Handle both '.' and ',' as decimal separators
-                        dgpu_temp = float(value_str.split()[0].replace(',', '.'))
-                    except (ValueError, AttributeError, IndexError):
-                        dgpu_temp = 0
-
-            # Find dedicated GPU (NVIDIA) usage
-            dgpu_load_sensors = find_sensor(data, 'Load', 'GPU Core')
-            if dgpu_load_sensors:
-                nvidia_dgpu_load = [s for s in dgpu_load_sensors
-                                    if s.get('SensorId', '').startswith('/gpu-nvidia')]
-                if nvidia_dgpu_load:
-                    value_str = nvidia_dgpu_load[0].get('Value', '0')
-                    try:
-                        # Handle both '.' and ',' as decimal separators
-                        dgpu_usage = float(value_str.split()[0].replace(',', '.'))
-                    except (ValueError, AttributeError, IndexError):
-                        dgpu_usage = 0
-
-            # Find integrated GPU (Intel) usage - D3D 3D load
-            # usually Intel GPU is under "/gpu-intel-integrated/"
-            igpu_load_sensors = find_sensor(data, 'Load', 'D3D 3D')
-            if igpu_load_sensors:
-                intel_igpu_load = [s for s in igpu_load_sensors
-                                   if '/gpu-intel-integrated/' in s.get('SensorId', '')]
-                if intel_igpu_load:
-                    value_str = intel_igpu_load[0].get('Value', '0')
-                    try:
-                        # Handle both '.' and ',' as decimal separators
-                        igpu_usage = float(value_str.split()[0].replace(',', '.'))
-                    except (ValueError, AttributeError, IndexError):
-                        igpu_usage = 0
-
-            # Integrated GPU temperature - fallback to CPU temperature
-            igpu_temp = cpu_temp
-
-            # Update data storage including history for disk speeds
-            data_storage['CPU_temp'] = int(cpu_temp)
-            data_storage['iGPU_temp'] = int(igpu_temp)
-            data_storage['iGPU_usage'] = round(igpu_usage, 2)
-            data_storage['dGPU_temp'] = int(dgpu_temp)
-            data_storage['dGPU_usage'] = round(dgpu_usage, 2)
-            data_storage['disk1_activity'] = round(disk1_activity, 2)
-            data_storage['disk1_read_speed'] = round(disk1_read_speed, 2)
-            data_storage['disk1_write_speed'] = round(disk1_write_speed, 2)
-            data_storage['disk2_activity'] = round(disk2_activity, 2)
-            data_storage['disk2_read_speed'] = round(disk2_read_speed, 2)
-            data_storage['disk2_write_speed'] = round(disk2_write_speed, 2)
-            data_storage['network_upload_speed'] = round(network_upload_speed, 2)
-            data_storage['network_download_speed'] = round(network_download_speed, 2)
-
-            # Append to history and trim
-            for key in ['disk1_read_speed', 'disk1_write_speed', 'disk2_read_speed', 'disk2_write_speed',
-                        'network_upload_speed', 'network_download_speed']:
-                history_key = f"{key}_history_MBs"
-                data_storage[history_key].append(data_storage[key])
-                data_storage[history_key] = data_storage[history_key][-1000:]
-
-        except requests.exceptions.RequestException as e:
-            # On error, reset current values but keep history
-            data_storage.update({'CPU_temp': 0, 'iGPU_temp': 0, 'iGPU_usage': 0, 'dGPU_temp': 0, 'dGPU_usage': 0,
-                                 'disk1_activity': 0, 'disk1_read_speed': 0, 'disk1_write_speed': 0,
-                                 'disk2_activity': 0, 'disk2_read_speed': 0, 'disk2_write_speed': 0,
-                                 'network_upload_speed': 0, 'network_download_speed': 0})
-            print(f'LibreHardwareMonitor HTTP request failed: {e}')
-        except (json.JSONDecodeError, Exception) as e:
-            # On error, reset current values but keep history
-            data_storage.update({'CPU_temp': 0, 'iGPU_temp': 0, 'iGPU_usage': 0, 'dGPU_temp': 0, 'dGPU_usage': 0,
-                                 'disk1_activity': 0, 'disk1_read_speed': 0, 'disk1_write_speed': 0,
-                                 'disk2_activity': 0, 'disk2_read_speed': 0, 'disk2_write_speed': 0,
-                                 'network_upload_speed': 0, 'network_download_speed': 0})
-            print(f'LibreHardwareMonitor error: {e}')
-
-        sleep(2.0)  # Keep the same relaxed polling interval
-
-# Worker thread to update stats
-class StatsUpdater(QThread):
-    stats_updated = Signal(list, list, list)  # Signal to send updated stats to the main thread
-
-    def __init__(self):
-        super().__init__()
+    elapsed = time.perf_counter() - STARTED
+    INSTRUMENTATION.record(f'startup {milestone}', elapsed)
+    trace_path = os.environ.get('PYFHS_STARTUP_TRACE')
+    if trace_path:
+        with open(trace_path, 'a') as file_out_handle:
+            file_out_handle.write(f'{milestone}\t{elapsed:.6f}\t{time.time():.6f}\n')
 
-        # previously emitted rows
-        self._last_rows = None
-        self._last_colors = None
-
-        self.cpu_usage = {'cpu_percent': 0}
-        t_CPU = Thread(target=CPU_usage_updater, args=(self.cpu_usage,))
-        t_CPU.start()
-
-        self.RAM_stats = {'ram_usage': 0,
-                          'ram_total': 0}
-        t_RAM = Thread(target=RAM_stats_updater, args=(self.RAM_stats,))
-        t_RAM.start()
-
-        self.libre_hw_mon = {'CPU_temp': 0, 'iGPU_temp': 0, 'iGPU_usage': 0, 'dGPU_temp': 0, 'dGPU_usage': 0,
-                             'disk1_activity': 0, 'disk1_read_speed': 0, 'disk1_write_speed': 0,
-                             'disk2_activity': 0, 'disk2_read_speed': 0, 'disk2_write_speed': 0,
-                             'disk1_read_speed_history_MBs': [0.001], 'disk1_write_speed_history_MBs': [0.001],
-                             'disk2_read_speed_history_MBs': [0.001], 'disk2_write_speed_history_MBs': [0.001],
-                             'network_upload_speed': 0, 'network_download_speed': 0,
-                             'network_upload_speed_history_MBs': [0.001], 'network_download_speed_history_MBs': [0.001]}
-        t_libre_hw_mon = Thread(target=libre_hw_mon_updater, args=(self.libre_hw_mon,))
-        t_libre_hw_mon.start()
-
-    def run(self):
-        while not os.path.isfile(get_running_path('exit')):
-            ram_percent = round((self.RAM_stats['ram_usage'] / self.RAM_stats['ram_total']) * 100, 1) if self.RAM_stats[
-                                                                                                             'ram_total'] > 0 else 0
-
-            # Collect all the data points in a 4x4 grid
-            rows = [
-                [f"CPU[%]: {self.cpu_usage['cpu_percent']}", f"RAM[%]: {ram_percent}",
-                 f"iGPU[%]: {self.libre_hw_mon['iGPU_usage']}", f"dGPU[%]: {self.libre_hw_mon['dGPU_usage']}"],
-                [f"CPU[C]: {self.libre_hw_mon['CPU_temp']}", f"RAM[GB]: {self.RAM_stats['ram_usage']}",
-                 f"iGPU[C]: {self.libre_hw_mon['iGPU_temp']}", f"dGPU[C]: {self.libre_hw_mon['dGPU_temp']}"],
-                [f"NET⬆️: {self.libre_hw_mon['network_upload_speed']}", f"D1[%]: {self.libre_hw_mon['disk1_activity']}",
-                 f"D1_R[MB\\s]: {self.libre_hw_mon['disk1_read_speed']}",
-                 f"D1_W[MB\\s]: {self.libre_hw_mon['disk1_write_speed']}"],
-                [f"NET⬇️: {self.libre_hw_mon['network_download_speed']}",
-                 f"D2[%]: {self.libre_hw_mon['disk2_activity']}",
-                 f"D2_R[MB\\s]: {self.libre_hw_mon['disk2_read_speed']}",
-                 f"D2_W[MB\\s]: {self.libre_hw_mon['disk2_write_speed']}"]
-            ]
-
-            colors = [
-                [red_green_from_range_value(self.cpu_usage['cpu_percent'], 0, 100),
-                 red_green_from_range_value(self.RAM_stats['ram_usage'], 0, self.RAM_stats['ram_total']),
-                 red_green_from_range_value(self.libre_hw_mon['iGPU_usage'], 0, 100),
-                 red_green_from_range_value(self.libre_hw_mon['dGPU_usage'], 0, 100)],
-                [red_green_from_range_value(self.libre_hw_mon['CPU_temp'], 40, 90),
-                 red_green_from_range_value(self.RAM_stats['ram_usage'], 0, self.RAM_stats['ram_total']),
-                 red_green_from_range_value(self.libre_hw_mon['iGPU_temp'], 40, 90),
-                 red_green_from_range_value(self.libre_hw_mon['dGPU_temp'], 40, 90)],
-                [red_green_from_range_value(self.libre_hw_mon['network_upload_speed'], 0,
-                                            max(self.libre_hw_mon['network_upload_speed_history_MBs'])),
-                 red_green_from_range_value(self.libre_hw_mon['disk1_activity'], 0, 100),
-                 red_green_from_range_value(self.libre_hw_mon['disk1_read_speed'], 0,
-                                            max(self.libre_hw_mon['disk1_read_speed_history_MBs'])),
-                 red_green_from_range_value(self.libre_hw_mon['disk1_write_speed'], 0,
-                                            max(self.libre_hw_mon['disk1_write_speed_history_MBs']))],
-                [red_green_from_range_value(self.libre_hw_mon['network_download_speed'], 0,
-                                            max(self.libre_hw_mon['network_download_speed_history_MBs'])),
-                 red_green_from_range_value(self.libre_hw_mon['disk2_activity'], 0, 100),
-                 red_green_from_range_value(self.libre_hw_mon['disk2_read_speed'], 0,
-                                            max(self.libre_hw_mon['disk2_read_speed_history_MBs'])),
-                 red_green_from_range_value(self.libre_hw_mon['disk2_write_speed'], 0,
-                                            max(self.libre_hw_mon['disk2_write_speed_history_MBs']))]
-            ]
-
-            # Emit formatted data
-            if self._last_rows is None:
-                changed = [[True] * len(row) for row in rows]
-            else:
-                changed = [[rows[r][c] != self._last_rows[r][c] or
-                            colors[r][c] != self._last_colors[r][c]
-                            for c in range(len(rows[r]))] for r in range(len(rows))]
-
-            self._last_rows  = [row[:] for row in rows] # deep copy
-            self._last_colors = [row[:] for row in colors]
-
-            self.stats_updated.emit(rows, colors, changed)
-            self.msleep(500)
-
-def get_running_path(relative_path):
-    if '_internal' in os.listdir():
-        return os.path.join('_internal', relative_path)
-    else:
-        return relative_path
 
 class DraggableWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, lifecycle: Lifecycle, make_updater, aggregate: bool = False, title_suffix: str = '',
+                 layout: Layout = DEFAULT_LAYOUT):
         super().__init__()
 
+        self.lifecycle = lifecycle
+        # make_updater() builds the StatsUpdater (or the AggregateUpdater) once the first frame is painted
+        self.make_updater = make_updater
+        self.stats_updater = None
+        self.win32 = None
+        self.first_paint = True
+        self.first_data = True
+
         # these position coordinates will be used to keep the main window exactly where the user drags it
         # see the logic from move_window_to_fixed_position for details
-        self.dragged_x_pos = 0
-        self.dragged_y_pos = 0
-
-        # first clear the exit flag by removing the exit file if it exists
-        # but also try to read the last window position on close
-        if os.path.isfile(get_running_path('exit')):
-            try:
-                with open(get_running_path('exit'), 'r') as file_in_handle:
-                    last_position = json.load(file_in_handle)
-                    self.dragged_x_pos = last_position['dragged_x_pos']
-                    self.dragged_y_pos = last_position['dragged_y_pos']
-            except:
-                pass
-
-            os.remove(get_running_path('exit'))
+        # the last known position is restored from the previous run
+        self.window_position_store = WindowPositionStore(lifecycle)
+        self.dragged_x_pos, self.dragged_y_pos = self.window_position_store.load()
 
         # Set up the window properties
-        self.setWindowTitle("pyFloatingHardwareStats v" + open(get_running_path('version.txt')).read())
+        title = "pyFloatingHardwareStats v" + open(lifecycle.running_path('version.txt')).read()
+        self.setWindowTitle(title + title_suffix)
         self.setGeometry(100, 100, 1, 1)  # Initial position and size
         self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.FramelessWindowHint)  # Always on top, no frame
         self.setStyleSheet("background-color: rgba(255, 255, 255, 220);")  # Light transparent background
         self.setWindowOpacity(0.8)  # 80% opaque
-        self.setWindowIcon(QIcon(get_running_path('icon.ico')))
+        self.setWindowIcon(QIcon(lifecycle.running_path('icon.ico')))
 
         # Central widget and layout
         central_widget = QWidget(self)
         self.setCentralWidget(central_widget)
 
-        # Create the main grid layout for labels
+        # Create the main grid layout
         grid_layout = QGridLayout(central_widget)
         grid_layout.setSpacing(0)
         grid_layout.setContentsMargins(0, 0, 0, 0)
@@ -390,36 +107,46 @@ class DraggableWindow(QMainWindow):
         self.drag_frame.mousePressEvent = self.start_drag
         self.drag_frame.mouseMoveEvent = self.do_drag
 
-        # Create a table-like visualization with labels
-        # The previous implementation with QTableWidget was not ok as
-        # the rows height could not be customized beyond certain limits
-        self._cells = {}
-        for row_index in range(4):  # 4 rows
-            for column_index in range(4):  # 4 columns
-                label = QLabel(f"R{row_index}C{column_index}")
-                # the cells are stored with the <row_nr>_<col_nr> keys
-                self._cells[f'{row_index}_{column_index}'] = label
-
-                label.setStyleSheet("color: black; "
-                                    "padding: 0px; "
-                                    "margin: 0px; "
-                                    "font-family: Arial; "
-                                    "font-size: 10px; "
-                                    "font-weight: bold;"
-                                    )
-                # Add label directly to the grid layout
-                grid_layout.addWidget(label, row_index, column_index)
-
-        # Timer to keep the window always on top
+        # Create a table-like visualization, painted by a single widget
+        # The previous implementations with QTableWidget and then with one QLabel per cell were not ok as
+        # the rows height could not be customized beyond certain limits, respectively
+        # restyling the labels on each update was too expensive
+        # With --aggregate, one such grid per host pushing its stats
+        # Until the samplers are started, the cells of the layout show placeholders
+        if aggregate:
+            self.grid = HostsGrid(AGGREGATE_GRID_COLUMNS, central_widget)
+        else:
+            self.grid = StatsGrid(layout.row_count, layout.column_count, central_widget)
+        grid_layout.addWidget(self.grid, 0, 0)
+
+        # Optional per-core usage row, spanning the whole width under the grid
+        self.core_heatmap = None
+        if SHOW_CORE_HEATMAP and not aggregate:
+            self.core_heatmap = CoreHeatmap(central_widget)
+            grid_layout.addWidget(self.core_heatmap, 1, 0)
+
+        # Diagnostics row, toggled from the context menu; the app measures itself only while it is shown
+        self.diagnostics_label = QLabel(central_widget)
+        self.diagnostics_label.setStyleSheet("font-size: 9px;")
+        self.diagnostics_label.setVisible(INSTRUMENTATION.enabled)
+        grid_layout.addWidget(self.diagnostics_label, 2, 0)
+        self.diagnostics_timer = QTimer(self)
+        self.diagnostics_timer.timeout.connect(self.update_diagnostics)
+        if INSTRUMENTATION.enabled:
+            self.diagnostics_timer.start(1000)
+
+        # Timer to keep the window always on top, started with the samplers
         self.keep_on_top_timer = QTimer(self)
         self.keep_on_top_timer.timeout.connect(self.ensure_window_above_taskbar)
-        self.keep_on_top_timer.start(100)  # Ensure window stays on top every 100ms
 
         # Timer to move the window to the last user position
         self.move_window_to_fixed_position_timer = QTimer(self)
         self.move_window_to_fixed_position_timer.timeout.connect(self.move_window_to_fixed_position)
         self.move_window_to_fixed_position_timer.start(2000)  # Ensure the window moves every 2s
 
+        # base intervals (in ms) of the timers slowed down along with the sampling by the adaptive rate
+        self.scaled_timers = ((self.keep_on_top_timer, 100), (self.move_window_to_fixed_position_timer, 2000))
+
         # Variables for drag functionality
         self.start_x = 0
         self.start_y = 0
@@ -429,29 +156,132 @@ class DraggableWindow(QMainWindow):
         self.screen_width = screen_geometry.width()
         self.screen_height = screen_geometry.height()
 
+        # Timer to notice the window getting covered, minimized or hidden by a locked session;
+        # not scaled, so that a window shown again is back to the full rate within a second
+        self.visibility_timer = QTimer(self)
+        self.visibility_timer.timeout.connect(self.update_visibility)
+
+    def paintEvent(self, event: QPaintEvent):
+        super().paintEvent(event)
+        if self.first_paint:
+            # the placeholders are on screen, start the samplers from the next event loop iteration
+            self.first_paint = False
+            record_startup('first paint')
+            QTimer.singleShot(0, self.start_updater)
+
+    def start_updater(self):
+        if self.lifecycle.stopping:
+            return  # closed before its first frame
+
         # Start the stats updater thread
-        self.stats_updater = StatsUpdater()
-        self.stats_updater.stats_updated.connect(self.update_table)
+        with INSTRUMENTATION.span('start updater'):
+            self.stats_updater = self.make_updater()
+        if isinstance(self.grid, HostsGrid):
+            self.grid.set_tooltip_provider(self.stats_updater.aggregator.cell_history)
+            self.stats_updater.hosts_updated.connect(self.update_hosts)
+        else:
+            # hovering a cell shows the long term history of its value
+            self.grid.set_tooltip_provider(self.stats_updater.collector.cell_history)
+            self.stats_updater.stats_updated.connect(self.update_table)
+            self.stats_updater.rate_scale_changed.connect(self.apply_rate_scale)
+            if self.core_heatmap is not None:
+                self.stats_updater.cores_updated.connect(self.core_heatmap.set_values)
         self.stats_updater.start()
 
-    def update_table(self, rows, colors, changed):
-        # Data is structured as a 4x4 grid (list of rows)
-        for r, (row_data, color_row, changed_row) in enumerate(zip(rows, colors, changed)):
-            for c, (text, colour, changed_flag) in enumerate(zip(row_data, color_row, changed_row)):
-                if changed_flag:
-                    label = self._cells.get(f'{r}_{c}')
-                    if label:
-                        label.setText(text)
-                        r_val, g_val, b_val = colour
-                        label.setStyleSheet("color: black; "
-                                            "padding: 0px; "
-                                            "margin: 0px; "
-                                            "font-family: Arial; "
-                                            "font-size: 10px; "
-                                            "font-weight: bold; "
-                                            f"background-color: rgb({r_val}, {g_val}, {b_val});")
+        if self.stats_updater.rate_controller is not None:
+            self.visibility_timer.start(1000)
+
+        try:
+            import win32gui
+            import win32con
+        except ImportError:
+            # not on Windows: the window manager honours WindowStaysOnTopHint on its own
+            pass
+        else:
+            self.win32 = (win32gui, win32con)
+            self.keep_on_top_timer.start(100)  # Ensure window stays on top every 100ms
+
+    @property
+    def scheduler(self):
+        return self.stats_updater.scheduler if self.stats_updater is not None else None
+
+    def update_visibility(self):
+        window_handle = self.windowHandle()
+        visible = window_handle is not None and window_handle.isExposed() and not self.isMinimized()
+        self.stats_updater.rate_controller.set_visible(visible)
+
+    def notify_interaction(self):
+        if self.stats_updater is not None and self.stats_updater.rate_controller is not None:
+            self.stats_updater.rate_controller.notify_interaction()
+
+    def apply_rate_scale(self, scale: float):
+        for timer, interval in self.scaled_timers:
+            if timer.isActive():
+                max_interval = self.stats_updater.rate_controller.policy.max_interval * 1000
+                timer.setInterval(int(scaled_interval(interval, scale, max_interval)))
+
+    def enterEvent(self, event):
+        # the user is looking at the values
+        self.notify_interaction()
+        super().enterEvent(event)
+
+    def update_table(self, rows, colors, changed, stale):
+        # Data is structured as a grid shaped like the layout (list of rows), only the changed cells get repainted
+        with INSTRUMENTATION.span('update_table'):
+            shape = (len(rows), len(rows[0]))
+            if shape != self.grid.shape:
+                # the layout suggested for the discovered hardware replaced the default one
+                self.grid.set_shape(*shape)
+                self.adjustSize()
+            self.grid.update_cells(rows, colors, changed, stale)
+        if self.first_data:
+            self.first_data = False
+            record_startup('first data')
+
+    def update_hosts(self, frames):
+        host_count = self.grid.host_count
+        with INSTRUMENTATION.span('update_hosts'):
+            self.grid.update_hosts(frames)
+        # a new host got its grid, make room for it
+        if self.grid.host_count != host_count:
+            self.adjustSize()
+        if self.first_data:
+            self.first_data = False
+            record_startup('first data')
+
+    def contextMenuEvent(self, event: QContextMenuEvent):
+        self.notify_interaction()
+        menu = QMenu(self)
+        diagnostics_action = menu.addAction("Diagnostics")
+        diagnostics_action.setCheckable(True)
+        diagnostics_action.setChecked(INSTRUMENTATION.enabled)
+        diagnostics_action.toggled.connect(self.set_diagnostics_enabled)
+        menu.addAction("Dump diagnostics", self.dump_diagnostics)
+        menu.exec(event.globalPos())
+
+    def set_diagnostics_enabled(self, enabled: bool):
+        INSTRUMENTATION.enabled = enabled
+        self.diagnostics_label.setVisible(enabled)
+        if enabled:
+            INSTRUMENTATION.reset()
+            self.update_diagnostics()
+            self.diagnostics_timer.start(1000)
+        else:
+            self.diagnostics_timer.stop()
+        self.adjustSize()
+
+    def update_diagnostics(self):
+        report = INSTRUMENTATION.report(self.scheduler)
+        self.diagnostics_label.setText(format_summary(report))
+        self.diagnostics_label.setToolTip(format_report(report))
+
+    def dump_diagnostics(self):
+        path = self.lifecycle.running_path(f"diagnostics_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        INSTRUMENTATION.dump(path, self.scheduler)
+        print(f'diagnostics written to {path}')
 
     def start_drag(self, event: QMouseEvent):
+        self.notify_interaction()
         # Record the current position of the window and mouse
         self.start_x = event.globalPosition().x()
         self.start_y = event.globalPosition().y()
@@ -476,6 +306,7 @@ class DraggableWindow(QMainWindow):
         self.move(new_x, new_y)
 
     def ensure_window_above_taskbar(self):
+        win32gui, win32con = self.win32
         hwnd = self.winId()
         # Ensure the window stays on top of the taskbar
         win32gui.SetWindowPos(hwnd, win32con.HWND_TOPMOST, 0, 0, 0, 0, win32con.SWP_NOMOVE | win32con.SWP_NOSIZE)
@@ -488,14 +319,90 @@ class DraggableWindow(QMainWindow):
 
     def closeEvent(self, event: QCloseEvent):
         # Custom logic to run when the window is closed
-        # Simply create an exit file which can be seen by all the threads so that they can close gracefully
-        # this file will contain the last known position of the main window
-        with open(get_running_path('exit'), 'w') as file_out_handle:
-            json.dump({'dragged_x_pos': self.dragged_x_pos,
-                       'dragged_y_pos': self.dragged_y_pos}, file_out_handle)
-
-# Run the application
-app = QApplication(sys.argv)
-window = DraggableWindow()
-window.show()
-sys.exit(app.exec())
+        # remember the last known position of the main window for the next run
+        self.window_position_store.save(self.dragged_x_pos, self.dragged_y_pos)
+        # then signal all the threads so that they can close gracefully, without waiting for a stuck sensor poll
+        if self.stats_updater is not None:
+            self.stats_updater.shutdown()
+        else:
+            self.lifecycle.stop()
+
+def load_layout(args, lifecycle: Lifecycle):
+    """
+    (layout, path): the layout of the grid, None when it is to be suggested from the discovered hardware
+    and written to path. The --layout file or the layout file next to the app, if it exists;
+    a replay shows DEFAULT_LAYOUT unless --layout is given, the recordings only hold its fields.
+    """
+    if args.replay and not args.layout:
+        return DEFAULT_LAYOUT, None
+    path = args.layout or lifecycle.running_path(LAYOUT_FILE)
+    if not os.path.exists(path):
+        return None, path
+    try:
+        return Layout.load(path), path
+    except ValueError as e:
+        # not overwritten by a suggested layout, the user may want to fix it
+        print(f'{path}: {e}, using the default layout')
+        return DEFAULT_LAYOUT, path
+
+
+def make_updater(args, lifecycle: Lifecycle, layout: Layout = None, layout_path: str = None):
+    """
+    The updater feeding the window: local stats sampled or replayed, or the frames of agents with --aggregate.
+    """
+    if args.aggregate:
+        from hwstats.aggregator import Aggregator
+        from hwstats.updaters import AggregateUpdater
+        from hwstats.wire import parse_address
+
+        host, port = parse_address(args.aggregate if ':' in args.aggregate else ':' + args.aggregate, '0.0.0.0')
+        return AggregateUpdater(Aggregator(lifecycle, host, port))
+
+    from hwstats.collector import StatsCollector
+    from hwstats.updaters import StatsUpdater
+
+    if args.replay:
+        from hwstats.recorder import RecordingReader
+        collector = StatsCollector(lifecycle, replay=RecordingReader(args.replay), replay_speed=args.replay_speed,
+                                   layout=layout)
+    else:
+        record_directory = None
+        if args.record is not None:
+            record_directory = args.record or lifecycle.running_path(RECORDINGS_FOLDER)
+        collector = StatsCollector(lifecycle, record_directory=record_directory, layout=layout,
+                                   layout_path=layout_path)
+
+    # a replay runs at the pace of the recording
+    rate_policy = None if args.replay or args.fixed_rate else ADAPTIVE_RATE_POLICY
+    return StatsUpdater(collector, rate_policy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Floating window with hardware statistics')
+    parser.add_argument('--replay', metavar='DIR', help='play back a recording folder instead of sampling')
+    parser.add_argument('--replay-speed', type=float, default=1.0, help='replay speed, relative to real time')
+    parser.add_argument('--record', metavar='DIR', nargs='?', const='',
+                        help=f'record the stats to this folder, {RECORDINGS_FOLDER} when not given')
+    parser.add_argument('--fixed-rate', action='store_true', help='always sample and refresh at the full rate')
+    parser.add_argument('--aggregate', metavar='[HOST:]PORT',
+                        help='show the stats pushed by agents (headless.py --agent) instead of the local ones')
+    parser.add_argument('--layout', metavar='FILE',
+                        help=f'layout of the grid, {LAYOUT_FILE} by default (written from the discovered hardware '
+                             f'when missing)')
+    args, qt_args = parser.parse_known_args()
+
+    # Run the application
+    app = QApplication(sys.argv[:1] + qt_args)
+    # resolves the runtime path once and holds the stop signal shared by all the threads
+    lifecycle = Lifecycle()
+
+    title_suffix = " (aggregate)" if args.aggregate else " (replay)" if args.replay else ""
+    layout, layout_path = (DEFAULT_LAYOUT, None) if args.aggregate else load_layout(args, lifecycle)
+    window = DraggableWindow(lifecycle, lambda: make_updater(args, lifecycle, layout, layout_path),
+                             bool(args.aggregate), title_suffix, layout or DEFAULT_LAYOUT)
+    window.show()
+    sys.exit(app.exec())
+
+
+if __name__ == '__main__':
+    main()
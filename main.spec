@@ -11,7 +11,17 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # never imported by the app, only slow down the unpacking and the imports of a cold start
+    excludes=['tkinter',
+              'unittest',
+              'doctest',
+              'pydoc',
+              'PySide6.QtNetwork',
+              'PySide6.QtQml',
+              'PySide6.QtQuick',
+              'PySide6.QtOpenGL',
+              'PySide6.QtPdf',
+              'PySide6.QtWebEngineCore'],
     noarchive=False,
     optimize=0,
 )
@@ -26,7 +36,8 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # UPX packed binaries are decompressed in memory on every start, which slows down the cold start
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -40,7 +51,7 @@ coll = COLLECT(
     a.binaries,
     a.datas,
     strip=False,
-    upx=True,
+    upx=False,
     upx_exclude=[],
     name='main',
 )
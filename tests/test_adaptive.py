@@ -0,0 +1,59 @@
+import unittest
+from threading import Thread
+
+from hwstats.adaptive import (AdaptiveRateController,
+                              RatePolicy)
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.scales = []
+
+    def set_interval_scale(self, scale, max_interval=None):
+        self.scales.append(scale)
+
+
+class InterleavingScheduler(RecordingScheduler):
+    """
+    Runs the GUI thread's update while the first scale is being handed over.
+    """
+
+    def __init__(self, gui_update):
+        super().__init__()
+        self.gui_thread = Thread(target=gui_update)
+
+    def set_interval_scale(self, scale, max_interval=None):
+        if not self.gui_thread.is_alive() and not self.scales:
+            self.gui_thread.start()
+            self.gui_thread.join(timeout=0.2)
+        super().set_interval_scale(scale, max_interval)
+
+
+class AdaptiveRateControllerTest(unittest.TestCase):
+
+    def test_scale(self):
+        scheduler = RecordingScheduler()
+        controller = AdaptiveRateController(scheduler, RatePolicy(stable_after=0, interaction_hold=3600))
+        controller.observe([[0]])
+        self.assertEqual(controller.scale, 4)
+        controller.set_visible(False)
+        self.assertEqual(controller.scale, 32)
+        controller.notify_interaction()
+        self.assertEqual(controller.scale, 1)
+        self.assertEqual(scheduler.scales, [4, 32, 1])
+
+    def test_concurrent_update_ends_on_the_controller_scale(self):
+        # the user interacts while the stats thread slows the sampling down
+        scheduler = InterleavingScheduler(lambda: controller.notify_interaction())
+        timer_scales = []
+        controller = AdaptiveRateController(scheduler, RatePolicy(stable_after=0), timer_scales.append)
+        controller.observe([[0]])
+        scheduler.gui_thread.join()
+
+        self.assertEqual(controller.scale, 1)
+        self.assertEqual(scheduler.scales, [4, 1])
+        self.assertEqual(timer_scales, [4, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
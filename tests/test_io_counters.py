@@ -0,0 +1,40 @@
+import unittest
+from collections import namedtuple
+from unittest import mock
+
+from hwstats.backends import SensorBackend
+from hwstats.backends.base import is_virtual_nic
+
+snetio = namedtuple('snetio', 'bytes_sent bytes_recv')
+
+
+class VirtualNicTest(unittest.TestCase):
+
+    def test_windows_names(self):
+        for name in ('Ethernet', 'Ethernet 2', 'Wi-Fi', 'Local Area Connection'):
+            self.assertFalse(is_virtual_nic(name), name)
+        for name in ('Loopback Pseudo-Interface 1', 'vEthernet (Default Switch)', 'vEthernet (WSL)',
+                     'VirtualBox Host-Only Network', 'VMware Network Adapter VMnet8', 'Local Area Connection* 10',
+                     'Network Bridge', 'OpenVPN TAP-Windows6', 'Tailscale', 'isatap.{1234}'):
+            self.assertTrue(is_virtual_nic(name), name)
+
+    def test_macos_names(self):
+        for name in ('en0', 'en1'):
+            self.assertFalse(is_virtual_nic(name), name)
+        for name in ('lo', 'utun3', 'bridge100', 'awdl0', 'llw0', 'gif0', 'stf0', 'anpi0'):
+            self.assertTrue(is_virtual_nic(name), name)
+
+    def test_read_io_counters_counts_the_physical_nics(self):
+        # the WSL switch relays the traffic of the VM through the physical adapter, it must not be summed again
+        counters = {'Ethernet': snetio(1000, 5000),
+                    'vEthernet (WSL)': snetio(900, 4500),
+                    'Loopback Pseudo-Interface 1': snetio(10, 10)}
+        with mock.patch('psutil.disk_io_counters', return_value={}), \
+                mock.patch('psutil.net_io_counters', return_value=counters):
+            disks, nics = SensorBackend().read_io_counters()
+        self.assertEqual(disks, {})
+        self.assertEqual(nics, {'Ethernet': (1000, 5000)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from hwstats import lhm_index
+from hwstats.backends import lhm
+from hwstats.backends.lhm import LibreHardwareMonitorBackend
+from lhm_tree import make_lhm_tree
+
+
+class LHMBackendReadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = make_lhm_tree(disks=2)
+        self.backend = LibreHardwareMonitorBackend()
+        # no LHM server, every poll returns the same tree
+        self.backend._fetch = lambda: self.data
+        self.backend._data = self.data
+
+    def count_index_builds(self):
+        # LHMSensorIndex is used under its name in both modules
+        builds = mock.Mock(side_effect=lhm_index.LHMSensorIndex)
+        patches = (mock.patch.object(lhm, 'LHMSensorIndex', builds),
+                   mock.patch.object(lhm_index, 'LHMSensorIndex', builds))
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        return builds
+
+    def test_one_index_build_per_topology(self):
+        builds = self.count_index_builds()
+        readings = self.backend.read()
+        self.assertEqual(builds.call_count, 1)
+        self.assertGreater(readings['CPU_temp'], 0)
+        self.assertEqual(sorted(self.backend.disk_activity()), ['PhysicalDrive0', 'PhysicalDrive1'])
+
+        # the same topology reuses the resolved paths
+        self.backend.read()
+        self.assertEqual(builds.call_count, 1)
+
+    def test_watch_resolves_on_the_last_tree(self):
+        self.backend.read()
+        sensor_id = next(sensor.sensor_id for sensor in self.backend.discover() if sensor.device_type == 'cpu')
+        builds = self.count_index_builds()
+        self.backend.watch([sensor_id])
+        self.assertEqual(builds.call_count, 1)
+
+        self.assertIn(sensor_id, self.backend.read()['sensors'])
+        self.assertEqual(builds.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
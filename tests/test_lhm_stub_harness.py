@@ -0,0 +1,46 @@
+import argparse
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from lhm_stub_harness import (check_scenario,
+                              run_scenario)
+from lhm_tree import (make_lhm_tree,
+                      TREE_SIZES)
+
+
+class LHMStubHarnessTest(unittest.TestCase):
+    """
+    The LHM backend against the stub server, with short polling intervals and timeouts.
+    """
+
+    args = argparse.Namespace(seconds=1.5, interval=0.05, timeout=0.2, delay=0.1, period=0.5)
+
+    @classmethod
+    def setUpClass(cls):
+        cls.body = json.dumps(make_lhm_tree(**TREE_SIZES['small'])).encode('utf-8')
+
+    def check(self, scenario):
+        result = run_scenario(scenario, self.body, self.args)
+        self.assertEqual(check_scenario(scenario, result), [], result)
+        return result
+
+    def test_healthy(self):
+        result = self.check('healthy')
+        self.assertEqual(result['connections'], 1)
+        self.assertEqual(result['not_modified'], result['requests'] - 1)
+
+    def test_hang(self):
+        result = self.check('hang')
+        self.assertLessEqual(result['opened_after'], result['failure_threshold'])
+
+    def test_dead(self):
+        result = self.check('dead')
+        self.assertLessEqual(result['opened_after'], result['failure_threshold'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+
+from hwstats.backends.linux import LinuxSysfsBackend
+from hwstats.collector import sensors_updater
+from hwstats.snapshot import SnapshotStore
+
+
+class FailingFile:
+    """
+    A sysfs attribute that cannot be read, like the files of a runtime suspended dGPU.
+    """
+
+    def read_int(self):
+        raise OSError(errno.EBUSY, os.strerror(errno.EBUSY))
+
+    def close(self):
+        pass
+
+
+class LinuxSysfsBackendReadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        sys_root = os.path.join(self.root, 'sys')
+        proc_root = os.path.join(self.root, 'proc')
+
+        self.write(os.path.join(proc_root, 'diskstats'), '')
+        self.write(os.path.join(proc_root, 'net', 'dev'), 'header\nheader\n')
+        for index, (chip, label, millis) in enumerate((('k10temp', 'Tctl', 62500), ('amdgpu', 'edge', 51000))):
+            hwmon_dir = os.path.join(sys_root, 'class', 'hwmon', f'hwmon{index}')
+            self.write(os.path.join(hwmon_dir, 'name'), chip)
+            self.write(os.path.join(hwmon_dir, 'temp1_label'), label)
+            self.write(os.path.join(hwmon_dir, 'temp1_input'), str(millis))
+        self.write(os.path.join(sys_root, 'class', 'drm', 'card0', 'device', 'gpu_busy_percent'), '37')
+
+        self.backend = LinuxSysfsBackend(sys_root, proc_root)
+        self.addCleanup(self.backend.close)
+
+    @staticmethod
+    def write(path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(text + '\n')
+
+    def test_read(self):
+        readings = self.backend.read()
+        self.assertEqual(readings['CPU_temp'], 62.5)
+        self.assertEqual(readings['dGPU_temp'], 51)
+        self.assertEqual(readings['dGPU_usage'], 37)
+
+    def test_failing_file_only_drops_its_key(self):
+        self.backend._dgpu_busy = FailingFile()
+        readings = self.backend.read()
+        self.assertNotIn('dGPU_usage', readings)
+        self.assertEqual(readings['CPU_temp'], 62.5)
+        self.assertEqual(readings['dGPU_temp'], 51)
+
+        # the other readings are still published, dGPU[%] keeps its last value and goes stale
+        store = SnapshotStore()
+        store.publish(dGPU_usage=12, timestamp=1.0)
+        sensors_updater(store, self.backend)
+        snapshot = store.current
+        self.assertEqual(snapshot.CPU_temp, 62)
+        self.assertEqual(snapshot.dGPU_usage, 12)
+        self.assertEqual(snapshot.last_good['dGPU_usage'], 1.0)
+        self.assertGreater(snapshot.last_good['CPU_temp'], 1.0)
+
+    def test_failing_watched_sensor(self):
+        self.backend._watched = [('k10temp/Tctl', self.backend._cpu_temp, 1000), ('card0/busy', FailingFile(), 1)]
+        self.assertEqual(self.backend.read()['sensors'], {'k10temp/Tctl': 62.5})
+
+
+if __name__ == '__main__':
+    unittest.main()
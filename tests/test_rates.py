@@ -0,0 +1,50 @@
+import unittest
+
+from hwstats.rates import (counter_delta,
+                           RateEngine,
+                           WRAP_32)
+
+
+class CounterDeltaTest(unittest.TestCase):
+
+    def test_increase(self):
+        self.assertEqual(counter_delta(100, 250), 150)
+        self.assertEqual(counter_delta(250, 250), 0)
+
+    def test_32_bits_wrap(self):
+        self.assertEqual(counter_delta(WRAP_32 - 100, 50), 150)
+        self.assertEqual(counter_delta(WRAP_32 - 1, 0), 1)
+
+    def test_reset(self):
+        # a 32 bits counter far from the limit that goes back did not wrap
+        self.assertIsNone(counter_delta(1000, 10))
+        self.assertIsNone(counter_delta(WRAP_32 // 2, 0))
+        # 64 bits counters do not wrap in practice
+        self.assertIsNone(counter_delta(WRAP_32 * 10, 5))
+
+
+class RateEngineTest(unittest.TestCase):
+
+    def test_rates(self):
+        engine = RateEngine()
+        self.assertEqual(engine.update({'eth0': (1000, 0)}, now=10.0), {'eth0': (0.0, 0.0)})
+        self.assertEqual(engine.update({'eth0': (3000, 500)}, now=12.0), {'eth0': (1000.0, 250.0)})
+
+    def test_wrap_and_reset(self):
+        engine = RateEngine()
+        engine.update({'eth0': (WRAP_32 - 1000, 5000)}, now=0.0)
+        # the first counter wrapped, the second one was reset
+        self.assertEqual(engine.update({'eth0': (1000, 10)}, now=1.0), {'eth0': (2000.0, 0.0)})
+        # the reset re-baselined the device
+        self.assertEqual(engine.update({'eth0': (3000, 110)}, now=2.0), {'eth0': (2000.0, 100.0)})
+
+    def test_devices_come_and_go(self):
+        engine = RateEngine()
+        engine.update({'sda': (0, 0, 0)}, now=0.0)
+        self.assertEqual(engine.update({'sdb': (100, 100, 100)}, now=1.0), {'sdb': (0.0, 0.0, 0.0)})
+        # sda was forgotten, it gets a new baseline
+        self.assertEqual(engine.update({'sda': (100, 100, 100)}, now=2.0), {'sda': (0.0, 0.0, 0.0)})
+
+
+if __name__ == '__main__':
+    unittest.main()
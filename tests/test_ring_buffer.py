@@ -0,0 +1,53 @@
+import random
+import unittest
+
+from hwstats.ring_buffer import RingBuffer
+
+
+class RingBufferTest(unittest.TestCase):
+
+    def test_empty(self):
+        ring_buffer = RingBuffer(3)
+        self.assertEqual(len(ring_buffer), 0)
+        self.assertEqual(ring_buffer.max(), 0)
+        self.assertEqual(ring_buffer.max(default=-1), -1)
+        self.assertEqual(ring_buffer.latest(), 0)
+        self.assertEqual(ring_buffer.to_list(), [])
+
+    def test_invalid_capacity(self):
+        with self.assertRaises(ValueError):
+            RingBuffer(0)
+
+    def test_window(self):
+        ring_buffer = RingBuffer(3)
+        for value in (1.0, 5.0, 2.0, 3.0):
+            ring_buffer.append(value)
+        self.assertEqual(ring_buffer.to_list(), [5.0, 2.0, 3.0])
+        self.assertEqual(ring_buffer.latest(), 3.0)
+        self.assertEqual(len(ring_buffer), 3)
+
+    def test_rolling_max_matches_brute_force(self):
+        generator = random.Random(1234)
+        for capacity in (1, 2, 3, 7, 64):
+            ring_buffer = RingBuffer(capacity)
+            samples = []
+            # random values with runs of equal, increasing and decreasing values, over several wraps of the window
+            for step in range(capacity * 20):
+                kind = step // 10 % 4
+                if kind == 0:
+                    value = generator.uniform(0, 100)
+                elif kind == 1:
+                    value = float(step)
+                elif kind == 2:
+                    value = float(-step)
+                else:
+                    value = 42.0
+                ring_buffer.append(value)
+                samples.append(value)
+                window = samples[-capacity:]
+                self.assertEqual(ring_buffer.max(), max(window), (capacity, step))
+                self.assertEqual(ring_buffer.to_list(), window)
+
+
+if __name__ == '__main__':
+    unittest.main()
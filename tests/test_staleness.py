@@ -0,0 +1,113 @@
+import unittest
+from time import monotonic
+
+from hwstats.adaptive import (AdaptiveRateController,
+                              RatePolicy)
+from hwstats.backends import (SensorBackend,
+                              empty_readings)
+from hwstats.collector import (STALE_AFTER,
+                               StatsCollector,
+                               UI_REFRESH_INTERVAL)
+from hwstats.layout import DEFAULT_LAYOUT
+from hwstats.lifecycle import Lifecycle
+from hwstats.snapshot import Snapshot
+
+
+class FakeBackend(SensorBackend):
+    name = 'fake'
+
+    def read(self):
+        return empty_readings(self.provided_keys)
+
+    def read_io_counters(self):
+        return {}, {}
+
+
+class StalenessTest(unittest.TestCase):
+    """
+    The frames built while every sampler publishes on its scaled interval, as the scheduler runs them.
+    """
+
+    def setUp(self):
+        self.collector = StatsCollector(Lifecycle(), sensor_backend=FakeBackend(), layout=DEFAULT_LAYOUT)
+        self.scheduler = self.collector.scheduler
+        self.controller = AdaptiveRateController(self.scheduler, RatePolicy(stable_after=0))
+        self.start = 1000.0
+        self.last_good = {}
+        self.next_runs = {task: self.start for task, _ in self.collector._published_fields}
+
+    def apply_scale(self):
+        # what the scheduler thread does on its next wake up
+        self.scheduler._apply_interval_scale(monotonic())
+
+    def run_frames(self, start: float, seconds: float, skip=()):
+        """
+        The stale matrices of the frames built every UI tick from start for seconds; the tasks in skip do not run.
+        """
+        frames = []
+        now = start
+        while now < start + seconds:
+            for task, fields in self.collector._published_fields:
+                if self.next_runs[task] <= now:
+                    task.period = self.scheduler.effective_interval(task)
+                    self.next_runs[task] += task.period
+                    if task not in skip:
+                        self.last_good.update(dict.fromkeys(fields, now))
+            snapshot = Snapshot(timestamp=now, last_good=dict(self.last_good))
+            frames.append(self.collector.frames.build(snapshot, now, self.collector.stale_after())[3])
+            now += UI_REFRESH_INTERVAL
+        return frames
+
+    def assertNoStaleCell(self, frames):
+        for frame in frames:
+            self.assertFalse(any(any(row) for row in frame), frame)
+
+    def test_stable_scale_keeps_the_cells_fresh(self):
+        self.controller.observe([[0]])
+        self.assertEqual(self.controller.scale, RatePolicy().stable_factor)
+        self.apply_scale()
+        self.assertGreater(self.scheduler.effective_interval(self.sensors_task()), STALE_AFTER)
+
+        self.assertNoStaleCell(self.run_frames(self.start, 60))
+
+    def test_hidden_stable_scale_keeps_the_cells_fresh(self):
+        self.controller.observe([[0]])
+        self.controller.set_visible(False)
+        self.apply_scale()
+        self.assertEqual(self.scheduler.effective_interval(self.sensors_task()), RatePolicy().max_interval)
+
+        self.assertNoStaleCell(self.run_frames(self.start, 60))
+
+    def test_back_to_full_rate_keeps_the_cells_fresh(self):
+        self.controller.observe([[0]])
+        self.apply_scale()
+        self.run_frames(self.start, 30)
+
+        # an interaction pulls the pending deadlines in, the last samples are still from the slow periods
+        self.controller.notify_interaction()
+        self.apply_scale()
+        now = self.start + 30
+        for task, _ in self.collector._published_fields:
+            self.next_runs[task] = min(self.next_runs[task], now + self.scheduler.effective_interval(task))
+        self.assertNoStaleCell(self.run_frames(now, 30))
+
+    def test_missed_polls_go_stale(self):
+        self.controller.observe([[0]])
+        self.apply_scale()
+        sensors_task = self.sensors_task()
+        self.run_frames(self.start, 10)
+
+        seconds = 4 * self.scheduler.sampling_period(sensors_task)
+        frames = self.run_frames(self.start + 10, seconds, skip=(sensors_task,))
+        # CPU[C] is only refreshed by the sensors
+        self.assertFalse(frames[0][1][0])
+        self.assertTrue(frames[-1][1][0])
+        # CPU[%] is still sampled
+        self.assertFalse(frames[-1][0][0])
+
+    def sensors_task(self):
+        return next(task for task in self.scheduler.tasks if task.name == FakeBackend.name)
+
+
+if __name__ == '__main__':
+    unittest.main()